@@ -1,16 +1,20 @@
 import asyncio
-from typing import Any, Dict
+import hashlib
+import os
+from typing import Any, Dict, Optional
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_openai import ChatOpenAI
+from langgraph.config import get_config
 from langgraph.graph import StateGraph, END
 from langgraph.types import interrupt, Command
 import tiktoken
-from langgraph.checkpoint.memory import MemorySaver
 from knowledge_graph import KnowledgeGraph
 
 
-from state import State, save_design_snapshot, increment_iteration, log_error
+from checkpointer import open_checkpointer
+from llm_cache import LLMResponseCache
+from state import State, save_design_snapshot, increment_iteration, log_error, invalidate_story_validations
 
 # Import the new prompts
 from prompts import (
@@ -18,7 +22,7 @@ from prompts import (
     question_answer_integration_prompt,
     initial_system_design_prompt,
     component_refinement_prompt,
-    user_story_validation_prompt,
+    validate_user_stories_batch_prompt,
     system_improvement_prompt,
     final_architecture_assessment_prompt,
     architecture_refinement_prompt
@@ -31,6 +35,7 @@ from schemas import (
     InitialSystemDesignOutput,
     RefinedComponentsOutput,
     UserStoryValidationOutput,
+    UserStoryBatchValidationOutput,
     ImprovedSystemOutput,
     ArchitectureAssessmentOutput,
     RefinedArchitectureOutput,
@@ -38,6 +43,29 @@ from schemas import (
 
 llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=0)
 
+# Max number of concurrent user story validation calls
+VALIDATION_CONCURRENCY = int(os.getenv("VALIDATION_CONCURRENCY", 8))
+# Number of user stories validated in one LLM call
+STORIES_PER_VALIDATION = int(os.getenv("STORIES_PER_VALIDATION", 5))
+# Whether call_llm reuses cached responses, see llm_cache.py
+ENABLE_LLM_CACHE = os.getenv("LLM_CACHE", "true").lower() == "true"
+
+_llm_cache = None
+
+def get_llm_cache():
+    """The LLM response cache, opened on first use, or None if it is disabled."""
+    global _llm_cache
+    if ENABLE_LLM_CACHE and _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
+
+def _current_node(default: str) -> str:
+    """Name of the graph node calling the LLM, or default outside of the graph."""
+    try:
+        return get_config()["metadata"].get("langgraph_node", default)
+    except RuntimeError:
+        return default
+
 def count_tokens(prompt_text: str, completion_text: str = "", model_name: str = "gpt-4o-mini") -> int:
     encoder = tiktoken.get_encoding("cl100k_base")
     prompt_tokens = len(encoder.encode(prompt_text))
@@ -47,6 +75,7 @@ def count_tokens(prompt_text: str, completion_text: str = "", model_name: str =
 async def call_llm(prompt_template: str, input_data: Dict[str, Any], schema):
     """
     Calls the LLM with a prompt and parses the output using the specified Pydantic schema.
+    Responses are cached by model, rendered prompt and schema.
     Returns a tuple: (parsed_output, tokens_used).
     """
     parser = JsonOutputParser(pydantic_object=schema)
@@ -60,14 +89,23 @@ async def call_llm(prompt_template: str, input_data: Dict[str, Any], schema):
     text_input = {k: v for k, v in input_data.items() if isinstance(v, str)}
     prompt_text = prompt.format(**text_input)
 
+    cache = get_llm_cache()
+    if cache is not None:
+        key = LLMResponseCache.compute_key(llm.model_name, prompt_text, schema)
+        cached = await asyncio.to_thread(cache.get, key, _current_node(schema.__name__))
+        if cached is not None:
+            return cached
+
     # Chain the prompt -> LLM -> parser
     output_obj = await (prompt | llm | parser).ainvoke(text_input)
     completion_text = str(output_obj)
 
     tokens_used = count_tokens(prompt_text, completion_text)
+    if cache is not None:
+        await asyncio.to_thread(cache.put, key, output_obj, tokens_used)
     return output_obj, tokens_used
     
-async def process_initial_requirements(state: State) -> State:
+async def process_initial_requirements(state: State) -> Dict[str, Any]:
     """Process initial project description to extract requirements and user stories."""
     try:
         input_data = {
@@ -81,26 +119,27 @@ async def process_initial_requirements(state: State) -> State:
         )
         
         # Update state with the processed requirements and stories
-        new_state = state.copy()
-        new_state.generated_project_description = output.project_description
-        new_state.requirements = output.requirements
-        new_state.user_stories = output.user_stories
-        new_state.clarification_questions = output.clarification_questions or []
-        
-        return new_state
+        return {
+            "generated_project_description": output.project_description,
+            "requirements": output.requirements,
+            "user_stories": output.user_stories,
+            "clarification_questions": output.clarification_questions or []
+        }
     except Exception as e:
-        # Log error and return original state
+        # Log error and leave the rest of the state unchanged
         error_msg = f"Error in requirements analysis: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def integrate_customer_answers(state: State) -> State:
+async def integrate_customer_answers(state: State) -> Dict[str, Any]:
     """Integrate customer answers to clarification questions into requirements."""
+    questions = state.clarification_questions
+    if not questions:
+        return log_error("Error integrating customer answers: No clarification questions to integrate")
+    
+    # interrupt() pauses the run by raising, it must not be caught as a node error.
+    # The node restarts when the run is resumed and interrupt() returns the answers.
+    answer_by_question = interrupt({ "interrupt_type": "questions", "questions": questions})
     try:
-        questions = state.clarification_questions
-        if not questions:
-            raise ValueError("No clarification questions to integrate")
-        
-        answer_by_question = interrupt({ "interrupt_type": "questions", "questions": questions})
         if not answer_by_question.values():
             raise ValueError("No answers provided for clarification questions")
         
@@ -125,17 +164,16 @@ async def integrate_customer_answers(state: State) -> State:
         )
         
         # Update state
-        new_state = state.model_copy()
-        new_state.generated_project_description = output.project_description
-        new_state.requirements = output.requirements
-        new_state.user_stories = output.user_stories
-        
-        return new_state
+        return {
+            "generated_project_description": output.project_description,
+            "requirements": output.requirements,
+            "user_stories": output.user_stories
+        }
     except Exception as e:
         error_msg = f"Error integrating customer answers: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
     
-async def initialize_knowledge_graph(state: State) -> State:
+async def initialize_knowledge_graph(state: State) -> Dict[str, Any]:
     try:
         kg = KnowledgeGraph()
         await asyncio.gather(
@@ -144,15 +182,13 @@ async def initialize_knowledge_graph(state: State) -> State:
             *[kg.addRequirement() for requirement in state.requirements]
         )
 
-        new_state = state.model_copy()
-        new_state.knowledge_graph = kg
-        return new_state
+        return {"knowledge_graph": kg}
 
     except Exception as e:
         error_msg = f"Error initializing knowledge graph: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def create_initial_system_design(state: State) -> State:
+async def create_initial_system_design(state: State) -> Dict[str, Any]:
     """Create the initial system architecture design."""
     try:
         # Format user stories for prompt
@@ -170,18 +206,17 @@ async def create_initial_system_design(state: State) -> State:
             InitialSystemDesignOutput
         )
         
-        # Update state
-        new_state = state.model_copy()
-        new_state.system_description = output.system_description
-        new_state.components = output.components
-        
-        # Save initial design to history
-        return save_design_snapshot(new_state)
+        # Update state and save initial design to history
+        return {
+            "system_description": output.system_description,
+            "components": output.components,
+            **save_design_snapshot(state, output.system_description, output.components)
+        }
     except Exception as e:
         error_msg = f"Error creating initial design: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def refine_components(state: State) -> State:
+async def refine_components(state: State) -> Dict[str, Any]:
     """Refine components by breaking them down into sub-components."""
     try:
         # Format user stories for prompt
@@ -204,77 +239,112 @@ async def refine_components(state: State) -> State:
             RefinedComponentsOutput
         )
         
-        # Update state
-        new_state = save_design_snapshot(state)
-        new_state.system_description = output.system_description
-        new_state.components = output.components
-        new_state.needs_further_refinement = output.needs_further_refinement
-        
-        # Increment iteration counter
-        new_state = increment_iteration(new_state, "component_refinement")
-        
-        return new_state
+        # Save the current design to history, update it and increment the iteration counter
+        return {
+            **save_design_snapshot(state),
+            "system_description": output.system_description,
+            "components": output.components,
+            "needs_further_refinement": output.needs_further_refinement,
+            **increment_iteration(state, "component_refinement")
+        }
     except Exception as e:
         error_msg = f"Error refining components: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def validate_user_stories(state: State) -> State:
-    """Validate all user stories in parallel against the current system design."""
+async def _validate_story_batch(input_data: Dict[str, Any], stories: Dict[str, str], semaphore: asyncio.Semaphore) -> Dict[str, UserStoryValidationOutput]:
+    """
+    Validates a batch of user stories, keyed by story id, in a single LLM call.
+    Returns the validations of the stories found in the response, keyed by story id.
+    """
+    batch_input = {
+        **input_data,
+        "user_stories": "\n".join([f"{story_id}: {story}" for story_id, story in stories.items()])
+    }
+    async with semaphore:
+        output, _ = await call_llm(validate_user_stories_batch_prompt, batch_input, UserStoryBatchValidationOutput)
+
+    validations = {}
+    for validation in output.get("validations", []):
+        story_id = validation.get("story_id")
+        if story_id in stories and story_id not in validations:
+            fields = {k: v for k, v in validation.items() if k != "story_id"}
+            validations[story_id] = UserStoryValidationOutput.model_validate(fields)
+    return validations
+
+async def validate_user_stories(state: State) -> Dict[str, Any]:
+    """
+    Validate the user stories that have no validation for the current system design.
+    Validations kept by invalidate_story_validations are carried forward.
+    Stories are validated in batches of STORIES_PER_VALIDATION with at most
+    VALIDATION_CONCURRENCY calls in flight. All calls share the same prompt prefix.
+    """
     try:
         # Format component descriptions
         component_descriptions = "\n\n".join([f"{c.name}:\n{c.description} {c.technologies or ""}" for c in state.components])
         
-        # Process all user stories in parallel
-        validation_tasks = []
-        story_keys = []
-        
-        for story in state.user_stories:
-            story_key = story.formatted()
-            story_keys.append(story_key)
-                
-            input_data = {
-                "project_description": state.generated_project_description,
-                "requirements": "\n".join([f"- {r}" for r in state.requirements]),
-                "system_description": state.system_description,
-                "component_descriptions": component_descriptions,
-                "user_story": story_key
-            }
-            
-            validation_tasks.append(
-                call_llm(user_story_validation_prompt, input_data, UserStoryValidationOutput)
-            )
+        # Shared by all batches, rendered before the stories so it forms a cacheable prefix
+        input_data = {
+            "project_description": state.generated_project_description,
+            "requirements": "\n".join([f"- {r}" for r in state.requirements]),
+            "system_description": state.system_description,
+            "component_descriptions": component_descriptions,
+        }
         
-        # Run all validation tasks in parallel
-        validation_results = await asyncio.gather(*validation_tasks, return_exceptions=True)
+        story_keys = {f"US-{i + 1}": story.formatted() for i, story in enumerate(state.user_stories)}
+        # Only stories without a valid verdict for the current design are sent to the LLM
+        story_ids = [story_id for story_id, story in story_keys.items() if story not in state.story_validations]
+        semaphore = asyncio.Semaphore(VALIDATION_CONCURRENCY)
+        
+        batches = [
+            {story_id: story_keys[story_id] for story_id in story_ids[i:i + STORIES_PER_VALIDATION]}
+            for i in range(0, len(story_ids), STORIES_PER_VALIDATION)
+        ]
+        batch_results = await asyncio.gather(
+            *[_validate_story_batch(input_data, batch, semaphore) for batch in batches],
+            return_exceptions=True
+        )
         
-        # Update state with validation results
-        new_state = state.copy()
-        new_state.story_validations = {}  # Clear previous validations
+        # Stories of failed batches or left out of a response are retried one by one
+        validations = {}
+        for result in batch_results:
+            if not isinstance(result, Exception):
+                validations.update(result)
+        missing = [story_id for story_id in story_ids if story_id not in validations]
+        retry_results = await asyncio.gather(
+            *[_validate_story_batch(input_data, {story_id: story_keys[story_id]}, semaphore) for story_id in missing],
+            return_exceptions=True
+        )
         
-        # Check if we got validation results for all stories
-        all_validated = True
+        # Carry forward the validations of current stories that are still valid
+        current_stories = set(story_keys.values())
+        story_validations = {
+            story: validation for story, validation in state.story_validations.items()
+            if story in current_stories
+        }
+        errors = []
         
-        for i, result in enumerate(validation_results):
+        for story_id, result in zip(missing, retry_results):
             if isinstance(result, Exception):
                 # Handle error for this specific story
-                error_msg = f"Error validating story '{story_keys[i]}': {str(result)}"
-                new_state = log_error(new_state, error_msg)
-                all_validated = False
+                errors.append(f"Error validating story '{story_keys[story_id]}': {str(result)}")
+            elif story_id not in result:
+                errors.append(f"No validation returned for story '{story_keys[story_id]}'")
             else:
-                output, _ = result
-                story_key = story_keys[i]
-                new_state.story_validations[story_key] = output
+                validations[story_id] = result[story_id]
+        
+        for story_id, validation in validations.items():
+            story_validations[story_keys[story_id]] = validation
         
         # If we couldn't validate any stories, raise an error
-        if len(new_state.story_validations) == 0:
+        if len(story_validations) == 0:
             raise RuntimeError("Failed to validate any user stories")
             
-        return new_state
+        return {"story_validations": story_validations, "error_log": errors}
     except Exception as e:
         error_msg = f"Error in story validation: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def improve_system(state: State) -> State:
+async def improve_system(state: State) -> Dict[str, Any]:
     """Improve the system based on validation feedback."""
     try:
         # Format the validation feedback
@@ -305,24 +375,21 @@ async def improve_system(state: State) -> State:
             ImprovedSystemOutput
         )
         
-        # Update state
-        new_state = save_design_snapshot(state)
-        new_state.system_description = output.system_description
-        new_state.components = output.components
-        new_state.needs_further_refinement = output.needs_further_improvement  # Corrected field name
-        
-        # Since we've improved the system, we need to revalidate all user stories
-        new_state.story_validations = {}
-        
-        # Increment iteration counter
-        new_state = increment_iteration(new_state, "system_improvement")
-        
-        return new_state
+        # Save the current design to history, update it and increment the iteration counter.
+        # The stories that depend on changed components or were unsatisfied are revalidated.
+        return {
+            **save_design_snapshot(state),
+            "system_description": output.system_description,
+            "components": output.components,
+            "needs_further_refinement": output.needs_further_improvement,  # Corrected field name
+            **invalidate_story_validations(state, output.components),
+            **increment_iteration(state, "system_improvement")
+        }
     except Exception as e:
         error_msg = f"Error improving system: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def assess_architecture(state: State) -> State:
+async def assess_architecture(state: State) -> Dict[str, Any]:
     """Conduct a final assessment of the architecture."""
     try:
         # Format user stories for prompt
@@ -346,18 +413,16 @@ async def assess_architecture(state: State) -> State:
         )
         
         # Update state
-        new_state = state.copy()
-        new_state.assessment_result = output
-        
-        # The needs_further_refinement is derived from the assessment verdict
-        new_state.needs_further_refinement = (output.verdict == "Requires Further Refinement")
-        
-        return new_state
+        return {
+            "assessment_result": output,
+            # The needs_further_refinement is derived from the assessment verdict
+            "needs_further_refinement": output.verdict == "Requires Further Refinement"
+        }
     except Exception as e:
         error_msg = f"Error assessing architecture: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
-async def refine_architecture(state: State) -> State:
+async def refine_architecture(state: State) -> Dict[str, Any]:
     """Refine the architecture based on assessment findings."""
     try:
         if not state.assessment_result:
@@ -387,22 +452,19 @@ async def refine_architecture(state: State) -> State:
             RefinedArchitectureOutput
         )
         
-        # Update state
-        new_state = save_design_snapshot(state)
-        new_state.system_description = output.system_description
-        new_state.components = output.components
-        new_state.needs_further_refinement = output.needs_further_refinement
-        
-        # Since we've refined the architecture, clear validation results
-        new_state.story_validations = {}
-        
-        # Increment iteration counter
-        new_state = increment_iteration(new_state, "architecture_refinement")
-        
-        return new_state
+        # Save the current design to history, update it and increment the iteration counter.
+        # The stories that depend on changed components or were unsatisfied are revalidated.
+        return {
+            **save_design_snapshot(state),
+            "system_description": output.system_description,
+            "components": output.components,
+            "needs_further_refinement": output.needs_further_refinement,
+            **invalidate_story_validations(state, output.components),
+            **increment_iteration(state, "architecture_refinement")
+        }
     except Exception as e:
         error_msg = f"Error refining architecture: {str(e)}"
-        return log_error(state, error_msg)
+        return log_error(error_msg)
 
 # Edge condition functions - these determine the next step in the workflow
 
@@ -436,11 +498,9 @@ def check_validation_results(state: State) -> str:
     story_keys = {story.formatted() for story in state.user_stories}
     validation_keys = set(state.story_validations.keys())
     
-    # If we're missing validations, log an error and end
+    # If we're missing validations, record an error and end
     if not validation_keys.issuperset(story_keys):
-        missing = story_keys - validation_keys
-        state = log_error(state, f"Missing validation results for stories: {missing}")
-        return "error"
+        return "invalid_state"
     
     # Check if any stories are unsatisfied
     any_unsatisfied = any(
@@ -472,20 +532,27 @@ def check_architecture_outcome(state: State) -> str:
     
     # If no assessment result, exit with error
     if not state.assessment_result:
-        state = log_error(state, "Missing assessment result")
-        return "error"
+        return "invalid_state"
     
     # If architecture needs refinement and we haven't hit the limit
     if (state.needs_further_refinement and 
         state.iterations["architecture_refinement"] < 2):
         return "refine_architecture"
+    elif state.needs_further_refinement:
+        # We've hit max refinements but architecture still needs work, record this
+        return "invalid_state"
     else:
-        # If we've hit max refinements but architecture still needs work, log this
-        if (state.needs_further_refinement and 
-            state.iterations["architecture_refinement"] >= 2):
-            state = log_error(state, "Hit maximum architecture refinement iterations but still needs work")
         return "error"
 
+async def report_invalid_state(state: State) -> Dict[str, Any]:
+    """Record why a routing function ended the workflow, the edge functions can not update the state."""
+    missing = {story.formatted() for story in state.user_stories} - set(state.story_validations.keys())
+    if missing:
+        return log_error(f"Missing validation results for stories: {missing}")
+    if not state.assessment_result:
+        return log_error("Missing assessment result")
+    return log_error("Hit maximum architecture refinement iterations but still needs work")
+
 # Build the workflow graph
 def build_architecture_design_graph():
     """Create the LangGraph workflow for the architecture design process."""
@@ -503,6 +570,7 @@ def build_architecture_design_graph():
     # workflow.add_node("improve_system", improve_system)
     # workflow.add_node("final_assessment", assess_architecture)
     # workflow.add_node("refine_architecture", refine_architecture)
+    # workflow.add_node("report_invalid_state", report_invalid_state)
     
     # Add conditional edges with error handling
     workflow.add_conditional_edges(
@@ -552,6 +620,7 @@ def build_architecture_design_graph():
     #     {
     #         "improve_system": "improve_system",
     #         "final_assessment": "final_assessment",
+    #         "invalid_state": "report_invalid_state",
     #         "error": END
     #     }
     # )
@@ -571,6 +640,7 @@ def build_architecture_design_graph():
     #     check_architecture_outcome,
     #     {
     #         "refine_architecture": "refine_architecture",
+    #         "invalid_state": "report_invalid_state",
     #         "error": END
     #     }
     # )
@@ -581,62 +651,125 @@ def build_architecture_design_graph():
     #     {
     #         "improve_system": "improve_system", 
     #         "final_assessment": "final_assessment",
+    #         "invalid_state": "report_invalid_state",
     #         "error": END
     #     }
     # )
     
+    # workflow.add_edge("report_invalid_state", END)
+    
     # Set the entry point
     workflow.set_entry_point("initial_requirements")
     
     return workflow
 
+def project_thread_id(project_description: str) -> str:
+    """Checkpoint thread id of a project, derived from its description."""
+    return "project-" + hashlib.sha256(project_description.strip().encode("utf-8")).hexdigest()[:16]
+
+def _resume_input(snapshot, questions_and_answers: Dict[str, str]):
+    """
+    Input that continues a run from its last checkpoint: the answers to a pending
+    interrupt, or None to resume the nodes that did not finish.
+    """
+    interrupts = [i for task in snapshot.tasks for i in task.interrupts]
+    if not interrupts:
+        return None
+
+    request = interrupts[0].value
+    answers = {}
+    if request["interrupt_type"] == "questions":
+        for question in request["questions"]:
+            if question in questions_and_answers:
+                answers[question] = questions_and_answers[question]
+            else:
+                print(f"Question: {question}")
+                answers[question] = input("Answer: ")
+    return Command(resume=answers)
+
+async def _checkpoint_before_error(app, thread_config) -> Optional[Dict[str, Any]]:
+    """
+    Config of the latest checkpoint of a failed run before a node logged an error,
+    resuming from it runs the failed node again.
+    """
+    async for snapshot in app.aget_state_history(thread_config):
+        if snapshot.next and not snapshot.values.get("error_log"):
+            return snapshot.config
+    return None
+
 # Entry point function to execute the workflow
-async def design_system_architecture(project_description: str, questions_and_answers: Dict[str, str] = None):
+async def design_system_architecture(
+    project_description: str,
+    questions_and_answers: Dict[str, str] = None,
+    project_id: Optional[str] = None,
+    restart: bool = False
+):
     """
     Execute the architecture design workflow for a given project description.
     
+    Progress is checkpointed after every node in the CHECKPOINT_DB SQLite database.
+    Calling this again for the same project resumes an interrupted run from its
+    last checkpoint, so completed LLM nodes are not repeated, and returns the
+    saved result of a run that finished without errors. A run that ended on an
+    error is resumed from the checkpoint before the failed node.
+    
     Args:
         project_description: The free-form project description from the customer
-        questions_and_answers: Optional dictionary of answers to clarification questions
+        questions_and_answers: Optional dictionary of answers to clarification questions,
+            questions missing from it are asked on the console
+        project_id: Optional checkpoint thread id, derived from the project description by default
+        restart: Discard the saved checkpoints of the project and start a new run
         
     Returns:
         The final state of the workflow
     """
+    questions_and_answers = questions_and_answers or {}
+    
     # Create initial state
     initial_state = State(
         project_description=project_description,
-        questions_and_answers=questions_and_answers or {}
+        questions_and_answers=questions_and_answers
     )
     
-    # Build and compile the workflow
+    # Build the workflow
     workflow = build_architecture_design_graph()
-    thread_config = {"configurable": {"thread_id": "1"}}
-    checkpointer = MemorySaver()
-    app = workflow.compile(checkpointer=checkpointer)
+    thread_config = {"configurable": {"thread_id": project_id or project_thread_id(project_description)}}
     
     # Execute the workflow
     try:
-        result = await app.ainvoke(initial_state, config=thread_config)
-        state = app.get_state(thread_config)
-        tasks = state.tasks[0].interrupts[0].value
-
-        final_state = None
-
-        if tasks["interrupt_type"] == "questions":
-            answers = {}
-            for question in tasks["questions"]:
-                print(f"Question: {question}")
-                answer = input("Answer: ")
-                answers[question] = answer
-
-            final_state = await app.ainvoke(Command(resume=answer), config=thread_config)
-        else:
-            final_state = result
-        
-
-
-        return final_state
+        async with open_checkpointer() as checkpointer:
+            app = workflow.compile(checkpointer=checkpointer)
+            
+            if restart:
+                await checkpointer.adelete_thread(thread_config["configurable"]["thread_id"])
+            
+            # Start a new run, or continue the previous run of this project
+            snapshot = await app.aget_state(thread_config)
+            graph_input, run_config = initial_state, thread_config
+            if snapshot.next:
+                graph_input = _resume_input(snapshot, questions_and_answers)
+            elif snapshot.values:
+                if not snapshot.values.get("error_log"):
+                    return snapshot.values
+                # Retry the failed node, or start over if the first one failed
+                retry_config = await _checkpoint_before_error(app, thread_config)
+                if retry_config is not None:
+                    snapshot = await app.aget_state(retry_config)
+                    graph_input, run_config = _resume_input(snapshot, questions_and_answers), retry_config
+                else:
+                    await checkpointer.adelete_thread(thread_config["configurable"]["thread_id"])
+            
+            while True:
+                result = await app.ainvoke(graph_input, config=run_config)
+                run_config = thread_config
+                snapshot = await app.aget_state(thread_config)
+                if not snapshot.next:
+                    return result
+                graph_input = _resume_input(snapshot, questions_and_answers)
     except Exception as e:
         # Handle any top-level errors
-        error_state = log_error(initial_state, f"Workflow execution failed: {str(e)}")
-        return error_state
\ No newline at end of file
+        error_state = initial_state.model_copy(update=log_error(f"Workflow execution failed: {str(e)}"))
+        return error_state
+    finally:
+        if _llm_cache is not None:
+            _llm_cache.log_stats()
@@ -0,0 +1,52 @@
+import os
+import zlib
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Tuple
+
+import aiosqlite
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from pydantic import BaseModel
+
+import schemas
+import state
+
+# SQLite database the workflow checkpoints are stored in
+CHECKPOINT_DB = os.getenv("CHECKPOINT_DB", "checkpoints.sqlite")
+# Serialized values smaller than this are stored uncompressed
+CHECKPOINT_COMPRESSION_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESSION_MIN_BYTES", 512))
+
+_COMPRESSED_SUFFIX = "+zlib"
+
+class CompressedSerializer(JsonPlusSerializer):
+    """
+    Serializer that zlib-compresses the msgpack/json output of JsonPlusSerializer.
+    The descriptions, user stories and validations in the state are mostly text,
+    which compresses well, and checkpoints are written after every node.
+    """
+
+    def __init__(self):
+        # The state and the schema models stored in it may be restored from checkpoints
+        super().__init__(allowed_msgpack_modules=[
+            (cls.__module__, cls.__name__) for module in (schemas, state) for cls in vars(module).values()
+            if isinstance(cls, type) and issubclass(cls, BaseModel) and cls.__module__ == module.__name__
+        ])
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if len(data) < CHECKPOINT_COMPRESSION_MIN_BYTES:
+            return type_, data
+        return type_ + _COMPRESSED_SUFFIX, zlib.compress(data)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(_COMPRESSED_SUFFIX):
+            return super().loads_typed((type_[:-len(_COMPRESSED_SUFFIX)], zlib.decompress(payload)))
+        return super().loads_typed(data)
+
+@asynccontextmanager
+async def open_checkpointer(path: str = CHECKPOINT_DB) -> AsyncIterator[AsyncSqliteSaver]:
+    """Open the durable checkpointer stored in the SQLite database at path."""
+    async with aiosqlite.connect(path) as conn:
+        await conn.execute("PRAGMA journal_mode=WAL")
+        yield AsyncSqliteSaver(conn, serde=CompressedSerializer())
@@ -30,12 +30,14 @@ from lightrag.api.routers.document_routes import (
     DocumentManager,
     create_document_routes,
     run_scanning_process,
+    shutdown_document_parse_pool,
 )
 from lightrag.api.routers.query_routes import create_query_routes
 from lightrag.api.routers.graph_routes import create_graph_routes
 from lightrag.api.routers.ollama_api import OllamaAPI
 
-from lightrag.utils import logger, set_verbose_debug
+from lightrag.utils import logger, set_verbose_debug, shutdown_storage_client_executor
+from lightrag.kg.embedding_cache import get_embedding_cache_stats
 from lightrag.kg.shared_storage import (
     get_namespace_data,
     get_pipeline_status_lock,
@@ -166,8 +168,12 @@ def create_app(args):
             yield
 
         finally:
+            # Stop the document parse workers
+            shutdown_document_parse_pool()
             # Clean up database connections
             await rag.finalize_storages()
+            # Stop the storage client threads once no storage uses them
+            shutdown_storage_client_executor()
 
     # Initialize FastAPI
     app = FastAPI(
@@ -267,6 +273,7 @@ def create_app(args):
     embedding_func = EmbeddingFunc(
         embedding_dim=args.embedding_dim,
         max_token_size=args.max_embed_tokens,
+        model_name=f"{args.embedding_binding}:{args.embedding_model}",
         func=lambda texts: lollms_embed(
             texts,
             embed_model=args.embedding_model,
@@ -400,7 +407,7 @@ def create_app(args):
         # Get update flags status for all namespaces
         update_status = await get_all_update_flags_status()
 
-        return {
+        status = {
             "status": "healthy",
             "working_directory": str(args.working_dir),
             "input_directory": str(args.input_dir),
@@ -423,6 +430,25 @@ def create_app(args):
             "update_status": update_status,
         }
 
+        # Connection pool usage of PostgreSQL backed storages
+        if any(
+            storage.startswith("PG")
+            for storage in (
+                args.kv_storage,
+                args.doc_status_storage,
+                args.graph_storage,
+                args.vector_storage,
+            )
+        ):
+            from lightrag.kg.postgres_impl import ClientManager
+
+            status["postgres_pools"] = ClientManager.get_pool_stats()
+
+        # Hit and miss counters of the persistent embedding cache
+        status["embedding_cache"] = get_embedding_cache_stats()
+
+        return status
+
     # Webui mount webui/index.html
     static_dir = Path(__file__).parent / "webui"
     static_dir.mkdir(exist_ok=True)
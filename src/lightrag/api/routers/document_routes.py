@@ -4,10 +4,10 @@ This module contains all document-related routes for the LightRAG API.
 
 import asyncio
 from lightrag.utils import logger
-import aiofiles
 import shutil
 import traceback
 import pipmaster as pm
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Any
@@ -31,6 +31,10 @@ router = APIRouter(
 # Temporary file prefix
 temp_prefix = "__tmp__"
 
+# Worker processes that extract text from uploaded files, created on first use
+_document_parse_pool: Optional[ProcessPoolExecutor] = None
+_document_parse_slots: Optional[asyncio.Semaphore] = None
+
 
 class InsertTextRequest(BaseModel):
     text: str = Field(
@@ -167,9 +171,203 @@ class DocumentManager:
         return any(filename.lower().endswith(ext) for ext in self.supported_extensions)
 
 
+def extract_file_content(file_path: Path, document_loading_engine: str) -> str:
+    """Extract the text content of a file
+
+    Runs in a worker process of the document parse pool, so it must not touch
+    the event loop or any server state.
+
+    Args:
+        file_path: Path to the saved file
+        document_loading_engine: DOCLING or DEFAULT
+    Returns:
+        str: The extracted text, empty if nothing could be extracted
+    Raises:
+        ValueError: If the file is empty, not valid text or of an unsupported type
+    """
+    content = ""
+    ext = file_path.suffix.lower()
+
+    with open(file_path, "rb") as f:
+        file = f.read()
+
+    # Process based on file type
+    match ext:
+        case (
+            ".txt"
+            | ".md"
+            | ".html"
+            | ".htm"
+            | ".tex"
+            | ".json"
+            | ".xml"
+            | ".yaml"
+            | ".yml"
+            | ".rtf"
+            | ".odt"
+            | ".epub"
+            | ".csv"
+            | ".log"
+            | ".conf"
+            | ".ini"
+            | ".properties"
+            | ".sql"
+            | ".bat"
+            | ".sh"
+            | ".c"
+            | ".cpp"
+            | ".py"
+            | ".java"
+            | ".js"
+            | ".ts"
+            | ".swift"
+            | ".go"
+            | ".rb"
+            | ".php"
+            | ".css"
+            | ".scss"
+            | ".less"
+        ):
+            try:
+                # Try to decode as UTF-8
+                content = file.decode("utf-8")
+
+                # Validate content
+                if not content or len(content.strip()) == 0:
+                    raise ValueError(f"Empty content in file: {file_path.name}")
+
+                # Check if content looks like binary data string representation
+                if content.startswith("b'") or content.startswith('b"'):
+                    raise ValueError(
+                        f"File {file_path.name} appears to contain binary data representation instead of text"
+                    )
+
+            except UnicodeDecodeError:
+                raise ValueError(
+                    f"File {file_path.name} is not valid UTF-8 encoded text. Please convert it to UTF-8 before processing."
+                )
+        case ".pdf":
+            if document_loading_engine == "DOCLING":
+                if not pm.is_installed("docling"):  # type: ignore
+                    pm.install("docling")
+                from docling.document_converter import DocumentConverter
+
+                converter = DocumentConverter()
+                result = converter.convert(file_path)
+                content = result.document.export_to_markdown()
+            else:
+                if not pm.is_installed("pypdf2"):  # type: ignore
+                    pm.install("pypdf2")
+                from PyPDF2 import PdfReader  # type: ignore
+                from io import BytesIO
+
+                pdf_file = BytesIO(file)
+                reader = PdfReader(pdf_file)
+                for page in reader.pages:
+                    content += page.extract_text() + "\n"
+        case ".docx":
+            if document_loading_engine == "DOCLING":
+                if not pm.is_installed("docling"):  # type: ignore
+                    pm.install("docling")
+                from docling.document_converter import DocumentConverter
+
+                converter = DocumentConverter()
+                result = converter.convert(file_path)
+                content = result.document.export_to_markdown()
+            else:
+                if not pm.is_installed("python-docx"):  # type: ignore
+                    pm.install("docx")
+                from docx import Document  # type: ignore
+                from io import BytesIO
+
+                docx_file = BytesIO(file)
+                doc = Document(docx_file)
+                content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+        case ".pptx":
+            if document_loading_engine == "DOCLING":
+                if not pm.is_installed("docling"):  # type: ignore
+                    pm.install("docling")
+                from docling.document_converter import DocumentConverter
+
+                converter = DocumentConverter()
+                result = converter.convert(file_path)
+                content = result.document.export_to_markdown()
+            else:
+                if not pm.is_installed("python-pptx"):  # type: ignore
+                    pm.install("pptx")
+                from pptx import Presentation  # type: ignore
+                from io import BytesIO
+
+                pptx_file = BytesIO(file)
+                prs = Presentation(pptx_file)
+                for slide in prs.slides:
+                    for shape in slide.shapes:
+                        if hasattr(shape, "text"):
+                            content += shape.text + "\n"
+        case ".xlsx":
+            if document_loading_engine == "DOCLING":
+                if not pm.is_installed("docling"):  # type: ignore
+                    pm.install("docling")
+                from docling.document_converter import DocumentConverter
+
+                converter = DocumentConverter()
+                result = converter.convert(file_path)
+                content = result.document.export_to_markdown()
+            else:
+                if not pm.is_installed("openpyxl"):  # type: ignore
+                    pm.install("openpyxl")
+                from openpyxl import load_workbook  # type: ignore
+                from io import BytesIO
+
+                xlsx_file = BytesIO(file)
+                wb = load_workbook(xlsx_file)
+                for sheet in wb:
+                    content += f"Sheet: {sheet.title}\n"
+                    for row in sheet.iter_rows(values_only=True):
+                        content += (
+                            "\t".join(
+                                str(cell) if cell is not None else "" for cell in row
+                            )
+                            + "\n"
+                        )
+                    content += "\n"
+        case _:
+            raise ValueError(
+                f"Unsupported file type: {file_path.name} (extension {ext})"
+            )
+
+    return content
+
+
+def _get_document_parse_pool() -> tuple[ProcessPoolExecutor, asyncio.Semaphore]:
+    """Create the document parse pool on first use
+
+    The semaphore bounds the number of files submitted to the pool, so bulk
+    uploads queue up in the event loop instead of loading every file at once.
+    """
+    global _document_parse_pool, _document_parse_slots
+    if _document_parse_pool is None:
+        workers = max(global_args["main_args"].document_parse_workers, 1)
+        _document_parse_pool = ProcessPoolExecutor(max_workers=workers)
+        _document_parse_slots = asyncio.Semaphore(workers * 2)
+        logger.info(f"Document parse pool started with {workers} workers")
+    return _document_parse_pool, _document_parse_slots
+
+
+def shutdown_document_parse_pool():
+    """Stop the document parse pool, cancelling files that have not started"""
+    global _document_parse_pool, _document_parse_slots
+    if _document_parse_pool is not None:
+        _document_parse_pool.shutdown(wait=False, cancel_futures=True)
+        _document_parse_pool = None
+        _document_parse_slots = None
+
+
 async def pipeline_enqueue_file(rag: LightRAG, file_path: Path) -> bool:
     """Add a file to the queue for processing
 
+    The file is parsed in the document parse pool, off the event loop.
+
     Args:
         rag: LightRAG instance
         file_path: Path to the saved file
@@ -178,164 +376,31 @@ async def pipeline_enqueue_file(rag: LightRAG, file_path: Path) -> bool:
     """
 
     try:
-        content = ""
-        ext = file_path.suffix.lower()
-
-        file = None
-        async with aiofiles.open(file_path, "rb") as f:
-            file = await f.read()
-
-        # Process based on file type
-        match ext:
-            case (
-                ".txt"
-                | ".md"
-                | ".html"
-                | ".htm"
-                | ".tex"
-                | ".json"
-                | ".xml"
-                | ".yaml"
-                | ".yml"
-                | ".rtf"
-                | ".odt"
-                | ".epub"
-                | ".csv"
-                | ".log"
-                | ".conf"
-                | ".ini"
-                | ".properties"
-                | ".sql"
-                | ".bat"
-                | ".sh"
-                | ".c"
-                | ".cpp"
-                | ".py"
-                | ".java"
-                | ".js"
-                | ".ts"
-                | ".swift"
-                | ".go"
-                | ".rb"
-                | ".php"
-                | ".css"
-                | ".scss"
-                | ".less"
-            ):
-                try:
-                    # Try to decode as UTF-8
-                    content = file.decode("utf-8")
-
-                    # Validate content
-                    if not content or len(content.strip()) == 0:
-                        logger.error(f"Empty content in file: {file_path.name}")
-                        return False
-
-                    # Check if content looks like binary data string representation
-                    if content.startswith("b'") or content.startswith('b"'):
-                        logger.error(
-                            f"File {file_path.name} appears to contain binary data representation instead of text"
-                        )
-                        return False
+        args = global_args["main_args"]
+        pool, slots = _get_document_parse_pool()
+        await slots.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                pool, extract_file_content, file_path, args.document_loading_engine
+            )
+        except BaseException:
+            slots.release()
+            raise
+        # Keep the slot until the worker is really done, even after a timeout
+        future.add_done_callback(lambda _: slots.release())
 
-                except UnicodeDecodeError:
-                    logger.error(
-                        f"File {file_path.name} is not valid UTF-8 encoded text. Please convert it to UTF-8 before processing."
-                    )
-                    return False
-            case ".pdf":
-                if global_args["main_args"].document_loading_engine == "DOCLING":
-                    if not pm.is_installed("docling"):  # type: ignore
-                        pm.install("docling")
-                    from docling.document_converter import DocumentConverter
-
-                    converter = DocumentConverter()
-                    result = converter.convert(file_path)
-                    content = result.document.export_to_markdown()
-                else:
-                    if not pm.is_installed("pypdf2"):  # type: ignore
-                        pm.install("pypdf2")
-                    from PyPDF2 import PdfReader  # type: ignore
-                    from io import BytesIO
-
-                    pdf_file = BytesIO(file)
-                    reader = PdfReader(pdf_file)
-                    for page in reader.pages:
-                        content += page.extract_text() + "\n"
-            case ".docx":
-                if global_args["main_args"].document_loading_engine == "DOCLING":
-                    if not pm.is_installed("docling"):  # type: ignore
-                        pm.install("docling")
-                    from docling.document_converter import DocumentConverter
-
-                    converter = DocumentConverter()
-                    result = converter.convert(file_path)
-                    content = result.document.export_to_markdown()
-                else:
-                    if not pm.is_installed("python-docx"):  # type: ignore
-                        pm.install("docx")
-                    from docx import Document  # type: ignore
-                    from io import BytesIO
-
-                    docx_file = BytesIO(file)
-                    doc = Document(docx_file)
-                    content = "\n".join(
-                        [paragraph.text for paragraph in doc.paragraphs]
-                    )
-            case ".pptx":
-                if global_args["main_args"].document_loading_engine == "DOCLING":
-                    if not pm.is_installed("docling"):  # type: ignore
-                        pm.install("docling")
-                    from docling.document_converter import DocumentConverter
-
-                    converter = DocumentConverter()
-                    result = converter.convert(file_path)
-                    content = result.document.export_to_markdown()
-                else:
-                    if not pm.is_installed("python-pptx"):  # type: ignore
-                        pm.install("pptx")
-                    from pptx import Presentation  # type: ignore
-                    from io import BytesIO
-
-                    pptx_file = BytesIO(file)
-                    prs = Presentation(pptx_file)
-                    for slide in prs.slides:
-                        for shape in slide.shapes:
-                            if hasattr(shape, "text"):
-                                content += shape.text + "\n"
-            case ".xlsx":
-                if global_args["main_args"].document_loading_engine == "DOCLING":
-                    if not pm.is_installed("docling"):  # type: ignore
-                        pm.install("docling")
-                    from docling.document_converter import DocumentConverter
-
-                    converter = DocumentConverter()
-                    result = converter.convert(file_path)
-                    content = result.document.export_to_markdown()
-                else:
-                    if not pm.is_installed("openpyxl"):  # type: ignore
-                        pm.install("openpyxl")
-                    from openpyxl import load_workbook  # type: ignore
-                    from io import BytesIO
-
-                    xlsx_file = BytesIO(file)
-                    wb = load_workbook(xlsx_file)
-                    for sheet in wb:
-                        content += f"Sheet: {sheet.title}\n"
-                        for row in sheet.iter_rows(values_only=True):
-                            content += (
-                                "\t".join(
-                                    str(cell) if cell is not None else ""
-                                    for cell in row
-                                )
-                                + "\n"
-                            )
-                        content += "\n"
-            case _:
-                logger.error(
-                    f"Unsupported file type: {file_path.name} (extension {ext})"
-                )
-                return False
+        try:
+            content = await asyncio.wait_for(
+                asyncio.shield(future), timeout=args.document_parse_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.error(
+                f"Timed out after {args.document_parse_timeout}s extracting content from file: {file_path.name}"
+            )
+            return False
+        except ValueError as e:
+            logger.error(str(e))
+            return False
 
         # Insert into the RAG queue
         if content:
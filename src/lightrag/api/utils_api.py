@@ -370,6 +370,12 @@ def parse_args(is_uvicorn_mode: bool = False) -> argparse.Namespace:
     # Select Document loading tool (DOCLING, DEFAULT)
     args.document_loading_engine = get_env_value("DOCUMENT_LOADING_ENGINE", "DEFAULT")
 
+    # Worker processes and per-file timeout (seconds) for extracting document text
+    args.document_parse_workers = get_env_value(
+        "DOCUMENT_PARSE_WORKERS", min(4, os.cpu_count() or 1), int
+    )
+    args.document_parse_timeout = get_env_value("DOCUMENT_PARSE_TIMEOUT", 600, int)
+
     ollama_server_infos.LIGHTRAG_MODEL = args.simulated_model_name
 
     global_args["main_args"] = args
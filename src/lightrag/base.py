@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from enum import Enum
+import asyncio
 import os
 from dotenv import load_dotenv
 from dataclasses import dataclass, field
@@ -111,9 +112,26 @@ class BaseVectorStorage(StorageNameSpace, ABC):
 
     @abstractmethod
     async def query(
-        self, query: str, top_k: int, ids: list[str] | None = None
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
     ) -> list[dict[str, Any]]:
-        """Query the vector storage and retrieve top_k results."""
+        """Query the vector storage and retrieve top_k results.
+
+        query_embedding: Precomputed embedding of query, shared by the lookups
+        of one request. The query is embedded on demand when it is None.
+        """
+
+    async def embed_query(
+        self, query: str, query_embedding: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Embedding of query, reusing query_embedding when given"""
+        if query_embedding is not None:
+            return query_embedding
+        embedding = await self.embedding_func([query])
+        return embedding[0]
 
     @abstractmethod
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
@@ -237,6 +255,87 @@ class BaseGraphStorage(StorageNameSpace, ABC):
     ) -> KnowledgeGraph:
         """Retrieve a subgraph of the knowledge graph starting from a given node."""
 
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict[str, str]]:
+        """Get multiple nodes in one call.
+
+        The default implementation fans out to get_node; backends that can fetch
+        several nodes in a single round trip should override it.
+
+        Args:
+            node_ids: List of node ids to look up
+
+        Returns:
+            Mapping of node id to node properties, missing nodes are omitted
+        """
+        nodes = await asyncio.gather(*[self.get_node(node_id) for node_id in node_ids])
+        return {
+            node_id: node for node_id, node in zip(node_ids, nodes) if node is not None
+        }
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        """Get the degrees of multiple nodes in one call.
+
+        Args:
+            node_ids: List of node ids to look up
+
+        Returns:
+            Mapping of node id to degree, missing nodes have a degree of 0
+        """
+        degrees = await asyncio.gather(
+            *[self.node_degree(node_id) for node_id in node_ids]
+        )
+        return {node_id: degree or 0 for node_id, degree in zip(node_ids, degrees)}
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        """Get the degrees of multiple edges in one call.
+
+        Args:
+            edge_pairs: List of (source node id, target node id) tuples
+
+        Returns:
+            Mapping of (source, target) tuple to edge degree
+        """
+        degrees = await asyncio.gather(
+            *[self.edge_degree(src, tgt) for src, tgt in edge_pairs]
+        )
+        return {pair: degree or 0 for pair, degree in zip(edge_pairs, degrees)}
+
+    async def get_edges_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, str]]:
+        """Get multiple edges in one call.
+
+        Args:
+            edge_pairs: List of (source node id, target node id) tuples
+
+        Returns:
+            Mapping of (source, target) tuple to edge properties, missing edges are omitted
+        """
+        edges = await asyncio.gather(
+            *[self.get_edge(src, tgt) for src, tgt in edge_pairs]
+        )
+        return {pair: edge for pair, edge in zip(edge_pairs, edges) if edge is not None}
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        """Get the edges of multiple nodes in one call.
+
+        Args:
+            node_ids: List of node ids to look up
+
+        Returns:
+            Mapping of node id to its (source, target) edge tuples, missing nodes map to an empty list
+        """
+        edges = await asyncio.gather(
+            *[self.get_node_edges(node_id) for node_id in node_ids]
+        )
+        return {
+            node_id: node_edges or [] for node_id, node_edges in zip(node_ids, edges)
+        }
+
 
 class DocStatus(str, Enum):
     """Document processing status"""
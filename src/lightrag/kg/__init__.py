@@ -26,6 +26,7 @@ STORAGE_IMPLEMENTATIONS = {
     "VECTOR_STORAGE": {
         "implementations": [
             "NanoVectorDBStorage",
+            "MmapVectorDBStorage",
             "MilvusVectorDBStorage",
             "ChromaVectorDBStorage",
             "TiDBVectorDBStorage",
@@ -48,6 +49,10 @@ STORAGE_IMPLEMENTATIONS = {
     },
 }
 
+# KV storages that map each namespace to a fixed table. They can not store the
+# records of other namespaces, such as the document graph index
+FIXED_NAMESPACE_KV_STORAGES = ["TiDBKVStorage", "PGKVStorage", "OracleKVStorage"]
+
 # Storage implementation environment variable without default value
 STORAGE_ENV_REQUIREMENTS: dict[str, list[str]] = {
     # KV Storage Implementations
@@ -86,6 +91,7 @@ STORAGE_ENV_REQUIREMENTS: dict[str, list[str]] = {
     ],
     # Vector Storage Implementations
     "NanoVectorDBStorage": [],
+    "MmapVectorDBStorage": [],
     "MilvusVectorDBStorage": [],
     "ChromaVectorDBStorage": [],
     "TiDBVectorDBStorage": ["TIDB_USER", "TIDB_PASSWORD", "TIDB_DATABASE"],
@@ -110,6 +116,7 @@ STORAGES = {
     "NetworkXStorage": ".kg.networkx_impl",
     "JsonKVStorage": ".kg.json_kv_impl",
     "NanoVectorDBStorage": ".kg.nano_vector_db_impl",
+    "MmapVectorDBStorage": ".kg.mmap_vector_db_impl",
     "JsonDocStatusStorage": ".kg.json_doc_status_impl",
     "Neo4JStorage": ".kg.neo4j_impl",
     "OracleKVStorage": ".kg.oracle_impl",
@@ -4,7 +4,7 @@ from typing import Any, final
 import numpy as np
 
 from lightrag.base import BaseVectorStorage
-from lightrag.utils import logger
+from lightrag.utils import logger, run_blocking_io
 import pipmaster as pm
 
 if not pm.is_installed("chromadb"):
@@ -143,7 +143,8 @@ class ChromaVectorDBStorage(BaseVectorStorage):
             for i in range(0, len(ids), self._max_batch_size):
                 batch_slice = slice(i, i + self._max_batch_size)
 
-                self._collection.upsert(
+                await run_blocking_io(
+                    self._collection.upsert,
                     ids=ids[batch_slice],
                     embeddings=embeddings[batch_slice].tolist(),
                     documents=documents[batch_slice],
@@ -156,14 +157,21 @@ class ChromaVectorDBStorage(BaseVectorStorage):
             logger.error(f"Error during ChromaDB upsert: {str(e)}")
             raise
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
         try:
-            embedding = await self.embedding_func([query])
+            embedding = await self.embed_query(query, query_embedding)
 
-            results = self._collection.query(
-                query_embeddings=embedding.tolist()
-                if not isinstance(embedding, list)
-                else embedding,
+            results = await run_blocking_io(
+                self._collection.query,
+                query_embeddings=[
+                    embedding.tolist() if not isinstance(embedding, list) else embedding
+                ],
                 n_results=top_k * 2,  # Request more results to allow for filtering
                 include=["metadatas", "distances", "documents"],
             )
@@ -200,7 +208,7 @@ class ChromaVectorDBStorage(BaseVectorStorage):
         """
         try:
             logger.info(f"Deleting entity with ID {entity_name} from {self.namespace}")
-            self._collection.delete(ids=[entity_name])
+            await run_blocking_io(self._collection.delete, ids=[entity_name])
         except Exception as e:
             logger.error(f"Error during entity deletion: {str(e)}")
             raise
@@ -222,7 +230,7 @@ class ChromaVectorDBStorage(BaseVectorStorage):
         """
         try:
             logger.info(f"Deleting {len(ids)} vectors from {self.namespace}")
-            self._collection.delete(ids=ids)
+            await run_blocking_io(self._collection.delete, ids=ids)
             logger.debug(
                 f"Successfully deleted {len(ids)} vectors from {self.namespace}"
             )
@@ -243,8 +251,8 @@ class ChromaVectorDBStorage(BaseVectorStorage):
             # Get all records from the collection
             # Since ChromaDB doesn't directly support prefix search on IDs,
             # we'll get all records and filter in Python
-            results = self._collection.get(
-                include=["metadatas", "documents", "embeddings"]
+            results = await run_blocking_io(
+                self._collection.get, include=["metadatas", "documents", "embeddings"]
             )
 
             matching_records = []
@@ -281,8 +289,10 @@ class ChromaVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Query the collection for a single vector by ID
-            result = self._collection.get(
-                ids=[id], include=["metadatas", "embeddings", "documents"]
+            result = await run_blocking_io(
+                self._collection.get,
+                ids=[id],
+                include=["metadatas", "embeddings", "documents"],
             )
 
             if not result or not result["ids"] or len(result["ids"]) == 0:
@@ -313,8 +323,10 @@ class ChromaVectorDBStorage(BaseVectorStorage):
 
         try:
             # Query the collection for multiple vectors by IDs
-            result = self._collection.get(
-                ids=ids, include=["metadatas", "embeddings", "documents"]
+            result = await run_blocking_io(
+                self._collection.get,
+                ids=ids,
+                include=["metadatas", "embeddings", "documents"],
             )
 
             if not result or not result["ids"] or len(result["ids"]) == 0:
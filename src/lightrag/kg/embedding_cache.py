@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+from hashlib import md5
+from typing import Any
+
+import numpy as np
+
+from lightrag.utils import logger
+
+# Max number of keys looked up in one SQL statement
+_LOOKUP_BATCH_SIZE = 500
+
+# file name -> cache, shared by all LightRAG instances of the process
+_caches: dict[str, "EmbeddingCache"] = {}
+_caches_lock = threading.Lock()
+
+
+class EmbeddingCache:
+    """Persistent content-addressed cache of embedding vectors.
+
+    Vectors are stored as float32 blobs in a SQLite database keyed by the
+    embedding model and the md5 digest of the embedded text, so a text is
+    embedded once per model no matter how often it is upserted or re-indexed.
+    The database runs in WAL mode and can be shared by several processes.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            file_name, timeout=30, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, hash BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, hash)) WITHOUT ROWID"
+        )
+
+    @staticmethod
+    def _hash(text: str) -> bytes:
+        return md5(text.encode("utf-8")).digest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[np.ndarray | None]:
+        """Return the cached vector of each text, or None where it is missing"""
+        hashes = [self._hash(text) for text in texts]
+        found: dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for i in range(0, len(hashes), _LOOKUP_BATCH_SIZE):
+                batch = hashes[i : i + _LOOKUP_BATCH_SIZE]
+                rows = self._conn.execute(
+                    "SELECT hash, vector FROM embeddings WHERE model = ? "
+                    f"AND hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+            vectors = [found.get(key) for key in hashes]
+            hits = sum(vector is not None for vector in vectors)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model: str, texts: list[str], vectors: np.ndarray) -> None:
+        """Store the vectors of texts computed by model"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rows = [
+            (model, self._hash(text), vector.tobytes())
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, hash, vector) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get_stats(self) -> dict[str, Any]:
+        """Hit and miss counters of this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "file": self.file_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # Shared instead of copied when asdict(LightRAG) copies the embedding func
+        return self
+
+
+def get_embedding_cache(working_dir: str) -> EmbeddingCache:
+    """Get the embedding cache stored in working_dir, opening it on first use"""
+    file_name = os.path.abspath(os.path.join(working_dir, "embedding_cache.sqlite"))
+    with _caches_lock:
+        cache = _caches.get(file_name)
+        if cache is None:
+            cache = EmbeddingCache(file_name)
+            _caches[file_name] = cache
+            logger.info(f"Embedding cache: {file_name}")
+        return cache
+
+
+def get_embedding_cache_stats() -> list[dict[str, Any]]:
+    """Hit and miss counters of every embedding cache opened by this process"""
+    with _caches_lock:
+        caches = list(_caches.values())
+    return [cache.get_stats() for cache in caches]
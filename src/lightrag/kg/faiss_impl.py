@@ -16,7 +16,7 @@ if not pm.is_installed("faiss"):
 
 import faiss  # type: ignore
 from .shared_storage import (
-    get_storage_lock,
+    get_storage_rw_lock,
     get_update_flag,
     set_all_update_flags,
     is_multiprocess,
@@ -29,6 +29,17 @@ class FaissVectorDBStorage(BaseVectorStorage):
     """
     A Faiss-based Vector DB Storage for LightRAG.
     Uses cosine similarity by storing normalized vectors in a Faiss index with inner product search.
+
+    Vectors are added under stable int64 Faiss ids, so lookups by custom ID go
+    through an in-memory reverse map and deletions use the native ``remove_ids``.
+    The index type is chosen with ``faiss_index_type`` in vector_db_storage_cls_kwargs:
+
+    - ``flat`` (default): exact search with IndexFlatIP
+    - ``ivf``: IndexIVFFlat, trained once ``faiss_ivf_train_size`` vectors exist
+      (flat search is used until then); tuned with ``faiss_nlist`` and ``faiss_nprobe``
+    - ``hnsw``: IndexHNSWFlat, tuned with ``faiss_hnsw_m`` and ``faiss_hnsw_ef_search``;
+      HNSW cannot remove vectors, so deleted ids are filtered out of searches and the
+      graph is rebuilt when saving once they exceed ``faiss_hnsw_max_dead_ratio``
     """
 
     def __post_init__(self):
@@ -41,6 +52,19 @@ class FaissVectorDBStorage(BaseVectorStorage):
             )
         self.cosine_better_than_threshold = cosine_threshold
 
+        self._index_type = kwargs.get("faiss_index_type", "flat")
+        if self._index_type not in ("flat", "ivf", "hnsw"):
+            raise ValueError(
+                f"Unsupported faiss_index_type {self._index_type}, expected flat, ivf or hnsw"
+            )
+        self._nlist = kwargs.get("faiss_nlist", 1024)
+        self._nprobe = kwargs.get("faiss_nprobe", 16)
+        # Faiss recommends at least 39 training points per IVF list
+        self._ivf_train_size = kwargs.get("faiss_ivf_train_size", self._nlist * 39)
+        self._hnsw_m = kwargs.get("faiss_hnsw_m", 32)
+        self._hnsw_ef_search = kwargs.get("faiss_hnsw_ef_search", 64)
+        self._hnsw_max_dead_ratio = kwargs.get("faiss_hnsw_max_dead_ratio", 0.2)
+
         # Where to save index file if you want persistent storage
         self._faiss_index_file = os.path.join(
             self.global_config["working_dir"], f"faiss_index_{self.namespace}.index"
@@ -52,12 +76,17 @@ class FaissVectorDBStorage(BaseVectorStorage):
         self._dim = self.embedding_func.embedding_dim
 
         # Create an empty Faiss index for inner product (useful for normalized vectors = cosine similarity).
-        # If you have a large number of vectors, you might want IVF or other indexes.
-        # For demonstration, we use a simple IndexFlatIP.
-        self._index = faiss.IndexFlatIP(self._dim)
+        self._index = self._new_index(self._initial_index_type())
         # Keep a local store for metadata, IDs, etc.
         # Maps <int faiss_id> → metadata (including your original ID).
         self._id_to_meta = {}
+        # Reverse map <custom id> → <int faiss_id>
+        self._custom_id_to_fid = {}
+        # Faiss ids are never reused, so removals do not shift other vectors
+        self._next_fid = 0
+        # Faiss ids removed from the metadata but still in an HNSW graph
+        self._dead_fids = set()
+        self._search_params = None
 
         self._load_faiss_index()
 
@@ -66,7 +95,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = (await get_storage_rw_lock(self.namespace)).writer()
 
     async def _get_index(self):
         """Check if the shtorage should be reloaded"""
@@ -80,8 +109,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
                     f"Process {os.getpid()} FAISS reloading {self.namespace} due to update by another process"
                 )
                 # Reload data
-                self._index = faiss.IndexFlatIP(self._dim)
-                self._id_to_meta = {}
+                self._reset_index()
                 self._load_faiss_index()
                 if is_multiprocess:
                     self.storage_updated.value = False
@@ -148,7 +176,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         # 2. Remove them
         # 3. Add the new vectors
         existing_ids_to_remove = []
-        for meta, emb in zip(list_data, embeddings):
+        for meta in list_data:
             faiss_internal_id = self._find_faiss_id_by_custom_id(meta["__id__"])
             if faiss_internal_id is not None:
                 existing_ids_to_remove.append(faiss_internal_id)
@@ -156,28 +184,38 @@ class FaissVectorDBStorage(BaseVectorStorage):
         if existing_ids_to_remove:
             await self._remove_faiss_ids(existing_ids_to_remove)
 
-        # Step 2: Add new vectors
-        index = await self._get_index()
-        start_idx = index.ntotal
-        index.add(embeddings)
+        # Step 2: Add new vectors under fresh Faiss ids
+        await self._get_index()
+        async with self._storage_lock:
+            fids = np.arange(
+                self._next_fid, self._next_fid + len(list_data), dtype=np.int64
+            )
+            self._next_fid += len(list_data)
+            self._index.add_with_ids(embeddings, fids)
 
-        # Step 3: Store metadata + vector for each new ID
-        for i, meta in enumerate(list_data):
-            fid = start_idx + i
-            # Store the raw vector so we can rebuild if something is removed
-            meta["__vector__"] = embeddings[i].tolist()
-            self._id_to_meta.update({fid: meta})
+            # Step 3: Store metadata for each new ID
+            for fid, meta in zip(fids.tolist(), list_data):
+                self._id_to_meta[fid] = meta
+                self._custom_id_to_fid[meta["__id__"]] = fid
+
+            self._maybe_train_ivf()
 
         logger.info(f"Upserted {len(list_data)} vectors into Faiss index.")
         return [m["__id__"] for m in list_data]
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
         """
         Search by a textual query; returns top_k results with their metadata + similarity distance.
         """
-        embedding = await self.embedding_func([query])
+        embedding = await self.embed_query(query, query_embedding)
         # embedding is shape (1, dim)
-        embedding = np.array(embedding, dtype=np.float32)
+        embedding = np.array([embedding], dtype=np.float32)
         faiss.normalize_L2(embedding)  # we do in-place normalization
 
         logger.info(
@@ -186,14 +224,16 @@ class FaissVectorDBStorage(BaseVectorStorage):
 
         # Perform the similarity search
         index = await self._get_index()
-        distances, indices = index.search(embedding, top_k)
+        distances, indices = index.search(
+            embedding, top_k, params=self._get_search_params()
+        )
 
         distances = distances[0]
         indices = indices[0]
 
         results = []
         for dist, idx in zip(distances, indices):
-            if idx == -1:
+            if idx == -1 or idx not in self._id_to_meta:
                 # Faiss returns -1 if no neighbor
                 continue
 
@@ -259,39 +299,147 @@ class FaissVectorDBStorage(BaseVectorStorage):
     # Internal helper methods
     # --------------------------------------------------------------------------------
 
+    def _new_index(self, index_type: str | None = None):
+        """
+        Create an empty index of the configured type that accepts explicit int64 ids.
+        """
+        index_type = index_type or self._index_type
+        if index_type == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(
+                self._dim, self._hnsw_m, faiss.METRIC_INNER_PRODUCT
+            )
+            hnsw.hnsw.efSearch = self._hnsw_ef_search
+            return faiss.IndexIDMap2(hnsw)
+        if index_type == "ivf":
+            # IVF indexes store ids natively; the hashtable direct map enables
+            # remove_ids and reconstruct by Faiss id
+            quantizer = faiss.IndexFlatIP(self._dim)
+            ivf = faiss.IndexIVFFlat(
+                quantizer, self._dim, self._nlist, faiss.METRIC_INNER_PRODUCT
+            )
+            ivf.nprobe = self._nprobe
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return ivf
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self._dim))
+
+    def _initial_index_type(self) -> str:
+        # IVF needs training data, so it starts out as exact flat search
+        return "hnsw" if self._index_type == "hnsw" else "flat"
+
+    def _index_kind(self, index) -> str | None:
+        """
+        Return the kind of a loaded index, or None for legacy positional indexes.
+        """
+        if isinstance(index, faiss.IndexIVF):
+            return "ivf"
+        if isinstance(index, faiss.IndexIDMap2):
+            if isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW):
+                return "hnsw"
+            return "flat"
+        return None
+
+    def _is_hnsw(self) -> bool:
+        return isinstance(self._index, faiss.IndexIDMap2) and isinstance(
+            faiss.downcast_index(self._index.index), faiss.IndexHNSW
+        )
+
+    def _reset_index(self):
+        self._index = self._new_index(self._initial_index_type())
+        self._id_to_meta = {}
+        self._custom_id_to_fid = {}
+        self._next_fid = 0
+        self._dead_fids = set()
+        self._search_params = None
+
+    def _get_search_params(self):
+        """
+        Search parameters that skip the dead vectors of an HNSW graph, or None.
+        """
+        if not self._dead_fids:
+            return None
+        if self._search_params is None:
+            dead = np.array(sorted(self._dead_fids), dtype=np.int64)
+            selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(dead))
+            self._search_params = faiss.SearchParametersHNSW(
+                sel=selector, efSearch=self._hnsw_ef_search
+            )
+            # The parameters only hold raw pointers to the selectors
+            self._search_params.selectors = (selector, selector.sel)
+        return self._search_params
+
+    def _maybe_compact_hnsw(self):
+        """
+        Rebuild the HNSW graph without dead vectors once they exceed the allowed ratio.
+        """
+        if not self._dead_fids or len(self._dead_fids) <= (
+            self._hnsw_max_dead_ratio * self._index.ntotal
+        ):
+            return
+        logger.info(
+            f"Rebuilding HNSW index for {self.namespace} without {len(self._dead_fids)} deleted vectors"
+        )
+        self._rebuild_index(self._new_index("hnsw"), list(self._id_to_meta))
+
+    def _reconstruct(self, fids: list[int]) -> np.ndarray:
+        """
+        Read the stored vectors for a list of Faiss IDs back from the index.
+        """
+        if not fids:
+            return np.zeros((0, self._dim), dtype=np.float32)
+        return self._index.reconstruct_batch(np.array(fids, dtype=np.int64))
+
+    def _rebuild_index(self, index, fids: list[int]):
+        """
+        Move the vectors of the given Faiss IDs from the current index into index.
+        """
+        vectors = self._reconstruct(fids)
+        if isinstance(index, faiss.IndexIVF) and not index.is_trained:
+            index.train(vectors)
+        if fids:
+            index.add_with_ids(vectors, np.array(fids, dtype=np.int64))
+        self._index = index
+        self._dead_fids = set()
+        self._search_params = None
+
+    def _maybe_train_ivf(self):
+        """
+        Switch from flat search to a trained IVF index once enough vectors exist.
+        """
+        if (
+            self._index_type != "ivf"
+            or isinstance(self._index, faiss.IndexIVF)
+            or self._index.ntotal < max(self._ivf_train_size, self._nlist)
+        ):
+            return
+        logger.info(
+            f"Training IVF index with {self._index.ntotal} vectors for {self.namespace}"
+        )
+        self._rebuild_index(self._new_index("ivf"), list(self._id_to_meta))
+
     def _find_faiss_id_by_custom_id(self, custom_id: str):
         """
         Return the Faiss internal ID for a given custom ID, or None if not found.
         """
-        for fid, meta in self._id_to_meta.items():
-            if meta.get("__id__") == custom_id:
-                return fid
-        return None
+        return self._custom_id_to_fid.get(custom_id)
 
     async def _remove_faiss_ids(self, fid_list):
         """
         Remove a list of internal Faiss IDs from the index.
-        Because IndexFlatIP doesn't support 'removals',
-        we rebuild the index excluding those vectors.
         """
-        keep_fids = [fid for fid in self._id_to_meta if fid not in fid_list]
-
-        # Rebuild the index
-        vectors_to_keep = []
-        new_id_to_meta = {}
-        for new_fid, old_fid in enumerate(keep_fids):
-            vec_meta = self._id_to_meta[old_fid]
-            vectors_to_keep.append(vec_meta["__vector__"])  # stored as list
-            new_id_to_meta[new_fid] = vec_meta
-
+        remove = set(fid_list)
         async with self._storage_lock:
-            # Re-init index
-            self._index = faiss.IndexFlatIP(self._dim)
-            if vectors_to_keep:
-                arr = np.array(vectors_to_keep, dtype=np.float32)
-                self._index.add(arr)
-
-            self._id_to_meta = new_id_to_meta
+            if self._is_hnsw():
+                # HNSW graphs don't support removals, leave the vectors as
+                # tombstones that searches skip until the graph is rebuilt
+                self._dead_fids.update(remove & self._id_to_meta.keys())
+                self._search_params = None
+            else:
+                self._index.remove_ids(np.array(list(remove), dtype=np.int64))
+
+            for fid in remove:
+                meta = self._id_to_meta.pop(fid, None)
+                if meta is not None:
+                    self._custom_id_to_fid.pop(meta.get("__id__"), None)
 
     def _save_faiss_index(self):
         """
@@ -300,7 +448,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         faiss.write_index(self._index, self._faiss_index_file)
 
         # Save metadata dict to JSON. Convert all keys to strings for JSON storage.
-        # _id_to_meta is { int: { '__id__': doc_id, '__vector__': [float,...], ... } }
+        # _id_to_meta is { int: { '__id__': doc_id, ... } }, vectors live in the index only.
         # We'll keep the int -> dict, but JSON requires string keys.
         serializable_dict = {}
         for fid, meta in self._id_to_meta.items():
@@ -330,6 +478,55 @@ class FaissVectorDBStorage(BaseVectorStorage):
             for fid_str, meta in stored_dict.items():
                 fid = int(fid_str)
                 self._id_to_meta[fid] = meta
+            self._custom_id_to_fid = {
+                meta["__id__"]: fid for fid, meta in self._id_to_meta.items()
+            }
+            self._next_fid = max(self._id_to_meta, default=-1) + 1
+            self._dead_fids = set()
+            self._search_params = None
+
+            kind = self._index_kind(self._index)
+            if kind is None:
+                # Indexes written before explicit ids were positional, so the
+                # Faiss id of a vector is its position in the old index
+                legacy_index = self._index
+                self._index = self._new_index("flat")
+                if legacy_index.ntotal:
+                    fids = np.arange(legacy_index.ntotal, dtype=np.int64)
+                    self._index.add_with_ids(
+                        legacy_index.reconstruct_n(0, legacy_index.ntotal), fids
+                    )
+                kind = "flat"
+                logger.info(f"Migrated legacy Faiss index for {self.namespace}")
+            for meta in self._id_to_meta.values():
+                # Drop the float lists older versions duplicated into the metadata
+                meta.pop("__vector__", None)
+
+            if kind != self._index_type and not (
+                kind == "flat" and self._index_type == "ivf"
+            ):
+                logger.info(
+                    f"Rebuilding Faiss index for {self.namespace} from {kind} to {self._index_type}"
+                )
+                self._rebuild_index(
+                    self._new_index(self._initial_index_type()),
+                    list(self._id_to_meta),
+                )
+            elif kind == "ivf":
+                self._index.nprobe = self._nprobe
+            elif kind == "hnsw":
+                faiss.downcast_index(
+                    self._index.index
+                ).hnsw.efSearch = self._hnsw_ef_search
+                # Vectors deleted since the graph was last rebuilt
+                self._dead_fids = (
+                    set(faiss.vector_to_array(self._index.id_map).tolist())
+                    - self._id_to_meta.keys()
+                )
+                self._next_fid = max(
+                    self._next_fid, max(self._dead_fids, default=-1) + 1
+                )
+            self._maybe_train_ivf()
 
             logger.info(
                 f"Faiss index loaded with {self._index.ntotal} vectors from {self._faiss_index_file}"
@@ -337,8 +534,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         except Exception as e:
             logger.error(f"Failed to load Faiss index or metadata: {e}")
             logger.warning("Starting with an empty Faiss index.")
-            self._index = faiss.IndexFlatIP(self._dim)
-            self._id_to_meta = {}
+            self._reset_index()
 
     async def index_done_callback(self) -> None:
         # Check if storage was updated by another process
@@ -348,8 +544,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
                 f"Storage for FAISS {self.namespace} was updated by another process, reloading..."
             )
             async with self._storage_lock:
-                self._index = faiss.IndexFlatIP(self._dim)
-                self._id_to_meta = {}
+                self._reset_index()
                 self._load_faiss_index()
                 self.storage_updated.value = False
             return False  # Return error
@@ -357,6 +552,7 @@ class FaissVectorDBStorage(BaseVectorStorage):
         # Acquire lock and perform persistence
         async with self._storage_lock:
             try:
+                self._maybe_compact_hnsw()
                 # Save data to disk
                 self._save_faiss_index()
                 # Notify other processes that data has been updated
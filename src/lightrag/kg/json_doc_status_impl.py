@@ -8,19 +8,19 @@ from lightrag.base import (
     DocStatusStorage,
 )
 from lightrag.utils import (
-    load_json,
     logger,
     write_json,
 )
 from .shared_storage import (
     get_namespace_data,
-    get_storage_lock,
+    get_storage_rw_lock,
     get_data_init_lock,
     get_update_flag,
     set_all_update_flags,
     clear_all_update_flags,
     try_initialize_namespace,
 )
+from .json_log import JSON_STORAGE_APPEND_LOG, JsonStorageLog, diff_changes
 
 
 @final
@@ -34,18 +34,23 @@ class JsonDocStatusStorage(DocStatusStorage):
         self._data = None
         self._storage_lock = None
         self.storage_updated = None
+        self._storage_log = JsonStorageLog(self._file_name)
+        # Keys changed since the last flush, only tracked in append log mode
+        self._changes = None
 
     async def initialize(self):
         """Initialize storage data"""
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = await get_storage_rw_lock(self.namespace)
         self.storage_updated = await get_update_flag(self.namespace)
+        if JSON_STORAGE_APPEND_LOG:
+            self._changes = await get_namespace_data(f"{self.namespace}_changes")
         async with get_data_init_lock():
             # check need_init must before get_namespace_data
             need_init = await try_initialize_namespace(self.namespace)
             self._data = await get_namespace_data(self.namespace)
             if need_init:
-                loaded_data = load_json(self._file_name) or {}
-                async with self._storage_lock:
+                loaded_data = self._storage_log.load() or {}
+                async with self._storage_lock.writer():
                     self._data.update(loaded_data)
                     logger.info(
                         f"Process {os.getpid()} doc status load {self.namespace} with {len(loaded_data)} records"
@@ -53,12 +58,12 @@ class JsonDocStatusStorage(DocStatusStorage):
 
     async def filter_keys(self, keys: set[str]) -> set[str]:
         """Return keys that should be processed (not in storage or not successfully processed)"""
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             return set(keys) - set(self._data.keys())
 
     async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
         result: list[dict[str, Any]] = []
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             for id in ids:
                 data = self._data.get(id, None)
                 if data:
@@ -68,7 +73,7 @@ class JsonDocStatusStorage(DocStatusStorage):
     async def get_status_counts(self) -> dict[str, int]:
         """Get counts of documents in each status"""
         counts = {status.value: 0 for status in DocStatus}
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             for doc in self._data.values():
                 counts[doc["status"]] += 1
         return counts
@@ -78,7 +83,7 @@ class JsonDocStatusStorage(DocStatusStorage):
     ) -> dict[str, DocProcessingStatus]:
         """Get all documents with a specific status"""
         result = {}
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             for k, v in self._data.items():
                 if v["status"] == status.value:
                     try:
@@ -94,8 +99,17 @@ class JsonDocStatusStorage(DocStatusStorage):
         return result
 
     async def index_done_callback(self) -> None:
-        async with self._storage_lock:
-            if self.storage_updated.value:
+        async with self._storage_lock.writer():
+            if self.storage_updated.value and self._changes is not None:
+                # Append only the changed documents instead of rewriting the whole file
+                changes = dict(self._changes)
+                self._changes.clear()
+                logger.info(
+                    f"Process {os.getpid()} doc status appending {len(changes)} changed records to {self.namespace}"
+                )
+                self._storage_log.append(self._data, changes)
+                await clear_all_update_flags(self.namespace)
+            elif self.storage_updated.value:
                 data_dict = (
                     dict(self._data) if hasattr(self._data, "_getvalue") else self._data
                 )
@@ -103,32 +117,40 @@ class JsonDocStatusStorage(DocStatusStorage):
                     f"Process {os.getpid()} doc status writting {len(data_dict)} records to {self.namespace}"
                 )
                 write_json(data_dict, self._file_name)
+                self._storage_log.discard()
                 await clear_all_update_flags(self.namespace)
 
     async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
         if not data:
             return
         logger.info(f"Inserting {len(data)} records to {self.namespace}")
-        async with self._storage_lock:
+        async with self._storage_lock.writer():
+            if self._changes is not None:
+                diff_changes(self._data, data, self._changes)
             self._data.update(data)
             await set_all_update_flags(self.namespace)
 
         await self.index_done_callback()
 
     async def get_by_id(self, id: str) -> Union[dict[str, Any], None]:
-        async with self._storage_lock:
+        async with self._storage_lock.reader():
             return self._data.get(id)
 
     async def delete(self, doc_ids: list[str]):
-        async with self._storage_lock:
+        async with self._storage_lock.writer():
             for doc_id in doc_ids:
                 self._data.pop(doc_id, None)
+                if self._changes is not None:
+                    self._changes[doc_id] = None
             await set_all_update_flags(self.namespace)
         await self.index_done_callback()
 
     async def drop(self) -> None:
         """Drop the storage"""
-        async with self._storage_lock:
+        async with self._storage_lock.writer():
+            if self._changes is not None:
+                for doc_id in self._data.keys():
+                    self._changes[doc_id] = None
             self._data.clear()
             await set_all_update_flags(self.namespace)
         await self.index_done_callback()
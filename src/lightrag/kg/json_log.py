@@ -0,0 +1,177 @@
+import json
+import os
+from typing import Any
+
+from lightrag.utils import logger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Persist JSON storages as a snapshot plus an append-only log of changed keys
+JSON_STORAGE_APPEND_LOG = (
+    os.getenv("JSON_STORAGE_APPEND_LOG", "false").lower() == "true"
+)
+# Compact the log into a new snapshot once it outgrows the snapshot by this ratio
+JSON_STORAGE_LOG_COMPACT_RATIO = float(
+    os.getenv("JSON_STORAGE_LOG_COMPACT_RATIO", "1.0")
+)
+# Never compact logs smaller than this many bytes
+JSON_STORAGE_LOG_MIN_COMPACT_BYTES = int(
+    os.getenv("JSON_STORAGE_LOG_MIN_COMPACT_BYTES", 4 * 1024 * 1024)
+)
+
+# A change is True for a whole value, None for a deletion, or a list of the
+# second-level keys that changed inside a dict value (used by the LLM cache)
+Change = bool | None | list[str]
+
+
+def _dumps(obj: Any, indent: bool = False) -> bytes:
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode(
+        "utf-8"
+    )
+
+
+def _loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def diff_changes(
+    current: dict[str, Any],
+    data: dict[str, dict[str, Any]],
+    changes: dict[str, Change],
+    nested: bool = False,
+) -> None:
+    """Record the keys that an upsert of data into current is about to change
+
+    Args:
+        current: The storage data before the upsert
+        data: The data being upserted
+        changes: Pending changes, updated in place
+        nested: Track changed second-level keys of dict values instead of whole values
+    """
+    for key, value in data.items():
+        pending = changes.get(key, [])
+        old_value = current.get(key) if nested else None
+        if (
+            not nested
+            or pending is True
+            or pending is None
+            or not isinstance(value, dict)
+            or not isinstance(old_value, dict)
+            or old_value is value
+            or not old_value.keys() <= value.keys()
+        ):
+            changes[key] = True
+            continue
+
+        changed = [
+            sub_key
+            for sub_key, sub_value in value.items()
+            if sub_key not in old_value
+            or (old_value[sub_key] is not sub_value and old_value[sub_key] != sub_value)
+        ]
+        if changed:
+            changes[key] = sorted(set(pending) | set(changed))
+
+
+class JsonStorageLog:
+    """Snapshot plus append-only change log for a JSON file based storage.
+
+    The snapshot keeps the format of the plain JSON storage file. Each flush
+    appends one record per changed key to a sibling ``.log`` file, so the cost of
+    a flush scales with the number of changed keys instead of the store size.
+    The log is folded into a new snapshot once it grows larger than the snapshot.
+    """
+
+    def __init__(self, file_name: str):
+        self._file_name = file_name
+        self._log_file_name = os.path.splitext(file_name)[0] + ".log"
+
+    def load(self) -> dict[str, Any] | None:
+        """Load the snapshot and replay the change log on top of it"""
+        if not os.path.exists(self._file_name) and not os.path.exists(
+            self._log_file_name
+        ):
+            return None
+
+        data = {}
+        if os.path.exists(self._file_name):
+            with open(self._file_name, "rb") as f:
+                data = _loads(f.read())
+
+        if os.path.exists(self._log_file_name):
+            replayed = 0
+            with open(self._log_file_name, "rb") as f:
+                for line in f:
+                    try:
+                        op, key, value = _loads(line)
+                    except ValueError:
+                        # A crash during append can leave a partial last record
+                        logger.warning(
+                            f"Ignore truncated record in {self._log_file_name}"
+                        )
+                        break
+                    if op == "d":
+                        data.pop(key, None)
+                    elif op == "m":
+                        data.setdefault(key, {}).update(value)
+                    else:
+                        data[key] = value
+                    replayed += 1
+            logger.info(f"Replayed {replayed} changes from {self._log_file_name}")
+
+        return data
+
+    def append(self, data: dict[str, Any], changes: dict[str, Change]) -> None:
+        """Append the pending changes, compacting the log when it gets too large"""
+        records = []
+        for key, change in changes.items():
+            value = data.get(key)
+            if change is None or value is None:
+                records.append(_dumps(["d", key, None]))
+            elif change is True or not isinstance(value, dict):
+                records.append(_dumps(["u", key, value]))
+            else:
+                records.append(
+                    _dumps(["m", key, {k: value[k] for k in change if k in value}])
+                )
+
+        if records:
+            with open(self._log_file_name, "ab") as f:
+                f.write(b"\n".join(records) + b"\n")
+
+        log_size = os.path.getsize(self._log_file_name) if records else 0
+        snapshot_size = (
+            os.path.getsize(self._file_name) if os.path.exists(self._file_name) else 0
+        )
+        if log_size > max(
+            JSON_STORAGE_LOG_MIN_COMPACT_BYTES,
+            snapshot_size * JSON_STORAGE_LOG_COMPACT_RATIO,
+        ):
+            self.compact(data)
+
+    def compact(self, data: dict[str, Any]) -> None:
+        """Write a full snapshot and drop the change log"""
+        data_dict = dict(data) if hasattr(data, "_getvalue") else data
+        tmp_file_name = f"{self._file_name}.tmp"
+        with open(tmp_file_name, "wb") as f:
+            f.write(_dumps(data_dict, indent=True))
+        os.replace(tmp_file_name, self._file_name)
+        self.discard()
+        logger.info(
+            f"Compacted {len(data_dict)} records into snapshot {self._file_name}"
+        )
+
+    def discard(self) -> None:
+        """Drop the change log after the snapshot was rewritten in full"""
+        if os.path.exists(self._log_file_name):
+            os.remove(self._log_file_name)
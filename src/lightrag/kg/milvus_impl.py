@@ -3,7 +3,7 @@ import os
 from typing import Any, final
 from dataclasses import dataclass
 import numpy as np
-from lightrag.utils import logger, compute_mdhash_id
+from lightrag.utils import logger, compute_mdhash_id, run_blocking_io
 from ..base import BaseVectorStorage
 import pipmaster as pm
 
@@ -98,14 +98,23 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         embeddings = np.concatenate(embeddings_list)
         for i, d in enumerate(list_data):
             d["vector"] = embeddings[i]
-        results = self._client.upsert(collection_name=self.namespace, data=list_data)
+        results = await run_blocking_io(
+            self._client.upsert, collection_name=self.namespace, data=list_data
+        )
         return results
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
-        embedding = await self.embedding_func([query])
-        results = self._client.search(
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        embedding = await self.embed_query(query, query_embedding)
+        results = await run_blocking_io(
+            self._client.search,
             collection_name=self.namespace,
-            data=embedding,
+            data=[embedding],
             limit=top_k,
             output_fields=list(self.meta_fields),
             search_params={
@@ -137,8 +146,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             )
 
             # Delete the entity from Milvus collection
-            result = self._client.delete(
-                collection_name=self.namespace, pks=[entity_id]
+            result = await run_blocking_io(
+                self._client.delete, collection_name=self.namespace, pks=[entity_id]
             )
 
             if result and result.get("delete_count", 0) > 0:
@@ -160,8 +169,11 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             expr = f'src_id == "{entity_name}" or tgt_id == "{entity_name}"'
 
             # Find all relations involving this entity
-            results = self._client.query(
-                collection_name=self.namespace, filter=expr, output_fields=["id"]
+            results = await run_blocking_io(
+                self._client.query,
+                collection_name=self.namespace,
+                filter=expr,
+                output_fields=["id"],
             )
 
             if not results or len(results) == 0:
@@ -176,8 +188,10 @@ class MilvusVectorDBStorage(BaseVectorStorage):
 
             # Delete the relations
             if relation_ids:
-                delete_result = self._client.delete(
-                    collection_name=self.namespace, pks=relation_ids
+                delete_result = await run_blocking_io(
+                    self._client.delete,
+                    collection_name=self.namespace,
+                    pks=relation_ids,
                 )
 
                 logger.debug(
@@ -195,7 +209,9 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Delete vectors by IDs
-            result = self._client.delete(collection_name=self.namespace, pks=ids)
+            result = await run_blocking_io(
+                self._client.delete, collection_name=self.namespace, pks=ids
+            )
 
             if result and result.get("delete_count", 0) > 0:
                 logger.debug(
@@ -219,7 +235,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         try:
             # Use Milvus query with expression to find IDs with the given prefix
             expression = f'id like "{prefix}%"'
-            results = self._client.query(
+            results = await run_blocking_io(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=expression,
                 output_fields=list(self.meta_fields) + ["id"],
@@ -243,7 +260,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Query Milvus for a specific ID
-            result = self._client.query(
+            result = await run_blocking_io(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=f'id == "{id}"',
                 output_fields=list(self.meta_fields) + ["id"],
@@ -275,7 +293,8 @@ class MilvusVectorDBStorage(BaseVectorStorage):
             filter_expr = f'id in ["{id_list}"]'
 
             # Query Milvus with the filter
-            result = self._client.query(
+            result = await run_blocking_io(
+                self._client.query,
                 collection_name=self.namespace,
                 filter=filter_expr,
                 output_fields=list(self.meta_fields) + ["id"],
@@ -0,0 +1,471 @@
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, final
+
+import numpy as np
+
+from lightrag.base import BaseVectorStorage
+from lightrag.utils import compute_mdhash_id, logger
+
+from .shared_storage import (
+    get_storage_rw_lock,
+    get_update_flag,
+    is_multiprocess,
+    set_all_update_flags,
+)
+
+# Rewrite the matrix without tombstoned rows once they exceed this share of rows
+MMAP_VECTOR_COMPACT_RATIO = float(os.getenv("MMAP_VECTOR_COMPACT_RATIO", "0.3"))
+
+
+@final
+@dataclass
+class MmapVectorDBStorage(BaseVectorStorage):
+    """
+    A local vector storage backed by a memory-mapped float32 matrix.
+
+    Normalized vectors are kept in ``vdb_<namespace>.<generation>.npy`` and opened
+    with ``np.load(mmap_mode="c")``, so loading is near-instant and read-only pages
+    are shared between worker processes through the page cache. Row metadata lives
+    in a compact ``vdb_<namespace>.meta.json`` index aligned with the matrix rows.
+    Upserts overwrite rows in place, deletes leave tombstones that are reused by
+    later inserts and dropped when the matrix is rewritten on save.
+
+    Every save writes the matrix to a new generation file and then switches the
+    index to it with a single atomic replace, so the index always names a
+    complete matrix. The previous generation is kept for readers that loaded the
+    index just before the switch.
+    """
+
+    def __post_init__(self):
+        # Initialize basic attributes
+        self._storage_lock = None
+        self.storage_updated = None
+
+        # Use global config value if specified, otherwise use default
+        kwargs = self.global_config.get("vector_db_storage_cls_kwargs", {})
+        cosine_threshold = kwargs.get("cosine_better_than_threshold")
+        if cosine_threshold is None:
+            raise ValueError(
+                "cosine_better_than_threshold must be specified in vector_db_storage_cls_kwargs"
+            )
+        self.cosine_better_than_threshold = cosine_threshold
+
+        self._working_dir = self.global_config["working_dir"]
+        # Matrix file of storages written before generations were introduced
+        self._legacy_matrix_file_name = os.path.join(
+            self._working_dir, f"vdb_{self.namespace}.npy"
+        )
+        self._matrix_file_pattern = re.compile(
+            re.escape(f"vdb_{self.namespace}.") + r"\d+\.npy"
+        )
+        self._meta_file_name = os.path.join(
+            self._working_dir, f"vdb_{self.namespace}.meta.json"
+        )
+        self._max_batch_size = self.global_config["embedding_batch_num"]
+        self._dim = self.embedding_func.embedding_dim
+
+        self._load()
+
+    async def initialize(self):
+        """Initialize storage data"""
+        # Get the update flag for cross-process update notification
+        self.storage_updated = await get_update_flag(self.namespace)
+        # Get the storage lock for use in other methods
+        self._storage_lock = (await get_storage_rw_lock(self.namespace)).writer()
+
+    def _reset(self):
+        # Rows [0, _size) of _matrix are in use, the rest is spare capacity
+        self._matrix = np.zeros((0, self._dim), dtype=np.float32)
+        self._size = 0
+        # Row metadata aligned with the matrix, None marks a tombstone
+        self._metas: list[dict[str, Any] | None] = []
+        self._id_to_row: dict[str, int] = {}
+        self._free_rows: list[int] = []
+        self._valid = np.zeros(0, dtype=bool)
+        # Generation of the matrix file the index on disk points to
+        self._generation = 0
+        self._matrix_file_name = self._legacy_matrix_file_name
+
+    def _read_generation(self) -> tuple[dict[str, Any], str, np.ndarray]:
+        """Read the index and map the matrix file of the generation it names"""
+        with open(self._meta_file_name, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("embedding_dim") != self._dim:
+            raise ValueError(
+                f"embedding dim mismatch, {stored.get('embedding_dim')} != {self._dim}"
+            )
+        matrix_file_name = os.path.join(
+            self._working_dir,
+            stored.get("matrix_file", os.path.basename(self._legacy_matrix_file_name)),
+        )
+        # Copy-on-write mapping: pages stay shared until a row is modified
+        matrix = np.load(matrix_file_name, mmap_mode="c")
+        if len(matrix) != len(stored["data"]):
+            raise ValueError(
+                f"row count mismatch in generation {stored.get('generation', 0)}, "
+                f"{len(matrix)} vectors != {len(stored['data'])} records"
+            )
+        return stored, matrix_file_name, matrix
+
+    def _load(self):
+        """Map the vector matrix and load the id/metadata index from disk
+
+        Raises instead of starting empty when the files on disk do not match, so
+        a later save can not overwrite the stored vectors. The in-memory state is
+        only replaced once the new generation was read completely.
+        """
+        if not os.path.exists(self._meta_file_name):
+            logger.info(f"No existing vector matrix for {self.namespace}")
+            self._reset()
+            return
+
+        try:
+            try:
+                stored, matrix_file_name, matrix = self._read_generation()
+            except FileNotFoundError:
+                # A writer switched the index and dropped an old generation between
+                # reading the index and mapping the matrix, read the new index
+                stored, matrix_file_name, matrix = self._read_generation()
+        except Exception as e:
+            logger.error(f"Failed to load vector matrix for {self.namespace}: {e}")
+            raise
+
+        metas = stored["data"]
+        self._reset()
+        self._generation = stored.get("generation", 0)
+        self._matrix_file_name = matrix_file_name
+        self._matrix = matrix
+        self._size = len(metas)
+        self._metas = metas
+        self._valid = np.fromiter(
+            (meta is not None for meta in metas), dtype=bool, count=self._size
+        )
+        for row, meta in enumerate(metas):
+            if meta is None:
+                self._free_rows.append(row)
+            else:
+                self._id_to_row[meta["__id__"]] = row
+        logger.info(
+            f"Mapped {len(self._id_to_row)} vectors for {self.namespace} from {self._matrix_file_name}"
+        )
+
+    def _save(self):
+        """Write the vector matrix as a new generation and switch the index to it"""
+        tombstones = len(self._free_rows)
+        if tombstones and tombstones > self._size * MMAP_VECTOR_COMPACT_RATIO:
+            self._compact()
+
+        generation = self._generation + 1
+        matrix_file_name = os.path.join(
+            self._working_dir, f"vdb_{self.namespace}.{generation}.npy"
+        )
+        tmp_matrix_file = f"{matrix_file_name}.tmp"
+        with open(tmp_matrix_file, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix[: self._size]))
+        os.replace(tmp_matrix_file, matrix_file_name)
+
+        tmp_meta_file = f"{self._meta_file_name}.tmp"
+        with open(tmp_meta_file, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "embedding_dim": self._dim,
+                    "generation": generation,
+                    "matrix_file": os.path.basename(matrix_file_name),
+                    "data": self._metas[: self._size],
+                },
+                f,
+                ensure_ascii=False,
+            )
+        # The index switch is the commit point of the new generation
+        os.replace(tmp_meta_file, self._meta_file_name)
+
+        previous_matrix_file_name = self._matrix_file_name
+        self._generation = generation
+        self._matrix_file_name = matrix_file_name
+        self._remove_old_generations(keep={matrix_file_name, previous_matrix_file_name})
+
+        # Drop private copy-on-write pages by mapping the file just written
+        self._matrix = np.load(self._matrix_file_name, mmap_mode="c")
+
+    def _remove_old_generations(self, keep: set[str]):
+        """Remove the matrix files of generations no reader can still be loading"""
+        for file_name in os.listdir(self._working_dir):
+            path = os.path.join(self._working_dir, file_name)
+            if path in keep:
+                continue
+            if self._matrix_file_pattern.fullmatch(file_name) or (
+                path == self._legacy_matrix_file_name
+            ):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    # Still mapped by another process on platforms that forbid it
+                    logger.debug(f"Could not remove old vector matrix {path}: {e}")
+
+    def _compact(self):
+        """Drop tombstoned rows so the matrix only holds live vectors"""
+        keep = np.flatnonzero(self._valid[: self._size])
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._metas = [self._metas[row] for row in keep]
+        self._size = len(keep)
+        self._valid = np.ones(self._size, dtype=bool)
+        self._free_rows = []
+        self._id_to_row = {meta["__id__"]: row for row, meta in enumerate(self._metas)}
+
+    def _reserve(self, rows: int):
+        """Make room for rows more vectors, doubling the capacity when full"""
+        capacity = len(self._matrix)
+        if self._size + rows <= capacity and self._matrix.flags.writeable:
+            return
+        new_capacity = max(self._size + rows, capacity * 2, 1024)
+        matrix = np.zeros((new_capacity, self._dim), dtype=np.float32)
+        matrix[: self._size] = self._matrix[: self._size]
+        valid = np.zeros(new_capacity, dtype=bool)
+        valid[: self._size] = self._valid[: self._size]
+        self._matrix = matrix
+        self._valid = valid
+
+    async def _get_storage(self):
+        """Check if the storage should be reloaded"""
+        # Acquire lock to prevent concurrent read and write
+        async with self._storage_lock:
+            # Check if data needs to be reloaded
+            if (is_multiprocess and self.storage_updated.value) or (
+                not is_multiprocess and self.storage_updated
+            ):
+                logger.info(
+                    f"Process {os.getpid()} remapping {self.namespace} due to update by another process"
+                )
+                self._load()
+                # Reset update flag
+                if is_multiprocess:
+                    self.storage_updated.value = False
+                else:
+                    self.storage_updated = False
+
+    async def upsert(self, data: dict[str, dict[str, Any]]) -> None:
+        logger.info(f"Inserting {len(data)} to {self.namespace}")
+        if not data:
+            return
+
+        current_time = time.time()
+        list_data = [
+            {
+                "__id__": k,
+                "__created_at__": current_time,
+                **{k1: v1 for k1, v1 in v.items() if k1 in self.meta_fields},
+            }
+            for k, v in data.items()
+        ]
+        contents = [v["content"] for v in data.values()]
+        batches = [
+            contents[i : i + self._max_batch_size]
+            for i in range(0, len(contents), self._max_batch_size)
+        ]
+
+        # Execute embedding outside of lock to avoid long lock times
+        embedding_tasks = [self.embedding_func(batch) for batch in batches]
+        embeddings_list = await asyncio.gather(*embedding_tasks)
+
+        embeddings = np.concatenate(embeddings_list).astype(np.float32)
+        if len(embeddings) != len(list_data):
+            # sometimes the embedding is not returned correctly. just log it.
+            logger.error(
+                f"embedding is not 1-1 with data, {len(embeddings)} != {len(list_data)}"
+            )
+            return
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+
+        await self._get_storage()
+        async with self._storage_lock:
+            new_rows = sum(1 for d in list_data if d["__id__"] not in self._id_to_row)
+            self._reserve(max(new_rows - len(self._free_rows), 0))
+
+            rows = []
+            for d in list_data:
+                row = self._id_to_row.get(d["__id__"])
+                if row is None:
+                    if self._free_rows:
+                        row = self._free_rows.pop()
+                    else:
+                        row = self._size
+                        self._size += 1
+                        self._metas.append(None)
+                    self._id_to_row[d["__id__"]] = row
+                self._metas[row] = d
+                rows.append(row)
+
+            rows = np.asarray(rows)
+            self._matrix[rows] = embeddings
+            self._valid[rows] = True
+
+        return [d["__id__"] for d in list_data]
+
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        # Execute embedding outside of lock to avoid long lock times
+        embedding = await self.embed_query(query, query_embedding)
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding /= max(float(np.linalg.norm(embedding)), 1e-12)
+
+        await self._get_storage()
+        if self._size == 0 or top_k <= 0:
+            return []
+
+        scores = self._matrix[: self._size] @ embedding
+        scores[~self._valid[: self._size]] = -np.inf
+        candidates = np.flatnonzero(scores >= self.cosine_better_than_threshold)
+        if len(candidates) > top_k:
+            candidates = candidates[
+                np.argpartition(scores[candidates], -top_k)[-top_k:]
+            ]
+        candidates = candidates[np.argsort(-scores[candidates])]
+
+        return [
+            {
+                **self._metas[row],
+                "id": self._metas[row]["__id__"],
+                "distance": float(scores[row]),
+                "created_at": self._metas[row].get("__created_at__"),
+            }
+            for row in candidates
+        ]
+
+    @property
+    async def client_storage(self):
+        await self._get_storage()
+        return {"data": [meta for meta in self._metas[: self._size] if meta]}
+
+    async def delete(self, ids: list[str]):
+        """Delete vectors with specified IDs
+
+        Args:
+            ids: List of vector IDs to be deleted
+        """
+        await self._get_storage()
+        async with self._storage_lock:
+            deleted = 0
+            for id in ids:
+                row = self._id_to_row.pop(id, None)
+                if row is None:
+                    continue
+                self._metas[row] = None
+                self._valid[row] = False
+                self._free_rows.append(row)
+                deleted += 1
+        logger.debug(f"Successfully deleted {deleted} vectors from {self.namespace}")
+
+    async def delete_entity(self, entity_name: str) -> None:
+        entity_id = compute_mdhash_id(entity_name, prefix="ent-")
+        logger.debug(f"Attempting to delete entity {entity_name} with ID {entity_id}")
+        await self.delete([entity_id])
+
+    async def delete_entity_relation(self, entity_name: str) -> None:
+        await self._get_storage()
+        ids_to_delete = [
+            meta["__id__"]
+            for meta in self._metas[: self._size]
+            if meta
+            and (meta.get("src_id") == entity_name or meta.get("tgt_id") == entity_name)
+        ]
+        logger.debug(f"Found {len(ids_to_delete)} relations for entity {entity_name}")
+        if ids_to_delete:
+            await self.delete(ids_to_delete)
+
+    async def index_done_callback(self) -> bool:
+        """Save data to disk"""
+        # Check if storage was updated by another process
+        if is_multiprocess and self.storage_updated.value:
+            # Storage was updated by another process, reload data instead of saving
+            logger.warning(
+                f"Storage for {self.namespace} was updated by another process, reloading..."
+            )
+            async with self._storage_lock:
+                try:
+                    self._load()
+                except Exception:
+                    # Keep the current data, the flag stays set to retry the reload
+                    return False
+                self.storage_updated.value = False
+            return False  # Return error
+
+        # Acquire lock and perform persistence
+        async with self._storage_lock:
+            try:
+                # Save data to disk
+                self._save()
+                # Notify other processes that data has been updated
+                await set_all_update_flags(self.namespace)
+                # Reset own update flag to avoid self-reloading
+                if is_multiprocess:
+                    self.storage_updated.value = False
+                else:
+                    self.storage_updated = False
+            except Exception as e:
+                logger.error(f"Error saving data for {self.namespace}: {e}")
+                return False  # Return error
+
+        return True  # Return success
+
+    async def search_by_prefix(self, prefix: str) -> list[dict[str, Any]]:
+        """Search for records with IDs starting with a specific prefix.
+
+        Args:
+            prefix: The prefix to search for in record IDs
+
+        Returns:
+            List of records with matching ID prefixes
+        """
+        await self._get_storage()
+        matching_records = [
+            {**self._metas[row], "id": id}
+            for id, row in self._id_to_row.items()
+            if id.startswith(prefix)
+        ]
+        logger.debug(f"Found {len(matching_records)} records with prefix '{prefix}'")
+        return matching_records
+
+    async def get_by_id(self, id: str) -> dict[str, Any] | None:
+        """Get vector data by its ID
+
+        Args:
+            id: The unique identifier of the vector
+
+        Returns:
+            The vector data if found, or None if not found
+        """
+        await self._get_storage()
+        row = self._id_to_row.get(id)
+        if row is None:
+            return None
+        return {**self._metas[row], "id": id}
+
+    async def get_by_ids(self, ids: list[str]) -> list[dict[str, Any]]:
+        """Get multiple vector data by their IDs
+
+        Args:
+            ids: List of unique identifiers
+
+        Returns:
+            List of vector data objects that were found
+        """
+        if not ids:
+            return []
+
+        await self._get_storage()
+        return [
+            {**self._metas[row], "id": id}
+            for id in ids
+            if (row := self._id_to_row.get(id)) is not None
+        ]
@@ -527,6 +527,104 @@ class MongoGraphStorage(BaseGraphStorage):
         edges = result[0].get("edges", [])
         return [(source_node_id, e["target"]) for e in edges]
 
+    #
+    # -------------------------------------------------------------------------
+    # BATCH GETTERS
+    # -------------------------------------------------------------------------
+    #
+
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict[str, str]]:
+        """
+        Return the full node documents for all node_ids with a single $in query.
+        Missing nodes are omitted from the result.
+        """
+        cursor = self.collection.find({"_id": {"$in": node_ids}})
+        return {doc["_id"]: doc async for doc in cursor}
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        """
+        Same counting rules as node_degree, but for many nodes at once:
+         - outbound edges come from the node docs themselves (one $in query)
+         - inbound edges are counted by a single $unwind/$group aggregation
+        Missing nodes have a degree of 0.
+        """
+        degrees = {node_id: 0 for node_id in node_ids}
+        existing = set()
+        cursor = self.collection.find({"_id": {"$in": node_ids}}, {"edges.target": 1})
+        async for doc in cursor:
+            existing.add(doc["_id"])
+            degrees[doc["_id"]] = len(doc.get("edges", []))
+
+        inbound_count_pipeline = [
+            {"$match": {"edges.target": {"$in": node_ids}}},
+            {"$unwind": "$edges"},
+            {"$match": {"edges.target": {"$in": node_ids}}},
+            {"$group": {"_id": "$edges.target", "totalInbound": {"$sum": 1}}},
+        ]
+        inbound_cursor = self.collection.aggregate(inbound_count_pipeline)
+        async for doc in inbound_cursor:
+            # node_degree reports 0 for nodes without their own document
+            if doc["_id"] in existing:
+                degrees[doc["_id"]] += doc["totalInbound"]
+
+        return degrees
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        """
+        Same counting rules as edge_degree, reading every source doc with one $in query.
+        """
+        edges_by_source = await self._get_edges_by_source(
+            [src for src, _ in edge_pairs]
+        )
+        return {
+            (src, tgt): sum(
+                1 for e in edges_by_source.get(src, []) if e.get("target") == tgt
+            )
+            for src, tgt in edge_pairs
+        }
+
+    async def get_edges_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, str]]:
+        """
+        Return the edge data for all (source, target) pairs with one $in query.
+        Missing edges are omitted from the result.
+        """
+        edges_by_source = await self._get_edges_by_source(
+            [src for src, _ in edge_pairs]
+        )
+        result = {}
+        for src, tgt in edge_pairs:
+            for e in edges_by_source.get(src, []):
+                if e.get("target") == tgt:
+                    result[(src, tgt)] = e
+                    break
+        return result
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        """
+        Return (source_id, target_id) lists for the direct edges of every node in node_ids.
+        Missing nodes map to an empty list.
+        """
+        edges_by_source = await self._get_edges_by_source(node_ids)
+        return {
+            node_id: [(node_id, e["target"]) for e in edges_by_source.get(node_id, [])]
+            for node_id in node_ids
+        }
+
+    async def _get_edges_by_source(self, node_ids: list[str]) -> dict[str, list[dict]]:
+        """
+        Fetch the outbound edges arrays of many nodes with a single $in query.
+        """
+        cursor = self.collection.find(
+            {"_id": {"$in": list(set(node_ids))}}, {"edges": 1}
+        )
+        return {doc["_id"]: doc.get("edges", []) async for doc in cursor}
+
     #
     # -------------------------------------------------------------------------
     # UPSERTS
@@ -938,13 +1036,19 @@ class MongoVectorDBStorage(BaseVectorStorage):
 
         return list_data
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
         """Queries the vector database using Atlas Vector Search."""
         # Generate the embedding
-        embedding = await self.embedding_func([query])
+        embedding = await self.embed_query(query, query_embedding)
 
         # Convert numpy array to a list to ensure compatibility with MongoDB
-        query_vector = embedding[0].tolist()
+        query_vector = embedding.tolist()
 
         # Define the aggregation pipeline with the converted query vector
         pipeline = [
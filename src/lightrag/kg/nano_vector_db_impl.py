@@ -17,7 +17,7 @@ if not pm.is_installed("nano-vectordb"):
 
 from nano_vectordb import NanoVectorDB
 from .shared_storage import (
-    get_storage_lock,
+    get_storage_rw_lock,
     get_update_flag,
     set_all_update_flags,
     is_multiprocess,
@@ -57,7 +57,7 @@ class NanoVectorDBStorage(BaseVectorStorage):
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = (await get_storage_rw_lock(self.namespace)).writer()
 
     async def _get_client(self):
         """Check if the storage should be reloaded"""
@@ -120,10 +120,15 @@ class NanoVectorDBStorage(BaseVectorStorage):
                 f"embedding is not 1-1 with data, {len(embeddings)} != {len(list_data)}"
             )
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
         # Execute embedding outside of lock to avoid long lock times
-        embedding = await self.embedding_func([query])
-        embedding = embedding[0]
+        embedding = await self.embed_query(query, query_embedding)
 
         client = await self._get_client()
         results = client.query(
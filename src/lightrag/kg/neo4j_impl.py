@@ -504,6 +504,163 @@ class Neo4JStorage(BaseGraphStorage):
             logger.error(f"Error in get_node_edges for {source_node_id}: {str(e)}")
             raise
 
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict[str, str]]:
+        """Get multiple nodes with a single UNWIND query.
+
+        Args:
+            node_ids: List of node labels to look up
+
+        Returns:
+            dict: Mapping of node label to node properties, missing nodes are omitted
+        """
+        async with self._driver.session(
+            database=self._DATABASE, default_access_mode="READ"
+        ) as session:
+            query = """
+                UNWIND $entity_ids AS entity_id
+                MATCH (n:base {entity_id: entity_id})
+                RETURN entity_id, n
+            """
+            result = await session.run(query, entity_ids=node_ids)
+            try:
+                nodes = {}
+                async for record in result:
+                    entity_id = record["entity_id"]
+                    if entity_id in nodes:
+                        # Keep the first node, as get_node does
+                        continue
+                    node_dict = dict(record["n"])
+                    # Remove base label from labels list if it exists
+                    if "labels" in node_dict:
+                        node_dict["labels"] = [
+                            label for label in node_dict["labels"] if label != "base"
+                        ]
+                    nodes[entity_id] = node_dict
+                return nodes
+            finally:
+                await result.consume()  # Ensure result is fully consumed
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        """Get the degrees of multiple nodes with a single UNWIND query.
+
+        Args:
+            node_ids: List of node labels to look up
+
+        Returns:
+            dict: Mapping of node label to degree, missing nodes have a degree of 0
+        """
+        async with self._driver.session(
+            database=self._DATABASE, default_access_mode="READ"
+        ) as session:
+            query = """
+                UNWIND $entity_ids AS entity_id
+                MATCH (n:base {entity_id: entity_id})
+                OPTIONAL MATCH (n)-[r]-()
+                RETURN entity_id, COUNT(r) AS degree
+            """
+            result = await session.run(query, entity_ids=node_ids)
+            try:
+                degrees = {node_id: 0 for node_id in node_ids}
+                async for record in result:
+                    degrees[record["entity_id"]] = record["degree"]
+                return degrees
+            finally:
+                await result.consume()  # Ensure result is fully consumed
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        """Get the degrees of multiple edges, reusing one node degree query.
+
+        Args:
+            edge_pairs: List of (source label, target label) tuples
+
+        Returns:
+            dict: Mapping of (source, target) tuple to the sum of both node degrees
+        """
+        node_ids = list({node_id for pair in edge_pairs for node_id in pair})
+        degrees = await self.node_degrees_batch(node_ids)
+        return {
+            (src, tgt): int(degrees.get(src, 0)) + int(degrees.get(tgt, 0))
+            for src, tgt in edge_pairs
+        }
+
+    async def get_edges_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, str]]:
+        """Get multiple edges with a single UNWIND query.
+
+        Args:
+            edge_pairs: List of (source label, target label) tuples
+
+        Returns:
+            dict: Mapping of (source, target) tuple to edge properties, using the
+            same default properties as get_edge when no edge is found
+        """
+        required_keys = {
+            "weight": 0.0,
+            "source_id": None,
+            "description": None,
+            "keywords": None,
+        }
+        async with self._driver.session(
+            database=self._DATABASE, default_access_mode="READ"
+        ) as session:
+            query = """
+                UNWIND $pairs AS pair
+                MATCH (start:base {entity_id: pair.src})-[r]-(end:base {entity_id: pair.tgt})
+                RETURN pair.src AS src_id, pair.tgt AS tgt_id, collect(properties(r)) AS edges
+            """
+            result = await session.run(
+                query, pairs=[{"src": src, "tgt": tgt} for src, tgt in edge_pairs]
+            )
+            try:
+                edges = {}
+                async for record in result:
+                    if not record["edges"]:
+                        continue
+                    edges[(record["src_id"], record["tgt_id"])] = {
+                        **required_keys,
+                        **dict(record["edges"][0]),
+                    }
+            finally:
+                await result.consume()  # Ensure result is fully consumed
+
+        return {pair: edges.get(pair, dict(required_keys)) for pair in edge_pairs}
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        """Get the edges of multiple nodes with a single UNWIND query.
+
+        Args:
+            node_ids: List of node labels to look up
+
+        Returns:
+            dict: Mapping of node label to its (source_label, target_label) tuples
+        """
+        async with self._driver.session(
+            database=self._DATABASE, default_access_mode="READ"
+        ) as session:
+            query = """
+                UNWIND $entity_ids AS entity_id
+                MATCH (n:base {entity_id: entity_id})
+                OPTIONAL MATCH (n)-[r]-(connected:base)
+                WHERE connected.entity_id IS NOT NULL
+                RETURN entity_id, connected.entity_id AS connected_id
+            """
+            result = await session.run(query, entity_ids=node_ids)
+            try:
+                edges = {node_id: [] for node_id in node_ids}
+                async for record in result:
+                    if record["connected_id"]:
+                        edges[record["entity_id"]].append(
+                            (record["entity_id"], record["connected_id"])
+                        )
+                return edges
+            finally:
+                await result.consume()  # Ensure result is fully consumed
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -18,7 +18,7 @@ if not pm.is_installed("graspologic"):
 import networkx as nx
 from graspologic import embed
 from .shared_storage import (
-    get_storage_lock,
+    get_storage_rw_lock,
     get_update_flag,
     set_all_update_flags,
     is_multiprocess,
@@ -103,7 +103,7 @@ class NetworkXStorage(BaseGraphStorage):
         # Get the update flag for cross-process update notification
         self.storage_updated = await get_update_flag(self.namespace)
         # Get the storage lock for use in other methods
-        self._storage_lock = get_storage_lock()
+        self._storage_lock = (await get_storage_rw_lock(self.namespace)).writer()
 
     async def _get_graph(self):
         """Check if the storage should be reloaded"""
@@ -160,6 +160,50 @@ class NetworkXStorage(BaseGraphStorage):
             return list(graph.edges(source_node_id))
         return None
 
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict[str, str]]:
+        graph = await self._get_graph()
+        return {
+            node_id: graph.nodes[node_id]
+            for node_id in node_ids
+            if graph.has_node(node_id)
+        }
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        graph = await self._get_graph()
+        return {
+            node_id: graph.degree(node_id) if graph.has_node(node_id) else 0
+            for node_id in node_ids
+        }
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        graph = await self._get_graph()
+        return {
+            (src, tgt): (graph.degree(src) if graph.has_node(src) else 0)
+            + (graph.degree(tgt) if graph.has_node(tgt) else 0)
+            for src, tgt in edge_pairs
+        }
+
+    async def get_edges_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, str]]:
+        graph = await self._get_graph()
+        return {
+            (src, tgt): graph.edges[src, tgt]
+            for src, tgt in edge_pairs
+            if graph.has_edge(src, tgt)
+        }
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        graph = await self._get_graph()
+        return {
+            node_id: list(graph.edges(node_id)) if graph.has_node(node_id) else []
+            for node_id in node_ids
+        }
+
     async def upsert_node(self, node_id: str, node_data: dict[str, str]) -> None:
         graph = await self._get_graph()
         graph.add_node(node_id, **node_data)
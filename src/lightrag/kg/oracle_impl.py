@@ -417,9 +417,14 @@ class OracleVectorDBStorage(BaseVectorStorage):
             self.db = None
 
     #################### query method ###############
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
-        embeddings = await self.embedding_func([query])
-        embedding = embeddings[0]
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        embedding = await self.embed_query(query, query_embedding)
         # 转换精度
         dtype = str(embedding.dtype).upper()
         dimension = embedding.shape[0]
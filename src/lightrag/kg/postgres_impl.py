@@ -1,9 +1,11 @@
 import asyncio
 import json
 import os
+import struct
 import time
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
-from typing import Any, Union, final
+from typing import Any, AsyncIterator, Union, final
 import numpy as np
 import configparser
 
@@ -42,6 +44,18 @@ import asyncpg  # type: ignore
 from asyncpg import Pool  # type: ignore
 
 
+def _encode_vector(value: Any) -> bytes:
+    """Encode a vector in the binary wire format of pgvector"""
+    vector = np.asarray(value, dtype=">f4")
+    return struct.pack(">HH", vector.shape[0], 0) + vector.tobytes()
+
+
+def _decode_vector(data: bytes) -> list[float]:
+    """Decode a vector from the binary wire format of pgvector"""
+    dim, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dim, offset=4).tolist()
+
+
 class PostgreSQLDB:
     def __init__(self, config: dict[str, Any], **kwargs: Any):
         self.host = config.get("host", "localhost")
@@ -50,9 +64,24 @@ class PostgreSQLDB:
         self.password = config.get("password", None)
         self.database = config.get("database", "postgres")
         self.workspace = config.get("workspace", "default")
-        self.max = 12
+        self.pool_name = config.get("pool_name", "default")
+        self.max = int(config.get("max_connections", 12))
+        self.min = int(config.get("min_connections", 1))
+        self.statement_cache_size = int(config.get("statement_cache_size", 100))
+        # Seconds to wait for a free connection, 0 waits forever
+        self.acquire_timeout = float(config.get("acquire_timeout", 0)) or None
         self.increment = 1
         self.pool: Pool | None = None
+        # Whether connections send vectors in pgvector's binary format
+        self.vector_codec = False
+
+        # Pool usage gauges, reported by get_pool_stats()
+        self._in_use = 0
+        self._waiting = 0
+        self._acquire_count = 0
+        self._acquire_timeouts = 0
+        self._acquire_wait_total = 0.0
+        self._acquire_wait_max = 0.0
 
         if self.user is None or self.password is None or self.database is None:
             raise ValueError("Missing database user, password, or database")
@@ -65,12 +94,15 @@ class PostgreSQLDB:
                 database=self.database,
                 host=self.host,
                 port=self.port,
-                min_size=1,
+                min_size=self.min,
                 max_size=self.max,
+                statement_cache_size=self.statement_cache_size,
+                init=self._init_connection,
             )
 
             logger.info(
-                f"PostgreSQL, Connected to database at {self.host}:{self.port}/{self.database}"
+                f"PostgreSQL, Connected to database at {self.host}:{self.port}/{self.database} "
+                f"with pool {self.pool_name} ({self.min}-{self.max} connections)"
             )
         except Exception as e:
             logger.error(
@@ -78,6 +110,77 @@ class PostgreSQLDB:
             )
             raise
 
+    async def _init_connection(self, connection: asyncpg.Connection) -> None:
+        """Register the binary pgvector codec on a new pool connection"""
+        schema = await connection.fetchval(
+            """SELECT n.nspname FROM pg_type t
+               JOIN pg_namespace n ON n.oid = t.typnamespace
+               WHERE t.typname = 'vector'"""
+        )
+        if schema is None:
+            # The vector extension is not installed, vectors stay text literals
+            return
+        await connection.set_type_codec(
+            "vector",
+            schema=schema,
+            encoder=_encode_vector,
+            decoder=_decode_vector,
+            format="binary",
+        )
+        self.vector_codec = True
+
+    def vector_param(self, vector: np.ndarray) -> np.ndarray | str:
+        """Convert an embedding to a query parameter for a vector column"""
+        if self.vector_codec:
+            return vector
+        return json.dumps(vector.tolist())
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncIterator[asyncpg.Connection]:
+        """Acquire a pool connection and record the wait time"""
+        self._waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = await self.pool.acquire(timeout=self.acquire_timeout)  # type: ignore
+        except asyncio.TimeoutError:
+            self._acquire_timeouts += 1
+            logger.warning(
+                f"PostgreSQL, Timed out after {self.acquire_timeout}s waiting for a connection from pool {self.pool_name}"
+            )
+            raise
+        finally:
+            self._waiting -= 1
+
+        wait = time.perf_counter() - start
+        self._acquire_count += 1
+        self._acquire_wait_total += wait
+        self._acquire_wait_max = max(self._acquire_wait_max, wait)
+        self._in_use += 1
+        try:
+            yield connection
+        finally:
+            self._in_use -= 1
+            await self.pool.release(connection)  # type: ignore
+
+    def get_pool_stats(self) -> dict[str, Any]:
+        """Connection pool size, usage and acquire wait times"""
+        return {
+            "size": self.pool.get_size() if self.pool else 0,
+            "idle": self.pool.get_idle_size() if self.pool else 0,
+            "min_size": self.min,
+            "max_size": self.max,
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "acquire_count": self._acquire_count,
+            "acquire_timeouts": self._acquire_timeouts,
+            "acquire_wait_avg_ms": round(
+                self._acquire_wait_total / self._acquire_count * 1000, 3
+            )
+            if self._acquire_count
+            else 0.0,
+            "acquire_wait_max_ms": round(self._acquire_wait_max * 1000, 3),
+        }
+
     @staticmethod
     async def configure_age(connection: asyncpg.Connection, graph_name: str) -> None:
         """Set the Apache AGE environment and creates a graph if it does not exist.
@@ -126,7 +229,7 @@ class PostgreSQLDB:
         with_age: bool = False,
         graph_name: str | None = None,
     ) -> dict[str, Any] | None | list[dict[str, Any]]:
-        async with self.pool.acquire() as connection:  # type: ignore
+        async with self._acquire() as connection:
             if with_age and graph_name:
                 await self.configure_age(connection, graph_name)  # type: ignore
             elif with_age and not graph_name:
@@ -164,7 +267,7 @@ class PostgreSQLDB:
         graph_name: str | None = None,
     ):
         try:
-            async with self.pool.acquire() as connection:  # type: ignore
+            async with self._acquire() as connection:
                 if with_age and graph_name:
                     await self.configure_age(connection, graph_name)  # type: ignore
                 elif with_age and not graph_name:
@@ -186,9 +289,28 @@ class PostgreSQLDB:
             logger.error(f"PostgreSQL database,\nsql:{sql},\ndata:{data},\nerror:{e}")
             raise
 
+    async def executemany(self, sql: str, data: list[dict[str, Any]]) -> None:
+        """Execute one statement for many rows in a single pipelined round trip
+
+        Args:
+            sql: The statement to execute, prepared once per connection
+            data: One parameter dict per row, in the order of the statement's placeholders
+        """
+        if not data:
+            return
+        try:
+            async with self._acquire() as connection:
+                await connection.executemany(sql, [tuple(row.values()) for row in data])  # type: ignore
+        except Exception as e:
+            logger.error(
+                f"PostgreSQL database,\nsql:{sql},\nrows:{len(data)},\nerror:{e}"
+            )
+            raise
+
 
 class ClientManager:
-    _instances: dict[str, Any] = {"db": None, "ref_count": 0}
+    # Pool name -> {"db": PostgreSQLDB, "ref_count": int}
+    _instances: dict[str, dict[str, Any]] = {}
     _lock = asyncio.Lock()
 
     @staticmethod
@@ -219,34 +341,75 @@ class ClientManager:
                 "POSTGRES_WORKSPACE",
                 config.get("postgres", "workspace", fallback="default"),
             ),
+            "max_connections": os.environ.get(
+                "POSTGRES_MAX_CONNECTIONS",
+                config.get("postgres", "max_connections", fallback=12),
+            ),
+            "min_connections": os.environ.get(
+                "POSTGRES_MIN_CONNECTIONS",
+                config.get("postgres", "min_connections", fallback=1),
+            ),
+            "statement_cache_size": os.environ.get(
+                "POSTGRES_STATEMENT_CACHE_SIZE",
+                config.get("postgres", "statement_cache_size", fallback=100),
+            ),
+            "acquire_timeout": os.environ.get(
+                "POSTGRES_ACQUIRE_TIMEOUT",
+                config.get("postgres", "acquire_timeout", fallback=0),
+            ),
+            "pool_per_storage": str(
+                os.environ.get(
+                    "POSTGRES_POOL_PER_STORAGE",
+                    config.get("postgres", "pool_per_storage", fallback="false"),
+                )
+            ).lower()
+            == "true",
         }
 
     @classmethod
-    async def get_client(cls) -> PostgreSQLDB:
+    async def get_client(cls, storage: str = "default") -> PostgreSQLDB:
+        """Get the shared database client, or the one of the storage's own pool
+
+        Args:
+            storage: Storage kind (kv, vector, doc_status, graph), used as the
+                pool name when pool_per_storage is enabled
+        """
         async with cls._lock:
-            if cls._instances["db"] is None:
-                config = ClientManager.get_config()
-                db = PostgreSQLDB(config)
+            config = ClientManager.get_config()
+            pool_name = storage if config["pool_per_storage"] else "default"
+            instance = cls._instances.get(pool_name)
+            if instance is None:
+                db = PostgreSQLDB({**config, "pool_name": pool_name})
                 await db.initdb()
                 await db.check_tables()
-                cls._instances["db"] = db
-                cls._instances["ref_count"] = 0
-            cls._instances["ref_count"] += 1
-            return cls._instances["db"]
+                instance = cls._instances[pool_name] = {"db": db, "ref_count": 0}
+            instance["ref_count"] += 1
+            return instance["db"]
 
     @classmethod
     async def release_client(cls, db: PostgreSQLDB):
         async with cls._lock:
             if db is not None:
-                if db is cls._instances["db"]:
-                    cls._instances["ref_count"] -= 1
-                    if cls._instances["ref_count"] == 0:
+                instance = cls._instances.get(db.pool_name)
+                if instance is not None and db is instance["db"]:
+                    instance["ref_count"] -= 1
+                    if instance["ref_count"] == 0:
                         await db.pool.close()
-                        logger.info("Closed PostgreSQL database connection pool")
-                        cls._instances["db"] = None
+                        logger.info(
+                            f"Closed PostgreSQL database connection pool {db.pool_name}"
+                        )
+                        del cls._instances[db.pool_name]
                 else:
                     await db.pool.close()
 
+    @classmethod
+    def get_pool_stats(cls) -> dict[str, dict[str, Any]]:
+        """Usage gauges of every open connection pool, keyed by pool name"""
+        return {
+            pool_name: instance["db"].get_pool_stats()
+            for pool_name, instance in cls._instances.items()
+        }
+
 
 @final
 @dataclass
@@ -260,7 +423,7 @@ class PGKVStorage(BaseKVStorage):
 
     async def initialize(self):
         if self.db is None:
-            self.db = await ClientManager.get_client()
+            self.db = await ClientManager.get_client("kv")
 
     async def finalize(self):
         if self.db is not None:
@@ -354,27 +517,30 @@ class PGKVStorage(BaseKVStorage):
         if is_namespace(self.namespace, NameSpace.KV_STORE_TEXT_CHUNKS):
             pass
         elif is_namespace(self.namespace, NameSpace.KV_STORE_FULL_DOCS):
-            for k, v in data.items():
-                upsert_sql = SQL_TEMPLATES["upsert_doc_full"]
-                _data = {
+            upsert_sql = SQL_TEMPLATES["upsert_doc_full"]
+            rows = [
+                {
                     "id": k,
                     "content": v["content"],
                     "workspace": self.db.workspace,
                 }
-                await self.db.execute(upsert_sql, _data)
+                for k, v in data.items()
+            ]
+            await self.db.executemany(upsert_sql, rows)
         elif is_namespace(self.namespace, NameSpace.KV_STORE_LLM_RESPONSE_CACHE):
-            for mode, items in data.items():
-                for k, v in items.items():
-                    upsert_sql = SQL_TEMPLATES["upsert_llm_response_cache"]
-                    _data = {
-                        "workspace": self.db.workspace,
-                        "id": k,
-                        "original_prompt": v["original_prompt"],
-                        "return_value": v["return"],
-                        "mode": mode,
-                    }
-
-                    await self.db.execute(upsert_sql, _data)
+            upsert_sql = SQL_TEMPLATES["upsert_llm_response_cache"]
+            rows = [
+                {
+                    "workspace": self.db.workspace,
+                    "id": k,
+                    "original_prompt": v["original_prompt"],
+                    "return_value": v["return"],
+                    "mode": mode,
+                }
+                for mode, items in data.items()
+                for k, v in items.items()
+            ]
+            await self.db.executemany(upsert_sql, rows)
 
     async def index_done_callback(self) -> None:
         # PG handles persistence automatically
@@ -405,7 +571,7 @@ class PGVectorStorage(BaseVectorStorage):
 
     async def initialize(self):
         if self.db is None:
-            self.db = await ClientManager.get_client()
+            self.db = await ClientManager.get_client("vector")
 
     async def finalize(self):
         if self.db is not None:
@@ -422,7 +588,7 @@ class PGVectorStorage(BaseVectorStorage):
                 "chunk_order_index": item["chunk_order_index"],
                 "full_doc_id": item["full_doc_id"],
                 "content": item["content"],
-                "content_vector": json.dumps(item["__vector__"].tolist()),
+                "content_vector": self.db.vector_param(item["__vector__"]),
             }
         except Exception as e:
             logger.error(f"Error to prepare upsert,\nsql: {e}\nitem: {item}")
@@ -437,7 +603,7 @@ class PGVectorStorage(BaseVectorStorage):
             "id": item["__id__"],
             "entity_name": item["entity_name"],
             "content": item["content"],
-            "content_vector": json.dumps(item["__vector__"].tolist()),
+            "content_vector": self.db.vector_param(item["__vector__"]),
             "chunk_id": item["source_id"],
             # TODO: add document_id
         }
@@ -451,7 +617,7 @@ class PGVectorStorage(BaseVectorStorage):
             "source_id": item["src_id"],
             "target_id": item["tgt_id"],
             "content": item["content"],
-            "content_vector": json.dumps(item["__vector__"].tolist()),
+            "content_vector": self.db.vector_param(item["__vector__"]),
             "chunk_id": item["source_id"],
             # TODO: add document_id
         }
@@ -483,38 +649,43 @@ class PGVectorStorage(BaseVectorStorage):
         embeddings = np.concatenate(embeddings_list)
         for i, d in enumerate(list_data):
             d["__vector__"] = embeddings[i]
-        for item in list_data:
-            if is_namespace(self.namespace, NameSpace.VECTOR_STORE_CHUNKS):
-                upsert_sql, data = self._upsert_chunks(item)
-            elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_ENTITIES):
-                upsert_sql, data = self._upsert_entities(item)
-            elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_RELATIONSHIPS):
-                upsert_sql, data = self._upsert_relationships(item)
-            else:
-                raise ValueError(f"{self.namespace} is not supported")
 
-            await self.db.execute(upsert_sql, data)
+        if is_namespace(self.namespace, NameSpace.VECTOR_STORE_CHUNKS):
+            prepare = self._upsert_chunks
+        elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_ENTITIES):
+            prepare = self._upsert_entities
+        elif is_namespace(self.namespace, NameSpace.VECTOR_STORE_RELATIONSHIPS):
+            prepare = self._upsert_relationships
+        else:
+            raise ValueError(f"{self.namespace} is not supported")
+
+        # All rows share one statement, so they are sent in a single batch
+        upsert_sql = None
+        rows = []
+        for item in list_data:
+            upsert_sql, row = prepare(item)
+            rows.append(row)
+        await self.db.executemany(upsert_sql, rows)
 
     #################### query method ###############
     async def query(
-        self, query: str, top_k: int, ids: list[str] | None = None
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
     ) -> list[dict[str, Any]]:
-        embeddings = await self.embedding_func([query])
-        embedding = embeddings[0]
-        embedding_string = ",".join(map(str, embedding))
+        embedding = await self.embed_query(query, query_embedding)
 
-        if ids:
-            formatted_ids = ",".join(f"'{id}'" for id in ids)
-        else:
-            formatted_ids = "NULL"
-
-        sql = SQL_TEMPLATES[self.base_namespace].format(
-            embedding_string=embedding_string, doc_ids=formatted_ids
-        )
+        # The statement text is constant, so each connection prepares it once
+        # and the embedding is sent as a bound parameter
+        sql = SQL_TEMPLATES[self.base_namespace]
         params = {
             "workspace": self.db.workspace,
             "better_than_threshold": self.cosine_better_than_threshold,
             "top_k": top_k,
+            "doc_ids": list(ids) if ids else None,
+            "embedding": self.db.vector_param(np.asarray(embedding, dtype=np.float32)),
         }
         results = await self.db.query(sql, params=params, multirows=True)
         return results
@@ -683,7 +854,7 @@ class PGDocStatusStorage(DocStatusStorage):
 
     async def initialize(self):
         if self.db is None:
-            self.db = await ClientManager.get_client()
+            self.db = await ClientManager.get_client("doc_status")
 
     async def finalize(self):
         if self.db is not None:
@@ -790,20 +961,20 @@ class PGDocStatusStorage(DocStatusStorage):
                   chunks_count = EXCLUDED.chunks_count,
                   status = EXCLUDED.status,
                   updated_at = CURRENT_TIMESTAMP"""
-        for k, v in data.items():
-            # chunks_count is optional
-            await self.db.execute(
-                sql,
-                {
-                    "workspace": self.db.workspace,
-                    "id": k,
-                    "content": v["content"],
-                    "content_summary": v["content_summary"],
-                    "content_length": v["content_length"],
-                    "chunks_count": v["chunks_count"] if "chunks_count" in v else -1,
-                    "status": v["status"],
-                },
-            )
+        rows = [
+            {
+                "workspace": self.db.workspace,
+                "id": k,
+                "content": v["content"],
+                "content_summary": v["content_summary"],
+                "content_length": v["content_length"],
+                # chunks_count is optional
+                "chunks_count": v["chunks_count"] if "chunks_count" in v else -1,
+                "status": v["status"],
+            }
+            for k, v in data.items()
+        ]
+        await self.db.executemany(sql, rows)
 
     async def drop(self) -> None:
         """Drop the storage"""
@@ -841,7 +1012,7 @@ class PGGraphStorage(BaseGraphStorage):
 
     async def initialize(self):
         if self.db is None:
-            self.db = await ClientManager.get_client()
+            self.db = await ClientManager.get_client("graph")
 
     async def finalize(self):
         if self.db is not None:
@@ -1215,6 +1386,188 @@ class PGGraphStorage(BaseGraphStorage):
 
         return edges
 
+    async def get_nodes_batch(self, node_ids: list[str]) -> dict[str, dict[str, str]]:
+        """
+        Retrieve multiple nodes with a single cypher query.
+
+        Args:
+            node_ids (list[str]): A list of node IDs to look up.
+
+        Returns:
+            dict[str, dict[str, str]]: Node properties keyed by node ID, missing nodes are omitted.
+        """
+        if not node_ids:
+            return {}
+
+        labels = {
+            self._encode_graph_label(node_id.strip('"')): node_id
+            for node_id in node_ids
+        }
+        node_id_list = ", ".join([f'"{label}"' for label in labels])
+
+        query = """SELECT * FROM cypher('%s', $$
+                     MATCH (n:Entity)
+                     WHERE n.node_id IN [%s]
+                     RETURN n
+                   $$) AS (n agtype)""" % (self.graph_name, node_id_list)
+
+        nodes = {}
+        for record in await self._query(query):
+            node_dict = record["n"]
+            node_id = labels.get(node_dict.get("node_id"))
+            if node_id is not None and node_id not in nodes:
+                nodes[node_id] = node_dict
+        return nodes
+
+    async def node_degrees_batch(self, node_ids: list[str]) -> dict[str, int]:
+        """
+        Retrieve the degrees of multiple nodes with a single cypher query.
+
+        Args:
+            node_ids (list[str]): A list of node IDs to look up.
+
+        Returns:
+            dict[str, int]: Degrees keyed by node ID, missing nodes have a degree of 0.
+        """
+        if not node_ids:
+            return {}
+
+        labels = {
+            self._encode_graph_label(node_id.strip('"')): node_id
+            for node_id in node_ids
+        }
+        node_id_list = ", ".join([f'"{label}"' for label in labels])
+
+        query = """SELECT * FROM cypher('%s', $$
+                     MATCH (n:Entity)
+                     WHERE n.node_id IN [%s]
+                     OPTIONAL MATCH (n)-[]->(x)
+                     RETURN n.node_id AS node_id, count(x) AS total_edge_count
+                   $$) AS (node_id text, total_edge_count integer)""" % (
+            self.graph_name,
+            node_id_list,
+        )
+
+        degrees = {node_id: 0 for node_id in node_ids}
+        for record in await self._query(query):
+            node_id = labels.get(record["node_id"].strip('"'))
+            if node_id is not None:
+                degrees[node_id] = int(record["total_edge_count"])
+        return degrees
+
+    async def edge_degrees_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], int]:
+        """
+        Retrieve the degrees of multiple edges, reusing one node degree query.
+
+        Args:
+            edge_pairs (list[tuple[str, str]]): A list of (source_node_id, target_node_id) tuples.
+
+        Returns:
+            dict[tuple[str, str], int]: The sum of both node degrees keyed by edge.
+        """
+        node_ids = list({node_id for pair in edge_pairs for node_id in pair})
+        degrees = await self.node_degrees_batch(node_ids)
+        return {
+            (src, tgt): degrees.get(src, 0) + degrees.get(tgt, 0)
+            for src, tgt in edge_pairs
+        }
+
+    async def get_edges_batch(
+        self, edge_pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], dict[str, str]]:
+        """
+        Retrieve multiple edges with a single cypher query.
+
+        Args:
+            edge_pairs (list[tuple[str, str]]): A list of (source_node_id, target_node_id) tuples.
+
+        Returns:
+            dict[tuple[str, str], dict[str, str]]: Edge properties keyed by edge, missing edges are omitted.
+        """
+        if not edge_pairs:
+            return {}
+
+        encoded_pairs = {
+            (
+                self._encode_graph_label(src.strip('"')),
+                self._encode_graph_label(tgt.strip('"')),
+            ): (src, tgt)
+            for src, tgt in edge_pairs
+        }
+        edge_list = ", ".join(
+            [f'["{src}", "{tgt}"]' for src, tgt in encoded_pairs.keys()]
+        )
+
+        query = """SELECT * FROM cypher('%s', $$
+                     MATCH (a:Entity)-[r]->(b:Entity)
+                     WHERE [a.node_id, b.node_id] IN [%s]
+                     RETURN a.node_id AS source, b.node_id AS target, properties(r) AS edge_properties
+                   $$) AS (source text, target text, edge_properties agtype)""" % (
+            self.graph_name,
+            edge_list,
+        )
+
+        edges = {}
+        for record in await self._query(query):
+            pair = encoded_pairs.get(
+                (record["source"].strip('"'), record["target"].strip('"'))
+            )
+            if pair is not None and pair not in edges and record["edge_properties"]:
+                edges[pair] = record["edge_properties"]
+        return edges
+
+    async def get_nodes_edges_batch(
+        self, node_ids: list[str]
+    ) -> dict[str, list[tuple[str, str]]]:
+        """
+        Retrieve the edges of multiple nodes with a single cypher query.
+
+        Args:
+            node_ids (list[str]): A list of node IDs to look up.
+
+        Returns:
+            dict[str, list[tuple[str, str]]]: (source, target) tuples keyed by node ID.
+        """
+        if not node_ids:
+            return {}
+
+        labels = {
+            self._encode_graph_label(node_id.strip('"')): node_id
+            for node_id in node_ids
+        }
+        node_id_list = ", ".join([f'"{label}"' for label in labels])
+
+        query = """SELECT * FROM cypher('%s', $$
+                      MATCH (n:Entity)
+                      WHERE n.node_id IN [%s]
+                      OPTIONAL MATCH (n)-[]-(connected)
+                      RETURN n, connected
+                    $$) AS (n agtype, connected agtype)""" % (
+            self.graph_name,
+            node_id_list,
+        )
+
+        edges = {node_id: [] for node_id in node_ids}
+        for record in await self._query(query):
+            source_node = record["n"] if record["n"] else None
+            connected_node = record["connected"] if record["connected"] else None
+            if not source_node or not connected_node:
+                continue
+            if not source_node.get("node_id") or not connected_node.get("node_id"):
+                continue
+
+            node_id = labels.get(source_node["node_id"])
+            if node_id is not None:
+                edges[node_id].append(
+                    (
+                        self._decode_graph_label(source_node["node_id"]),
+                        self._decode_graph_label(connected_node["node_id"]),
+                    )
+                )
+        return edges
+
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -1632,7 +1985,7 @@ SQL_TEMPLATES = {
     "upsert_doc_full": """INSERT INTO LIGHTRAG_DOC_FULL (id, content, workspace)
                         VALUES ($1, $2, $3)
                         ON CONFLICT (workspace,id) DO UPDATE
-                           SET content = $2, update_time = CURRENT_TIMESTAMP
+                           SET content = EXCLUDED.content, update_time = CURRENT_TIMESTAMP
                        """,
     "upsert_llm_response_cache": """INSERT INTO LIGHTRAG_LLM_CACHE(workspace,id,original_prompt,return_value,mode)
                                       VALUES ($1, $2, $3, $4, $5)
@@ -1714,11 +2067,11 @@ SQL_TEMPLATES = {
     WITH relevant_chunks AS (
         SELECT id as chunk_id
         FROM LIGHTRAG_DOC_CHUNKS
-        WHERE {doc_ids} IS NULL OR full_doc_id = ANY(ARRAY[{doc_ids}])
+        WHERE $4::varchar[] IS NULL OR full_doc_id = ANY($4::varchar[])
     )
     SELECT source_id as src_id, target_id as tgt_id
     FROM (
-        SELECT r.id, r.source_id, r.target_id, 1 - (r.content_vector <=> '[{embedding_string}]'::vector) as distance
+        SELECT r.id, r.source_id, r.target_id, 1 - (r.content_vector <=> $5::vector) as distance
         FROM LIGHTRAG_VDB_RELATION r
         WHERE r.workspace=$1
         AND r.chunk_id IN (SELECT chunk_id FROM relevant_chunks)
@@ -1731,11 +2084,11 @@ SQL_TEMPLATES = {
         WITH relevant_chunks AS (
             SELECT id as chunk_id
             FROM LIGHTRAG_DOC_CHUNKS
-            WHERE {doc_ids} IS NULL OR full_doc_id = ANY(ARRAY[{doc_ids}])
+            WHERE $4::varchar[] IS NULL OR full_doc_id = ANY($4::varchar[])
         )
         SELECT entity_name FROM
             (
-                SELECT id, entity_name, 1 - (content_vector <=> '[{embedding_string}]'::vector) as distance
+                SELECT id, entity_name, 1 - (content_vector <=> $5::vector) as distance
                 FROM LIGHTRAG_VDB_ENTITY
                 where workspace=$1
                 AND chunk_id IN (SELECT chunk_id FROM relevant_chunks)
@@ -1748,11 +2101,11 @@ SQL_TEMPLATES = {
         WITH relevant_chunks AS (
             SELECT id as chunk_id
             FROM LIGHTRAG_DOC_CHUNKS
-            WHERE {doc_ids} IS NULL OR full_doc_id = ANY(ARRAY[{doc_ids}])
+            WHERE $4::varchar[] IS NULL OR full_doc_id = ANY($4::varchar[])
         )
         SELECT id FROM
             (
-                SELECT id, 1 - (content_vector <=> '[{embedding_string}]'::vector) as distance
+                SELECT id, 1 - (content_vector <=> $5::vector) as distance
                 FROM LIGHTRAG_DOC_CHUNKS
                 where workspace=$1
                 AND id IN (SELECT chunk_id FROM relevant_chunks)
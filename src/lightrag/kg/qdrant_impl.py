@@ -5,7 +5,7 @@ from dataclasses import dataclass
 import numpy as np
 import hashlib
 import uuid
-from ..utils import logger
+from ..utils import logger, run_blocking_io
 from ..base import BaseVectorStorage
 import configparser
 
@@ -118,16 +118,26 @@ class QdrantVectorDBStorage(BaseVectorStorage):
                 )
             )
 
-        results = self._client.upsert(
-            collection_name=self.namespace, points=list_points, wait=True
+        results = await run_blocking_io(
+            self._client.upsert,
+            collection_name=self.namespace,
+            points=list_points,
+            wait=True,
         )
         return results
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
-        embedding = await self.embedding_func([query])
-        results = self._client.search(
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
+        embedding = await self.embed_query(query, query_embedding)
+        results = await run_blocking_io(
+            self._client.search,
             collection_name=self.namespace,
-            query_vector=embedding[0],
+            query_vector=embedding,
             limit=top_k,
             with_payload=True,
             score_threshold=self.cosine_better_than_threshold,
@@ -151,7 +161,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             # Convert regular ids to Qdrant compatible ids
             qdrant_ids = [compute_mdhash_id_for_qdrant(id) for id in ids]
             # Delete points from the collection
-            self._client.delete(
+            await run_blocking_io(
+                self._client.delete,
                 collection_name=self.namespace,
                 points_selector=models.PointIdsList(
                     points=qdrant_ids,
@@ -178,7 +189,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
             )
 
             # Delete the entity point from the collection
-            self._client.delete(
+            await run_blocking_io(
+                self._client.delete,
                 collection_name=self.namespace,
                 points_selector=models.PointIdsList(
                     points=[entity_id],
@@ -197,7 +209,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Find relations where the entity is either source or target
-            results = self._client.scroll(
+            results = await run_blocking_io(
+                self._client.scroll,
                 collection_name=self.namespace,
                 scroll_filter=models.Filter(
                     should=[
@@ -219,7 +232,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
 
             if ids_to_delete:
                 # Delete the relations
-                self._client.delete(
+                await run_blocking_io(
+                    self._client.delete,
                     collection_name=self.namespace,
                     points_selector=models.PointIdsList(
                         points=ids_to_delete,
@@ -245,7 +259,8 @@ class QdrantVectorDBStorage(BaseVectorStorage):
         """
         try:
             # Use scroll method to find records with IDs starting with the prefix
-            results = self._client.scroll(
+            results = await run_blocking_io(
+                self._client.scroll,
                 collection_name=self.namespace,
                 scroll_filter=models.Filter(
                     must=[
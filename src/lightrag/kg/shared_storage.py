@@ -1,6 +1,10 @@
 import os
 import sys
 import asyncio
+import threading
+import weakref
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing.synchronize import Lock as ProcessLock
 from multiprocessing import Manager
 from typing import Any, Dict, Optional, Union, TypeVar, Generic
@@ -40,6 +44,49 @@ _internal_lock: Optional[LockType] = None
 _pipeline_status_lock: Optional[LockType] = None
 _graph_db_lock: Optional[LockType] = None
 _data_init_lock: Optional[LockType] = None
+# sharded lock table for per-entity graph merges, keyed by a stable hash of the key
+_graph_db_shard_locks: Optional[list[LockType]] = None
+# namespace -> (readers mutex, resource lock, readers count) of its reader/writer lock
+_storage_rw_locks: Optional[Dict[str, tuple]] = None
+
+# Number of shards in the graph lock table used for per-entity merges
+GRAPH_DB_LOCK_SHARDS = int(os.getenv("GRAPH_DB_LOCK_SHARDS", 64))
+# Seconds to wait for a cross-process lock before raising TimeoutError, 0 waits forever
+SHARED_LOCK_TIMEOUT = float(os.getenv("SHARED_LOCK_TIMEOUT", 0))
+# Seconds an executor thread blocks on a cross-process lock before checking again
+_PROCESS_LOCK_WAIT_SLICE = 1.0
+# Threads of this process that may block on contended cross-process locks
+SHARED_LOCK_WAIT_THREADS = int(os.getenv("SHARED_LOCK_WAIT_THREADS", 4))
+
+# (pid, executor) running the blocking cross-process lock waits of this process.
+# A dedicated executor keeps lock waits from filling the default executor used by
+# asyncio.to_thread, and it is recreated in forked workers
+_lock_wait_executor: Optional[tuple[int, ThreadPoolExecutor]] = None
+_lock_wait_executor_guard = threading.Lock()
+# event loop -> lock name -> asyncio.Lock queueing the coroutines of this process
+# in front of a cross-process lock
+_local_lock_tables: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = weakref.WeakKeyDictionary()
+
+
+def _get_lock_wait_executor() -> ThreadPoolExecutor:
+    global _lock_wait_executor
+    with _lock_wait_executor_guard:
+        if _lock_wait_executor is None or _lock_wait_executor[0] != os.getpid():
+            _lock_wait_executor = (
+                os.getpid(),
+                ThreadPoolExecutor(
+                    max_workers=max(SHARED_LOCK_WAIT_THREADS, 1),
+                    thread_name_prefix="lightrag_lock_wait",
+                ),
+            )
+        return _lock_wait_executor[1]
+
+
+class MutableValue:
+    """A simple mutable value holder with the same interface as a Manager Value"""
+
+    def __init__(self, initial_value=None):
+        self.value = initial_value
 
 
 class UnifiedLock(Generic[T]):
@@ -51,12 +98,26 @@ class UnifiedLock(Generic[T]):
         is_async: bool,
         name: str = "unnamed",
         enable_logging: bool = True,
+        queue_locally: bool = True,
     ):
         self._lock = lock
         self._is_async = is_async
         self._pid = os.getpid()  # for debug only
-        self._name = name  # for debug only
+        self._name = name  # also keys the local queue of the lock
         self._enable_logging = enable_logging  # for debug only
+        # Locks released by another holder than the one that acquired them,
+        # like the resource lock of UnifiedRWLock, can not queue locally
+        self._queue_locally = queue_locally and not is_async
+
+    def _get_local_lock(self) -> asyncio.Lock | None:
+        """The asyncio.Lock coroutines of this process queue on before the process lock"""
+        if not self._queue_locally:
+            return None
+        local_locks = _local_lock_tables.setdefault(asyncio.get_running_loop(), {})
+        local_lock = local_locks.get(self._name)
+        if local_lock is None:
+            local_lock = local_locks[self._name] = asyncio.Lock()
+        return local_lock
 
     async def __aenter__(self) -> "UnifiedLock[T]":
         try:
@@ -67,7 +128,15 @@ class UnifiedLock(Generic[T]):
             if self._is_async:
                 await self._lock.acquire()
             else:
-                self._lock.acquire()
+                local_lock = self._get_local_lock()
+                if local_lock is not None:
+                    await local_lock.acquire()
+                try:
+                    await self._acquire_process_lock()
+                except BaseException:
+                    if local_lock is not None:
+                        local_lock.release()
+                    raise
             direct_log(
                 f"== Lock == Process {self._pid}: Lock '{self._name}' acquired (async={self._is_async})",
                 enable_output=self._enable_logging,
@@ -81,6 +150,44 @@ class UnifiedLock(Generic[T]):
             )
             raise
 
+    async def _acquire_process_lock(self):
+        """Acquire a cross-process lock without blocking the event loop
+
+        An uncontended lock is taken with a single non-blocking call. Otherwise
+        the blocking acquire runs in slices on the lock wait executor, so the
+        event loop keeps serving other coroutines while this one waits. With the
+        local queue in front, a process has at most one waiting thread per lock.
+        """
+        if self._lock.acquire(False):
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = (
+            loop.time() + SHARED_LOCK_TIMEOUT if SHARED_LOCK_TIMEOUT > 0 else None
+        )
+        while True:
+            wait = _PROCESS_LOCK_WAIT_SLICE
+            if deadline is not None:
+                wait = min(wait, deadline - loop.time())
+                if wait <= 0:
+                    raise TimeoutError(
+                        f"Timed out after {SHARED_LOCK_TIMEOUT}s waiting for lock '{self._name}'"
+                    )
+            future = loop.run_in_executor(
+                _get_lock_wait_executor(), self._lock.acquire, True, wait
+            )
+            try:
+                if await asyncio.shield(future):
+                    return
+            except asyncio.CancelledError:
+                # The executor thread may still get the lock, hand it back if so
+                future.add_done_callback(self._release_if_acquired)
+                raise
+
+    def _release_if_acquired(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is None and future.result():
+            self._lock.release()
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         try:
             direct_log(
@@ -90,7 +197,12 @@ class UnifiedLock(Generic[T]):
             if self._is_async:
                 self._lock.release()
             else:
-                self._lock.release()
+                try:
+                    self._lock.release()
+                finally:
+                    local_lock = self._get_local_lock()
+                    if local_lock is not None:
+                        local_lock.release()
             direct_log(
                 f"== Lock == Process {self._pid}: Lock '{self._name}' released (async={self._is_async})",
                 enable_output=self._enable_logging,
@@ -149,6 +261,108 @@ class UnifiedLock(Generic[T]):
             raise
 
 
+class UnifiedRWLock:
+    """Readers-writer lock shared by all workers of a storage namespace
+
+    Any number of readers across all processes hold the lock together, while a
+    writer holds it alone. The first reader takes the resource lock on behalf of
+    all readers and the last one releases it. A writer holds the turnstile while
+    it waits for the resource, and new readers have to pass the turnstile, so a
+    stream of overlapping readers can not starve a pending writer.
+    """
+
+    def __init__(
+        self,
+        mutex: LockType,
+        resource: LockType,
+        turnstile: LockType,
+        readers: Any,
+        name: str = "unnamed",
+        enable_logging: bool = False,
+    ):
+        is_async = not is_multiprocess
+        # Guards the readers count
+        self._mutex = UnifiedLock(
+            lock=mutex,
+            is_async=is_async,
+            name=f"{name}_readers",
+            enable_logging=enable_logging,
+        )
+        # Taken by the first reader and released by the last one
+        self._resource = UnifiedLock(
+            lock=resource,
+            is_async=is_async,
+            name=name,
+            enable_logging=enable_logging,
+            queue_locally=False,
+        )
+        # Held by a writer from before it waits for the resource until it is done
+        self._turnstile = UnifiedLock(
+            lock=turnstile,
+            is_async=is_async,
+            name=f"{name}_turnstile",
+            enable_logging=enable_logging,
+        )
+        self._readers = readers
+
+    def reader(self) -> "_ReaderLock":
+        """return the shared lock for read-only access"""
+        return _ReaderLock(self)
+
+    def writer(self) -> "_WriterLock":
+        """return the exclusive lock for read-write access"""
+        return _WriterLock(self)
+
+
+class _ReaderLock:
+    def __init__(self, rw_lock: UnifiedRWLock):
+        self._rw_lock = rw_lock
+
+    async def __aenter__(self) -> "_ReaderLock":
+        rw_lock = self._rw_lock
+        # Wait behind a pending writer
+        async with rw_lock._turnstile:
+            pass
+        async with rw_lock._mutex:
+            rw_lock._readers.value += 1
+            if rw_lock._readers.value == 1:
+                try:
+                    await rw_lock._resource.__aenter__()
+                except BaseException:
+                    rw_lock._readers.value -= 1
+                    raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        rw_lock = self._rw_lock
+        async with rw_lock._mutex:
+            rw_lock._readers.value -= 1
+            if rw_lock._readers.value == 0:
+                await rw_lock._resource.__aexit__(exc_type, exc_val, exc_tb)
+
+
+class _WriterLock:
+    def __init__(self, rw_lock: UnifiedRWLock):
+        self._rw_lock = rw_lock
+
+    async def __aenter__(self) -> "_WriterLock":
+        rw_lock = self._rw_lock
+        await rw_lock._turnstile.__aenter__()
+        try:
+            await rw_lock._resource.__aenter__()
+        except BaseException:
+            await rw_lock._turnstile.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        rw_lock = self._rw_lock
+        try:
+            await rw_lock._resource.__aexit__(exc_type, exc_val, exc_tb)
+        finally:
+            await rw_lock._turnstile.__aexit__(exc_type, exc_val, exc_tb)
+
+
 def get_internal_lock(enable_logging: bool = False) -> UnifiedLock:
     """return unified storage lock for data consistency"""
     return UnifiedLock(
@@ -169,6 +383,41 @@ def get_storage_lock(enable_logging: bool = False) -> UnifiedLock:
     )
 
 
+async def get_storage_rw_lock(
+    namespace: str, enable_logging: bool = False
+) -> UnifiedRWLock:
+    """return the reader/writer lock of a storage namespace, shared by all workers"""
+    if _storage_rw_locks is None:
+        raise ValueError("Try to create namespace before Shared-Data is initialized")
+
+    async with get_internal_lock():
+        if namespace not in _storage_rw_locks:
+            if is_multiprocess and _manager is not None:
+                _storage_rw_locks[namespace] = (
+                    _manager.Lock(),
+                    _manager.Lock(),
+                    _manager.Lock(),
+                    _manager.Value("i", 0),
+                )
+            else:
+                _storage_rw_locks[namespace] = (
+                    asyncio.Lock(),
+                    asyncio.Lock(),
+                    asyncio.Lock(),
+                    MutableValue(0),
+                )
+        mutex, resource, turnstile, readers = _storage_rw_locks[namespace]
+
+    return UnifiedRWLock(
+        mutex,
+        resource,
+        turnstile,
+        readers,
+        name=f"storage_lock_{namespace}",
+        enable_logging=enable_logging,
+    )
+
+
 def get_pipeline_status_lock(enable_logging: bool = False) -> UnifiedLock:
     """return unified storage lock for data consistency"""
     return UnifiedLock(
@@ -189,6 +438,22 @@ def get_graph_db_lock(enable_logging: bool = False) -> UnifiedLock:
     )
 
 
+def get_graph_db_shard_lock(key: str, enable_logging: bool = False) -> UnifiedLock:
+    """return the unified graph lock shard guarding a single entity or relation key
+
+    Keys are mapped to shards with crc32, which is stable across worker processes,
+    so merges of different entities can run in parallel while merges of the same
+    entity are serialized in all processes.
+    """
+    shard = zlib.crc32(key.encode("utf-8")) % len(_graph_db_shard_locks)
+    return UnifiedLock(
+        lock=_graph_db_shard_locks[shard],
+        is_async=not is_multiprocess,
+        name=f"graph_db_shard_lock_{shard}",
+        enable_logging=enable_logging,
+    )
+
+
 def get_data_init_lock(enable_logging: bool = False) -> UnifiedLock:
     """return unified data initialization lock for ensuring atomic data initialization"""
     return UnifiedLock(
@@ -225,6 +490,8 @@ def initialize_share_data(workers: int = 1):
         _internal_lock, \
         _pipeline_status_lock, \
         _graph_db_lock, \
+        _graph_db_shard_locks, \
+        _storage_rw_locks, \
         _data_init_lock, \
         _shared_dicts, \
         _init_flags, \
@@ -247,7 +514,11 @@ def initialize_share_data(workers: int = 1):
         _storage_lock = _manager.Lock()
         _pipeline_status_lock = _manager.Lock()
         _graph_db_lock = _manager.Lock()
+        _graph_db_shard_locks = [
+            _manager.Lock() for _ in range(max(GRAPH_DB_LOCK_SHARDS, 1))
+        ]
         _data_init_lock = _manager.Lock()
+        _storage_rw_locks = _manager.dict()
         _shared_dicts = _manager.dict()
         _init_flags = _manager.dict()
         _update_flags = _manager.dict()
@@ -260,7 +531,11 @@ def initialize_share_data(workers: int = 1):
         _storage_lock = asyncio.Lock()
         _pipeline_status_lock = asyncio.Lock()
         _graph_db_lock = asyncio.Lock()
+        _graph_db_shard_locks = [
+            asyncio.Lock() for _ in range(max(GRAPH_DB_LOCK_SHARDS, 1))
+        ]
         _data_init_lock = asyncio.Lock()
+        _storage_rw_locks = {}
         _shared_dicts = {}
         _init_flags = {}
         _update_flags = {}
@@ -293,6 +568,7 @@ async def initialize_pipeline_status():
                 "docs": 0,  # Total number of documents to be indexed
                 "batchs": 0,  # Number of batches for processing documents
                 "cur_batch": 0,  # Current processing batch
+                "stage_stats": {},  # Per-stage document/chunk counters and throughput
                 "request_pending": False,  # Flag for pending request for processing
                 "latest_message": "",  # Latest message from pipeline processing
                 "history_messages": history_messages,  # 使用共享列表对象
@@ -324,11 +600,7 @@ async def get_update_flag(namespace: str):
             new_update_flag = _manager.Value("b", False)
         else:
             # Create a simple mutable object to store boolean value for compatibility with mutiprocess
-            class MutableBoolean:
-                def __init__(self, initial_value=False):
-                    self.value = initial_value
-
-            new_update_flag = MutableBoolean(False)
+            new_update_flag = MutableValue(False)
 
         _update_flags[namespace].append(new_update_flag)
         return new_update_flag
@@ -454,6 +726,8 @@ def finalize_share_data():
         _internal_lock, \
         _pipeline_status_lock, \
         _graph_db_lock, \
+        _graph_db_shard_locks, \
+        _storage_rw_locks, \
         _data_init_lock, \
         _shared_dicts, \
         _init_flags, \
@@ -521,6 +795,8 @@ def finalize_share_data():
     _internal_lock = None
     _pipeline_status_lock = None
     _graph_db_lock = None
+    _graph_db_shard_locks = None
+    _storage_rw_locks = None
     _data_init_lock = None
     _update_flags = None
 
@@ -306,10 +306,15 @@ class TiDBVectorDBStorage(BaseVectorStorage):
             await ClientManager.release_client(self.db)
             self.db = None
 
-    async def query(self, query: str, top_k: int) -> list[dict[str, Any]]:
+    async def query(
+        self,
+        query: str,
+        top_k: int,
+        ids: list[str] | None = None,
+        query_embedding: np.ndarray | None = None,
+    ) -> list[dict[str, Any]]:
         """Search from tidb vector"""
-        embeddings = await self.embedding_func([query])
-        embedding = embeddings[0]
+        embedding = await self.embed_query(query, query_embedding)
 
         embedding_string = "[" + ", ".join(map(str, embedding.tolist())) + "]"
 
@@ -4,12 +4,13 @@ import asyncio
 import configparser
 import os
 import warnings
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, replace
 from datetime import datetime
 from functools import partial
 from typing import Any, AsyncIterator, Callable, Iterator, cast, final
 
 from lightrag.kg import (
+    FIXED_NAMESPACE_KV_STORAGES,
     STORAGE_ENV_REQUIREMENTS,
     STORAGES,
     verify_storage_implementation,
@@ -29,15 +30,19 @@ from .base import (
 from .namespace import NameSpace, make_namespace
 from .operate import (
     chunking_by_token_size,
+    extract_chunk_entities,
     extract_entities,
     kg_query,
+    merge_extracted_entities,
     mix_kg_vector_query,
     naive_query,
     query_with_keywords,
 )
 from .prompt import GRAPH_FIELD_SEP, PROMPTS
 from .utils import (
+    QUERY_PRIORITY,
     EmbeddingFunc,
+    call_priority,
     always_get_an_event_loop,
     compute_mdhash_id,
     convert_response_to_json,
@@ -186,6 +191,17 @@ class LightRAG:
     embedding_func_max_async: int = field(default=16)
     """Maximum number of concurrent embedding function calls."""
 
+    embedding_func_max_tpm: int = field(default=int(os.getenv("EMBEDDING_MAX_TPM", 0)))
+    """Maximum number of tokens per minute sent to the embedding function, 0 for no limit."""
+
+    embedding_func_max_rpm: int = field(default=int(os.getenv("EMBEDDING_MAX_RPM", 0)))
+    """Maximum number of embedding function calls per minute, 0 for no limit."""
+
+    enable_persistent_embedding_cache: bool = field(
+        default=os.getenv("PERSISTENT_EMBEDDING_CACHE", "true").lower() == "true"
+    )
+    """Persist computed embeddings in working_dir, keyed by model and content hash."""
+
     embedding_cache_config: dict[str, Any] = field(
         default_factory=lambda: {
             "enabled": False,
@@ -214,6 +230,12 @@ class LightRAG:
     llm_model_max_async: int = field(default=int(os.getenv("MAX_ASYNC", 16)))
     """Maximum number of concurrent LLM calls."""
 
+    llm_model_max_tpm: int = field(default=int(os.getenv("LLM_MAX_TPM", 0)))
+    """Maximum number of tokens per minute sent to and received from the LLM, 0 for no limit."""
+
+    llm_model_max_rpm: int = field(default=int(os.getenv("LLM_MAX_RPM", 0)))
+    """Maximum number of LLM calls per minute, 0 for no limit."""
+
     llm_model_kwargs: dict[str, Any] = field(default_factory=dict)
     """Additional keyword arguments passed to the LLM model function."""
 
@@ -325,9 +347,34 @@ class LightRAG:
         logger.debug(f"LightRAG init with param:\n  {_print_config}\n")
 
         # Init LLM
-        self.embedding_func = limit_async_func_call(self.embedding_func_max_async)(  # type: ignore
-            self.embedding_func
-        )
+        if isinstance(self.embedding_func, EmbeddingFunc):
+            cache = self.embedding_func.cache
+            if cache is None and self.enable_persistent_embedding_cache:
+                if self.embedding_func.cache_model_name() is not None:
+                    from lightrag.kg.embedding_cache import get_embedding_cache
+
+                    cache = get_embedding_cache(self.working_dir)
+                else:
+                    logger.info(
+                        "Persistent embedding cache disabled: set model_name of the EmbeddingFunc to enable it"
+                    )
+            # Limit the calls made by the batcher instead of the callers waiting on it,
+            # so concurrent callers can be coalesced into larger batches
+            self.embedding_func = replace(
+                self.embedding_func,
+                func=limit_async_func_call(
+                    self.embedding_func_max_async,
+                    tpm=self.embedding_func_max_tpm,
+                    rpm=self.embedding_func_max_rpm,
+                )(self.embedding_func.func),
+                cache=cache,
+            )
+        else:
+            self.embedding_func = limit_async_func_call(  # type: ignore
+                self.embedding_func_max_async,
+                tpm=self.embedding_func_max_tpm,
+                rpm=self.embedding_func_max_rpm,
+            )(self.embedding_func)
 
         # Initialize all storages
         self.key_string_value_json_storage_cls: type[BaseKVStorage] = (
@@ -374,6 +421,21 @@ class LightRAG:
             ),
             embedding_func=self.embedding_func,
         )
+        # Without the document graph index, deleting a document scans the
+        # chunks and the graph
+        self.doc_graph_index: BaseKVStorage | None = None
+        if self.kv_storage in FIXED_NAMESPACE_KV_STORAGES:
+            logger.info(
+                f"{self.kv_storage} can not store the document graph index, "
+                "document deletion will scan the graph"
+            )
+        else:
+            self.doc_graph_index = self.key_string_value_json_storage_cls(  # type: ignore
+                namespace=make_namespace(
+                    self.namespace_prefix, NameSpace.KV_STORE_DOC_GRAPH_INDEX
+                ),
+                embedding_func=self.embedding_func,
+            )
         self.chunk_entity_relation_graph: BaseGraphStorage = self.graph_storage_cls(  # type: ignore
             namespace=make_namespace(
                 self.namespace_prefix, NameSpace.GRAPH_STORE_CHUNK_ENTITY_RELATION
@@ -412,7 +474,11 @@ class LightRAG:
         # Directly use llm_response_cache, don't create a new object
         hashing_kv = self.llm_response_cache
 
-        self.llm_model_func = limit_async_func_call(self.llm_model_max_async)(
+        self.llm_model_func = limit_async_func_call(
+            self.llm_model_max_async,
+            tpm=self.llm_model_max_tpm,
+            rpm=self.llm_model_max_rpm,
+        )(
             partial(
                 self.llm_model_func,  # type: ignore
                 hashing_kv=hashing_kv,
@@ -462,6 +528,7 @@ class LightRAG:
                 self.chunk_entity_relation_graph,
                 self.llm_response_cache,
                 self.doc_status,
+                self.doc_graph_index,
             ):
                 if storage:
                     tasks.append(storage.initialize())
@@ -485,6 +552,7 @@ class LightRAG:
                 self.chunk_entity_relation_graph,
                 self.llm_response_cache,
                 self.doc_status,
+                self.doc_graph_index,
             ):
                 if storage:
                     tasks.append(storage.finalize())
@@ -737,8 +805,10 @@ class LightRAG:
 
         1. Get all pending, failed, and abnormally terminated processing documents.
         2. Split document content into chunks
-        3. Process each chunk for entity and relation extraction
-        4. Update the document status
+        3. Embed the chunks and extract entities and relations from them, streaming
+           documents through the stages so the LLM stays busy between documents
+        4. Merge the extracted entities and relations into the graph
+        5. Update the document status
         """
         from lightrag.kg.shared_storage import (
             get_namespace_data,
@@ -803,154 +873,24 @@ class LightRAG:
                     pipeline_status["history_messages"].append(log_message)
                     break
 
-                # 2. split docs into chunks, insert chunks, update doc status
-                docs_batches = [
-                    list(to_process_docs.items())[i : i + self.max_parallel_insert]
-                    for i in range(0, len(to_process_docs), self.max_parallel_insert)
-                ]
-
-                log_message = f"Number of batches to process: {len(docs_batches)}."
+                # 2. stream docs through the chunking, embedding, extraction and merge stages
+                log_message = f"Processing {len(to_process_docs)} documents in a pipeline of up to {self.max_parallel_insert} documents in flight."
                 logger.info(log_message)
 
                 # Update pipeline status with current batch information
                 pipeline_status["docs"] += len(to_process_docs)
-                pipeline_status["batchs"] += len(docs_batches)
+                pipeline_status["batchs"] += 1
+                pipeline_status["cur_batch"] += 1
                 pipeline_status["latest_message"] = log_message
                 pipeline_status["history_messages"].append(log_message)
 
-                batches: list[Any] = []
-                # 3. iterate over batches
-                for batch_idx, docs_batch in enumerate(docs_batches):
-                    # Update current batch in pipeline status (directly, as it's atomic)
-                    pipeline_status["cur_batch"] += 1
-
-                    async def batch(
-                        batch_idx: int,
-                        docs_batch: list[tuple[str, DocProcessingStatus]],
-                        size_batch: int,
-                    ) -> None:
-                        log_message = (
-                            f"Start processing batch {batch_idx + 1} of {size_batch}."
-                        )
-                        logger.info(log_message)
-                        pipeline_status["latest_message"] = log_message
-                        pipeline_status["history_messages"].append(log_message)
-                        # 4. iterate over batch
-                        for doc_id_processing_status in docs_batch:
-                            doc_id, status_doc = doc_id_processing_status
-                            # Generate chunks from document
-                            chunks: dict[str, Any] = {
-                                compute_mdhash_id(dp["content"], prefix="chunk-"): {
-                                    **dp,
-                                    "full_doc_id": doc_id,
-                                }
-                                for dp in self.chunking_func(
-                                    status_doc.content,
-                                    split_by_character,
-                                    split_by_character_only,
-                                    self.chunk_overlap_token_size,
-                                    self.chunk_token_size,
-                                    self.tiktoken_model_name,
-                                )
-                            }
-                            # Process document (text chunks and full docs) in parallel
-                            # Create tasks with references for potential cancellation
-                            doc_status_task = asyncio.create_task(
-                                self.doc_status.upsert(
-                                    {
-                                        doc_id: {
-                                            "status": DocStatus.PROCESSING,
-                                            "updated_at": datetime.now().isoformat(),
-                                            "content": status_doc.content,
-                                            "content_summary": status_doc.content_summary,
-                                            "content_length": status_doc.content_length,
-                                            "created_at": status_doc.created_at,
-                                        }
-                                    }
-                                )
-                            )
-                            chunks_vdb_task = asyncio.create_task(
-                                self.chunks_vdb.upsert(chunks)
-                            )
-                            entity_relation_task = asyncio.create_task(
-                                self._process_entity_relation_graph(
-                                    chunks, pipeline_status, pipeline_status_lock
-                                )
-                            )
-                            full_docs_task = asyncio.create_task(
-                                self.full_docs.upsert(
-                                    {doc_id: {"content": status_doc.content}}
-                                )
-                            )
-                            text_chunks_task = asyncio.create_task(
-                                self.text_chunks.upsert(chunks)
-                            )
-                            tasks = [
-                                doc_status_task,
-                                chunks_vdb_task,
-                                entity_relation_task,
-                                full_docs_task,
-                                text_chunks_task,
-                            ]
-                            try:
-                                await asyncio.gather(*tasks)
-                                await self.doc_status.upsert(
-                                    {
-                                        doc_id: {
-                                            "status": DocStatus.PROCESSED,
-                                            "chunks_count": len(chunks),
-                                            "content": status_doc.content,
-                                            "content_summary": status_doc.content_summary,
-                                            "content_length": status_doc.content_length,
-                                            "created_at": status_doc.created_at,
-                                            "updated_at": datetime.now().isoformat(),
-                                        }
-                                    }
-                                )
-                            except Exception as e:
-                                # Log error and update pipeline status
-                                error_msg = (
-                                    f"Failed to process document {doc_id}: {str(e)}"
-                                )
-                                logger.error(error_msg)
-                                pipeline_status["latest_message"] = error_msg
-                                pipeline_status["history_messages"].append(error_msg)
-
-                                # Cancel other tasks as they are no longer meaningful
-                                for task in [
-                                    chunks_vdb_task,
-                                    entity_relation_task,
-                                    full_docs_task,
-                                    text_chunks_task,
-                                ]:
-                                    if not task.done():
-                                        task.cancel()
-
-                                # Update document status to failed
-                                await self.doc_status.upsert(
-                                    {
-                                        doc_id: {
-                                            "status": DocStatus.FAILED,
-                                            "error": str(e),
-                                            "content": status_doc.content,
-                                            "content_summary": status_doc.content_summary,
-                                            "content_length": status_doc.content_length,
-                                            "created_at": status_doc.created_at,
-                                            "updated_at": datetime.now().isoformat(),
-                                        }
-                                    }
-                                )
-                                continue
-                        log_message = (
-                            f"Completed batch {batch_idx + 1} of {len(docs_batches)}."
-                        )
-                        logger.info(log_message)
-                        pipeline_status["latest_message"] = log_message
-                        pipeline_status["history_messages"].append(log_message)
-
-                    batches.append(batch(batch_idx, docs_batch, len(docs_batches)))
-
-                await asyncio.gather(*batches)
+                await self._process_documents_pipeline(
+                    to_process_docs,
+                    split_by_character,
+                    split_by_character_only,
+                    pipeline_status,
+                    pipeline_status_lock,
+                )
                 await self._insert_done()
 
                 # Check if there's a pending request to process more documents (with lock)
@@ -990,6 +930,226 @@ class LightRAG:
                 pipeline_status["latest_message"] = log_message
                 pipeline_status["history_messages"].append(log_message)
 
+    async def _process_documents_pipeline(
+        self,
+        docs: dict[str, DocProcessingStatus],
+        split_by_character: str | None,
+        split_by_character_only: bool,
+        pipeline_status: dict,
+        pipeline_status_lock,
+    ) -> None:
+        """
+        Stream documents through chunking, embedding, extraction and merge stages.
+
+        The stages are connected by bounded queues and at most `max_parallel_insert`
+        documents are in flight, so chunks of the next documents are extracted while
+        earlier documents are still being embedded or merged into the graph. This keeps
+        the `llm_model_max_async` LLM slots busy across document boundaries. Per-stage
+        counters are published in `pipeline_status["stage_stats"]`.
+        """
+        global_config = asdict(self)
+        in_flight = asyncio.Semaphore(self.max_parallel_insert)
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_parallel_insert)
+        extract_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_parallel_insert)
+        merge_queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_parallel_insert)
+        # Each document waits for its embedding and its extraction + merge branch
+        pending_branches: dict[str, int] = {}
+        errors: dict[str, str] = {}
+
+        started = datetime.now()
+        stage_stats = {
+            stage: {"docs": 0, "chunks": 0, "docs_per_sec": 0.0}
+            for stage in ("chunking", "embedding", "extraction", "merging")
+        }
+        pipeline_status["stage_stats"] = stage_stats
+
+        def record_stage(stage: str, chunks_count: int) -> None:
+            stats = stage_stats[stage]
+            stats["docs"] += 1
+            stats["chunks"] += chunks_count
+            elapsed = max((datetime.now() - started).total_seconds(), 1e-6)
+            stats["docs_per_sec"] = round(stats["docs"] / elapsed, 3)
+            # Reassign so the update reaches other processes through a Manager dict
+            pipeline_status["stage_stats"] = {
+                name: dict(values) for name, values in stage_stats.items()
+            }
+
+        def status_record(
+            status_doc: DocProcessingStatus, status: DocStatus, **extra: Any
+        ) -> dict[str, Any]:
+            return {
+                "status": status,
+                "content": status_doc.content,
+                "content_summary": status_doc.content_summary,
+                "content_length": status_doc.content_length,
+                "created_at": status_doc.created_at,
+                "updated_at": datetime.now().isoformat(),
+                **extra,
+            }
+
+        async def fail(doc_id: str, e: Exception) -> None:
+            error_msg = f"Failed to process document {doc_id}: {str(e)}"
+            logger.error(error_msg)
+            pipeline_status["latest_message"] = error_msg
+            pipeline_status["history_messages"].append(error_msg)
+            errors.setdefault(doc_id, str(e))
+
+        async def branch_done(
+            doc_id: str, status_doc: DocProcessingStatus, chunks_count: int
+        ) -> None:
+            pending_branches[doc_id] -= 1
+            if pending_branches[doc_id]:
+                return
+            del pending_branches[doc_id]
+            try:
+                if doc_id in errors:
+                    await self.doc_status.upsert(
+                        {
+                            doc_id: status_record(
+                                status_doc, DocStatus.FAILED, error=errors.pop(doc_id)
+                            )
+                        }
+                    )
+                else:
+                    await self.doc_status.upsert(
+                        {
+                            doc_id: status_record(
+                                status_doc,
+                                DocStatus.PROCESSED,
+                                chunks_count=chunks_count,
+                            )
+                        }
+                    )
+            except Exception as e:
+                logger.error(f"Failed to update status of document {doc_id}: {e}")
+            finally:
+                in_flight.release()
+
+        async def chunk_stage() -> None:
+            for doc_id, status_doc in docs.items():
+                await in_flight.acquire()
+                pending_branches[doc_id] = 2
+                try:
+                    # Generate chunks from document in a worker thread, as
+                    # tokenizing a large document would block the event loop
+                    chunking_result = await asyncio.to_thread(
+                        self.chunking_func,
+                        status_doc.content,
+                        split_by_character,
+                        split_by_character_only,
+                        self.chunk_overlap_token_size,
+                        self.chunk_token_size,
+                        self.tiktoken_model_name,
+                    )
+                    chunks: dict[str, Any] = {
+                        compute_mdhash_id(dp["content"], prefix="chunk-"): {
+                            **dp,
+                            "full_doc_id": doc_id,
+                        }
+                        for dp in chunking_result
+                    }
+                    await self.doc_status.upsert(
+                        {doc_id: status_record(status_doc, DocStatus.PROCESSING)}
+                    )
+                except Exception as e:
+                    await fail(doc_id, e)
+                    pending_branches[doc_id] = 1
+                    await branch_done(doc_id, status_doc, 0)
+                    continue
+                record_stage("chunking", len(chunks))
+                await embed_queue.put((doc_id, status_doc, chunks))
+                await extract_queue.put((doc_id, status_doc, chunks))
+
+        async def embed_stage() -> None:
+            while (item := await embed_queue.get()) is not None:
+                doc_id, status_doc, chunks = item
+                try:
+                    await asyncio.gather(
+                        self.chunks_vdb.upsert(chunks),
+                        self.full_docs.upsert(
+                            {doc_id: {"content": status_doc.content}}
+                        ),
+                        self.text_chunks.upsert(chunks),
+                    )
+                    record_stage("embedding", len(chunks))
+                except Exception as e:
+                    await fail(doc_id, e)
+                await branch_done(doc_id, status_doc, len(chunks))
+
+        async def extract_stage() -> None:
+            while (item := await extract_queue.get()) is not None:
+                doc_id, status_doc, chunks = item
+                try:
+                    maybe_nodes, maybe_edges = await extract_chunk_entities(
+                        chunks,
+                        global_config,
+                        pipeline_status=pipeline_status,
+                        pipeline_status_lock=pipeline_status_lock,
+                        llm_response_cache=self.llm_response_cache,
+                    )
+                    record_stage("extraction", len(chunks))
+                except Exception as e:
+                    logger.error("Failed to extract entities and relationships")
+                    await fail(doc_id, e)
+                    await branch_done(doc_id, status_doc, len(chunks))
+                    continue
+                await merge_queue.put(
+                    (doc_id, status_doc, chunks, maybe_nodes, maybe_edges)
+                )
+
+        async def merge_stage() -> None:
+            while (item := await merge_queue.get()) is not None:
+                doc_id, status_doc, chunks, maybe_nodes, maybe_edges = item
+                try:
+                    await merge_extracted_entities(
+                        maybe_nodes,
+                        maybe_edges,
+                        knowledge_graph_inst=self.chunk_entity_relation_graph,
+                        entity_vdb=self.entities_vdb,
+                        relationships_vdb=self.relationships_vdb,
+                        global_config=global_config,
+                        pipeline_status=pipeline_status,
+                        pipeline_status_lock=pipeline_status_lock,
+                        chunks=chunks,
+                        doc_graph_index=self.doc_graph_index,
+                    )
+                    record_stage("merging", len(chunks))
+                except Exception as e:
+                    await fail(doc_id, e)
+                await branch_done(doc_id, status_doc, len(chunks))
+
+        # Documents in the extraction stage share the LLM semaphore, so one
+        # worker per in-flight document is enough to keep it saturated
+        workers = self.max_parallel_insert
+
+        async def run_producer() -> None:
+            try:
+                await chunk_stage()
+            finally:
+                for _ in range(workers):
+                    await embed_queue.put(None)
+                    await extract_queue.put(None)
+
+        async def run_extract_and_merge() -> None:
+            try:
+                await asyncio.gather(*[extract_stage() for _ in range(workers)])
+            finally:
+                for _ in range(workers):
+                    await merge_queue.put(None)
+
+        # Merges lock single entities and relations only, so documents merge in parallel
+        await asyncio.gather(
+            run_producer(),
+            *[embed_stage() for _ in range(workers)],
+            run_extract_and_merge(),
+            *[merge_stage() for _ in range(workers)],
+        )
+
+        log_message = f"Completed processing {len(docs)} documents."
+        logger.info(log_message)
+        pipeline_status["latest_message"] = log_message
+        pipeline_status["history_messages"].append(log_message)
+
     async def _process_entity_relation_graph(
         self, chunk: dict[str, Any], pipeline_status=None, pipeline_status_lock=None
     ) -> None:
@@ -1003,6 +1163,7 @@ class LightRAG:
                 pipeline_status=pipeline_status,
                 pipeline_status_lock=pipeline_status_lock,
                 llm_response_cache=self.llm_response_cache,
+                doc_graph_index=self.doc_graph_index,
             )
         except Exception as e:
             logger.error("Failed to extract entities and relationships")
@@ -1021,6 +1182,7 @@ class LightRAG:
                 self.relationships_vdb,
                 self.chunks_vdb,
                 self.chunk_entity_relation_graph,
+                self.doc_graph_index,
             ]
             if storage_inst is not None
         ]
@@ -1238,6 +1400,18 @@ class LightRAG:
         Returns:
             str: The result of the query execution.
         """
+        # Queries overtake queued document extraction calls
+        with call_priority(QUERY_PRIORITY):
+            response = await self._aquery(query, param, system_prompt)
+        await self._query_done()
+        return response
+
+    async def _aquery(
+        self,
+        query: str,
+        param: QueryParam,
+        system_prompt: str | None,
+    ) -> str | AsyncIterator[str]:
         if param.mode in ["local", "global", "hybrid"]:
             response = await kg_query(
                 query.strip(),
@@ -1275,7 +1449,6 @@ class LightRAG:
             )
         else:
             raise ValueError(f"Unknown mode {param.mode}")
-        await self._query_done()
         return response
 
     def query_with_separate_keyword_extraction(
@@ -1313,18 +1486,19 @@ class LightRAG:
         Returns:
             Query response or async iterator
         """
-        response = await query_with_keywords(
-            query=query,
-            prompt=prompt,
-            param=param,
-            knowledge_graph_inst=self.chunk_entity_relation_graph,
-            entities_vdb=self.entities_vdb,
-            relationships_vdb=self.relationships_vdb,
-            chunks_vdb=self.chunks_vdb,
-            text_chunks_db=self.text_chunks,
-            global_config=asdict(self),
-            hashing_kv=self.llm_response_cache,
-        )
+        with call_priority(QUERY_PRIORITY):
+            response = await query_with_keywords(
+                query=query,
+                prompt=prompt,
+                param=param,
+                knowledge_graph_inst=self.chunk_entity_relation_graph,
+                entities_vdb=self.entities_vdb,
+                relationships_vdb=self.relationships_vdb,
+                chunks_vdb=self.chunks_vdb,
+                text_chunks_db=self.text_chunks,
+                global_config=asdict(self),
+                hashing_kv=self.llm_response_cache,
+            )
 
         await self._query_done()
         return response
@@ -1456,65 +1630,78 @@ class LightRAG:
 
             logger.debug(f"Starting deletion for document {doc_id}")
 
-            # 2. Get all chunks related to this document
-            # Find all chunks where full_doc_id equals the current doc_id
-            all_chunks = await self.text_chunks.get_all()
-            related_chunks = {
-                chunk_id: chunk_data
-                for chunk_id, chunk_data in all_chunks.items()
-                if isinstance(chunk_data, dict)
-                and chunk_data.get("full_doc_id") == doc_id
-            }
+            # 2. Look up the chunks, entities and relations of this document in
+            # the reverse index maintained during entity extraction
+            doc_index = None
+            if self.doc_graph_index is not None:
+                doc_index = await self.doc_graph_index.get_by_id(doc_id)
+            if doc_index is not None:
+                chunk_ids = set(doc_index["chunks"].keys())
+                candidate_relations = {
+                    (src, tgt)
+                    for chunk_index in doc_index["chunks"].values()
+                    for src, tgt in chunk_index["relations"]
+                }
+                # Relation endpoints that were not extracted as entities exist
+                # as placeholder nodes sourced from the relation's chunks
+                candidate_entities = {
+                    entity
+                    for chunk_index in doc_index["chunks"].values()
+                    for entity in chunk_index["entities"]
+                }
+                for src, tgt in candidate_relations:
+                    candidate_entities.update((src, tgt))
+            else:
+                # Documents indexed before the reverse index existed, or whose
+                # extraction failed, need a scan of the chunks and the graph
+                logger.info(
+                    f"No graph index for document {doc_id}, scanning all chunks and nodes"
+                )
+                all_chunks = await self.text_chunks.get_all()
+                chunk_ids = {
+                    chunk_id
+                    for chunk_id, chunk_data in all_chunks.items()
+                    if isinstance(chunk_data, dict)
+                    and chunk_data.get("full_doc_id") == doc_id
+                }
+                candidate_entities = set(
+                    await self.chunk_entity_relation_graph.get_all_labels()
+                )
+                candidate_relations = set()
+                for node_label in candidate_entities:
+                    node_edges = await self.chunk_entity_relation_graph.get_node_edges(
+                        node_label
+                    )
+                    if node_edges:
+                        candidate_relations.update(node_edges)
 
-            if not related_chunks:
+            if not chunk_ids:
                 logger.warning(f"No chunks found for document {doc_id}")
                 return
 
-            # Get all related chunk IDs
-            chunk_ids = set(related_chunks.keys())
-            logger.debug(f"Found {len(chunk_ids)} chunks to delete")
-
-            # 3. Before deleting, check the related entities and relationships for these chunks
-            for chunk_id in chunk_ids:
-                # Check entities
-                entities_storage = await self.entities_vdb.client_storage
-                entities = [
-                    dp
-                    for dp in entities_storage["data"]
-                    if chunk_id in dp.get("source_id")
-                ]
-                logger.debug(f"Chunk {chunk_id} has {len(entities)} related entities")
-
-                # Check relationships
-                relationships_storage = await self.relationships_vdb.client_storage
-                relations = [
-                    dp
-                    for dp in relationships_storage["data"]
-                    if chunk_id in dp.get("source_id")
-                ]
-                logger.debug(f"Chunk {chunk_id} has {len(relations)} related relations")
-
-            # Continue with the original deletion process...
+            logger.debug(
+                f"Found {len(chunk_ids)} chunks, {len(candidate_entities)} candidate entities "
+                f"and {len(candidate_relations)} candidate relations to check"
+            )
 
-            # 4. Delete chunks from vector database
-            if chunk_ids:
-                await self.chunks_vdb.delete(chunk_ids)
-                await self.text_chunks.delete(chunk_ids)
+            # 3. Delete chunks from vector database
+            await self.chunks_vdb.delete(chunk_ids)
+            await self.text_chunks.delete(chunk_ids)
 
-            # 5. Find and process entities and relationships that have these chunks as source
-            # Get all nodes and edges from the graph storage using storage-agnostic methods
+            # 4. Find and process entities and relationships that have these chunks as source
             entities_to_delete = set()
             entities_to_update = {}  # entity_name -> new_source_id
             relationships_to_delete = set()
             relationships_to_update = {}  # (src, tgt) -> new_source_id
 
             # Process entities - use storage-agnostic methods
-            all_labels = await self.chunk_entity_relation_graph.get_all_labels()
-            for node_label in all_labels:
+            for node_label in candidate_entities:
                 node_data = await self.chunk_entity_relation_graph.get_node(node_label)
                 if node_data and "source_id" in node_data:
                     # Split source_id using GRAPH_FIELD_SEP
                     sources = set(node_data["source_id"].split(GRAPH_FIELD_SEP))
+                    if sources.isdisjoint(chunk_ids):
+                        continue
                     sources.difference_update(chunk_ids)
                     if not sources:
                         entities_to_delete.add(node_label)
@@ -1529,30 +1716,25 @@ class LightRAG:
                         )
 
             # Process relationships
-            for node_label in all_labels:
-                node_edges = await self.chunk_entity_relation_graph.get_node_edges(
-                    node_label
-                )
-                if node_edges:
-                    for src, tgt in node_edges:
-                        edge_data = await self.chunk_entity_relation_graph.get_edge(
-                            src, tgt
+            for src, tgt in candidate_relations:
+                edge_data = await self.chunk_entity_relation_graph.get_edge(src, tgt)
+                if edge_data and "source_id" in edge_data:
+                    # Split source_id using GRAPH_FIELD_SEP
+                    sources = set(edge_data["source_id"].split(GRAPH_FIELD_SEP))
+                    if sources.isdisjoint(chunk_ids):
+                        continue
+                    sources.difference_update(chunk_ids)
+                    if not sources:
+                        relationships_to_delete.add((src, tgt))
+                        logger.debug(
+                            f"Relationship {src}-{tgt} marked for deletion - no remaining sources"
+                        )
+                    else:
+                        new_source_id = GRAPH_FIELD_SEP.join(sources)
+                        relationships_to_update[(src, tgt)] = new_source_id
+                        logger.debug(
+                            f"Relationship {src}-{tgt} will be updated with new source_id: {new_source_id}"
                         )
-                        if edge_data and "source_id" in edge_data:
-                            # Split source_id using GRAPH_FIELD_SEP
-                            sources = set(edge_data["source_id"].split(GRAPH_FIELD_SEP))
-                            sources.difference_update(chunk_ids)
-                            if not sources:
-                                relationships_to_delete.add((src, tgt))
-                                logger.debug(
-                                    f"Relationship {src}-{tgt} marked for deletion - no remaining sources"
-                                )
-                            else:
-                                new_source_id = GRAPH_FIELD_SEP.join(sources)
-                                relationships_to_update[(src, tgt)] = new_source_id
-                                logger.debug(
-                                    f"Relationship {src}-{tgt} will be updated with new source_id: {new_source_id}"
-                                )
 
             # Delete entities
             if entities_to_delete:
@@ -1602,11 +1784,13 @@ class LightRAG:
                         f"Updated relationship {src}-{tgt} with new source_id: {new_source_id}"
                     )
 
-            # 6. Delete original document and status
+            # 5. Delete original document, status and its graph index
             await self.full_docs.delete([doc_id])
             await self.doc_status.delete([doc_id])
+            if self.doc_graph_index is not None:
+                await self.doc_graph_index.delete([doc_id])
 
-            # 7. Ensure all indexes are updated
+            # 6. Ensure all indexes are updated
             await self._insert_done()
 
             logger.info(
@@ -1615,30 +1799,34 @@ class LightRAG:
                 f"Updated {len(entities_to_update)} entities and {len(relationships_to_update)} relationships."
             )
 
-            async def process_data(data_type, vdb, chunk_id):
-                # Check data (entities or relationships)
-                storage = await vdb.client_storage
+            async def process_data(data_type, vdb, ids):
+                # Check data (entities or relationships) of the affected subgraph
                 data_with_chunk = [
                     dp
-                    for dp in storage["data"]
-                    if chunk_id in (dp.get("source_id") or "").split(GRAPH_FIELD_SEP)
+                    for dp in await vdb.get_by_ids(list(ids))
+                    if dp
+                    and not chunk_ids.isdisjoint(
+                        (dp.get("source_id") or "").split(GRAPH_FIELD_SEP)
+                    )
                 ]
 
                 data_for_vdb = {}
                 if data_with_chunk:
                     logger.warning(
-                        f"found {len(data_with_chunk)} {data_type} still referencing chunk {chunk_id}"
+                        f"found {len(data_with_chunk)} {data_type} still referencing deleted chunks"
                     )
 
                     for item in data_with_chunk:
                         old_sources = item["source_id"].split(GRAPH_FIELD_SEP)
-                        new_sources = [src for src in old_sources if src != chunk_id]
+                        new_sources = [
+                            src for src in old_sources if src not in chunk_ids
+                        ]
 
                         if not new_sources:
                             logger.info(
                                 f"{data_type} {item.get('entity_name', 'N/A')} is deleted because source_id is not exists"
                             )
-                            await vdb.delete_entity(item)
+                            await vdb.delete([item["__id__"]])
                         else:
                             item["source_id"] = GRAPH_FIELD_SEP.join(new_sources)
                             item_id = item["__id__"]
@@ -1671,13 +1859,11 @@ class LightRAG:
                     logger.warning(f"Document {doc_id} still exists in full_docs")
 
                 # Verify if chunks have been deleted
-                all_remaining_chunks = await self.text_chunks.get_all()
-                remaining_related_chunks = {
-                    chunk_id: chunk_data
-                    for chunk_id, chunk_data in all_remaining_chunks.items()
-                    if isinstance(chunk_data, dict)
-                    and chunk_data.get("full_doc_id") == doc_id
-                }
+                remaining_related_chunks = [
+                    chunk_data
+                    for chunk_data in await self.text_chunks.get_by_ids(list(chunk_ids))
+                    if chunk_data is not None
+                ]
 
                 if remaining_related_chunks:
                     logger.warning(
@@ -1685,11 +1871,23 @@ class LightRAG:
                     )
 
                 # Verify entities and relationships
-                for chunk_id in chunk_ids:
-                    await process_data("entities", self.entities_vdb, chunk_id)
-                    await process_data(
-                        "relationships", self.relationships_vdb, chunk_id
-                    )
+                await process_data(
+                    "entities",
+                    self.entities_vdb,
+                    {
+                        compute_mdhash_id(entity, prefix="ent-")
+                        for entity in candidate_entities
+                    },
+                )
+                await process_data(
+                    "relationships",
+                    self.relationships_vdb,
+                    {
+                        compute_mdhash_id(a + b, prefix="rel-")
+                        for src, tgt in candidate_relations
+                        for a, b in ((src, tgt), (tgt, src))
+                    },
+                )
 
             await verify_deletion()
 
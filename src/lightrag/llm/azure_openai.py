@@ -25,6 +25,7 @@ from lightrag.utils import (
     locate_json_string_body_from_string,
     safe_unicode_decode,
 )
+from lightrag.llm.openai import get_openai_async_client
 
 import numpy as np
 
@@ -53,7 +54,8 @@ async def azure_openai_complete_if_cache(
     if api_version:
         os.environ["AZURE_OPENAI_API_VERSION"] = api_version
 
-    openai_async_client = AsyncAzureOpenAI(
+    openai_async_client = get_openai_async_client(
+        AsyncAzureOpenAI,
         azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         azure_deployment=model,
         api_key=os.getenv("AZURE_OPENAI_API_KEY"),
@@ -135,7 +137,8 @@ async def azure_openai_embed(
     if api_version:
         os.environ["AZURE_OPENAI_API_VERSION"] = api_version
 
-    openai_async_client = AsyncAzureOpenAI(
+    openai_async_client = get_openai_async_client(
+        AsyncAzureOpenAI,
         azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
         azure_deployment=model,
         api_key=os.getenv("AZURE_OPENAI_API_KEY"),
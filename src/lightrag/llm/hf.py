@@ -1,6 +1,9 @@
+import asyncio
 import copy
 import os
-from functools import lru_cache
+import threading
+import weakref
+from typing import Any, Callable
 
 import pipmaster as pm  # Pipmaster for dynamic library install
 
@@ -29,6 +32,9 @@ from lightrag.exceptions import (
     APITimeoutError,
 )
 from lightrag.utils import (
+    EMBEDDING_BATCH_MAX_TEXTS,
+    EMBEDDING_BATCH_MAX_TOKENS,
+    _estimate_tokens,
     locate_json_string_body_from_string,
 )
 import torch
@@ -36,19 +42,164 @@ import numpy as np
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Most requests collected into one generate/forward call
+HF_BATCH_SIZE = int(os.getenv("HF_BATCH_SIZE", 8))
+# Time to wait for more requests once the first one of a batch arrived
+HF_BATCH_WAIT = float(os.getenv("HF_BATCH_WAIT_MS", 10)) / 1000
+HF_MAX_NEW_TOKENS = int(os.getenv("HF_MAX_NEW_TOKENS", 512))
+# Most texts and padded tokens embedded in one forward pass
+HF_EMBED_MAX_TEXTS = max(
+    int(os.getenv("HF_EMBED_MAX_TEXTS", EMBEDDING_BATCH_MAX_TEXTS)), 1
+)
+HF_EMBED_MAX_TOKENS = int(os.getenv("HF_EMBED_MAX_TOKENS", EMBEDDING_BATCH_MAX_TOKENS))
+
+# Models loaded by this process, keyed by model name
+_hf_models: dict[str, tuple[Any, Any]] = {}
+_hf_models_lock = threading.Lock()
+# Micro-batchers of each event loop, keyed by model
+_hf_batchers: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[Any, "_MicroBatcher"]
+] = weakref.WeakKeyDictionary()
+
+
+def get_hf_device() -> torch.device:
+    """Device for local models, HF_DEVICE overrides the automatic choice"""
+    if os.getenv("HF_DEVICE"):
+        return torch.device(os.getenv("HF_DEVICE"))
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    return torch.device("cpu")
+
 
-@lru_cache(maxsize=1)
 def initialize_hf_model(model_name):
-    hf_tokenizer = AutoTokenizer.from_pretrained(
-        model_name, device_map="auto", trust_remote_code=True
-    )
-    hf_model = AutoModelForCausalLM.from_pretrained(
-        model_name, device_map="auto", trust_remote_code=True
-    )
-    if hf_tokenizer.pad_token is None:
-        hf_tokenizer.pad_token = hf_tokenizer.eos_token
+    """Load a causal LM and its tokenizer, once per process"""
+    with _hf_models_lock:
+        if model_name not in _hf_models:
+            hf_tokenizer = AutoTokenizer.from_pretrained(
+                model_name, trust_remote_code=True, padding_side="left"
+            )
+            device = get_hf_device()
+            if device.type == "cuda":
+                hf_model = AutoModelForCausalLM.from_pretrained(
+                    model_name, device_map="auto", trust_remote_code=True
+                )
+            else:
+                hf_model = AutoModelForCausalLM.from_pretrained(
+                    model_name, trust_remote_code=True
+                ).to(device)
+            hf_model.eval()
+            if hf_tokenizer.pad_token is None:
+                hf_tokenizer.pad_token = hf_tokenizer.eos_token
+            _hf_models[model_name] = (hf_model, hf_tokenizer)
+
+    return _hf_models[model_name]
+
+
+class _MicroBatcher:
+    """Collect concurrent requests and process them in one call
+
+    Requests arriving within HF_BATCH_WAIT of the first one, up to
+    HF_BATCH_SIZE, are handed to process_batch together. When item_size is
+    given, a batch also stops before its items add up to more than max_size,
+    a larger item is batched alone. process_batch runs in a worker thread and
+    returns one result per request.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[list[Any]], list[Any]],
+        item_size: Callable[[Any], int] | None = None,
+        max_size: int | None = None,
+    ):
+        self._process_batch = process_batch
+        self._item_size = item_size
+        self._max_size = max_size
+        self._queue: asyncio.Queue = asyncio.Queue()
+        # Request that did not fit into the previous batch
+        self._carry: tuple[Any, asyncio.Future] | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        # Exit once idle, the next submit starts a new worker
+        while self._carry is not None or not self._queue.empty():
+            if self._carry is not None:
+                batch, self._carry = [self._carry], None
+            else:
+                batch = [self._queue.get_nowait()]
+            size = self._size(batch[0])
+            deadline = loop.time() + HF_BATCH_WAIT
+            while len(batch) < HF_BATCH_SIZE:
+                if not self._queue.empty():
+                    entry = self._queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                if self._max_size is not None:
+                    if size + self._size(entry) > self._max_size:
+                        self._carry = entry
+                        break
+                    size += self._size(entry)
+                batch.append(entry)
+
+            try:
+                results = await asyncio.to_thread(
+                    self._process_batch, [item for item, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def _size(self, entry: tuple[Any, asyncio.Future]) -> int:
+        return self._item_size(entry[0]) if self._item_size else 1
 
-    return hf_model, hf_tokenizer
+
+def _get_batcher(
+    key: Any, process_batch: Callable[[list[Any]], list[Any]], **kwargs: Any
+):
+    batchers = _hf_batchers.setdefault(asyncio.get_running_loop(), {})
+    if key not in batchers:
+        batchers[key] = _MicroBatcher(process_batch, **kwargs)
+    return batchers[key]
+
+
+def _generate_batch(model_name: str, prompts: list[str]) -> list[str]:
+    """Generate completions for several prompts in one left-padded batch"""
+    hf_model, hf_tokenizer = initialize_hf_model(model_name)
+    inputs = hf_tokenizer(
+        prompts, return_tensors="pt", padding=True, truncation=True
+    ).to(hf_model.device)
+    with torch.no_grad():
+        output = hf_model.generate(
+            **inputs,
+            max_new_tokens=HF_MAX_NEW_TOKENS,
+            num_return_sequences=1,
+            early_stopping=True,
+            pad_token_id=hf_tokenizer.pad_token_id,
+        )
+    # Left padding makes every prompt end at the same position
+    prompt_length = inputs["input_ids"].shape[1]
+    return [
+        hf_tokenizer.decode(sequence[prompt_length:], skip_special_tokens=True)
+        for sequence in output
+    ]
 
 
 @retry(
@@ -66,7 +217,7 @@ async def hf_model_if_cache(
     **kwargs,
 ) -> str:
     model_name = model
-    hf_model, hf_tokenizer = initialize_hf_model(model_name)
+    _, hf_tokenizer = await asyncio.to_thread(initialize_hf_model, model_name)
     messages = []
     if system_prompt:
         messages.append({"role": "system", "content": system_prompt})
@@ -106,18 +257,12 @@ async def hf_model_if_cache(
                     + ">\n"
                 )
 
-    input_ids = hf_tokenizer(
-        input_prompt, return_tensors="pt", padding=True, truncation=True
-    ).to("cuda")
-    inputs = {k: v.to(hf_model.device) for k, v in input_ids.items()}
-    output = hf_model.generate(
-        **input_ids, max_new_tokens=512, num_return_sequences=1, early_stopping=True
+    # Concurrent completions of the same model share one generate call
+    batcher = _get_batcher(
+        ("generate", model_name),
+        lambda prompts: _generate_batch(model_name, prompts),
     )
-    response_text = hf_tokenizer.decode(
-        output[0][len(inputs["input_ids"][0]) :], skip_special_tokens=True
-    )
-
-    return response_text
+    return await batcher.submit(input_prompt)
 
 
 async def hf_model_complete(
@@ -137,18 +282,71 @@ async def hf_model_complete(
     return result
 
 
-async def hf_embed(texts: list[str], tokenizer, embed_model) -> np.ndarray:
+def _embed_batch(tokenizer, embed_model, batches: list[list[str]]) -> list[np.ndarray]:
+    """Embed the texts of several requests, in as few forward passes as the limits allow"""
+    texts = [text for batch in batches for text in batch]
+    # Texts are padded to the longest one of their forward pass, so similar
+    # lengths are embedded together and each pass is capped by padded tokens
+    order = sorted(range(len(texts)), key=lambda i: _estimate_tokens(texts[i]))
+    embeddings = [None] * len(texts)
+    chunk: list[int] = []
+    for i in order:
+        padded_tokens = (len(chunk) + 1) * _estimate_tokens(texts[i])
+        if chunk and (
+            len(chunk) >= HF_EMBED_MAX_TEXTS or padded_tokens > HF_EMBED_MAX_TOKENS
+        ):
+            _embed_chunk(tokenizer, embed_model, texts, chunk, embeddings)
+            chunk = []
+        chunk.append(i)
+    if chunk:
+        _embed_chunk(tokenizer, embed_model, texts, chunk, embeddings)
+    embeddings = np.stack(embeddings) if texts else np.empty((0, 0), np.float32)
+
+    results = []
+    start = 0
+    for batch in batches:
+        results.append(embeddings[start : start + len(batch)])
+        start += len(batch)
+    return results
+
+
+def _embed_chunk(
+    tokenizer, embed_model, texts: list[str], chunk: list[int], out: list
+) -> None:
+    """Embed texts[i] for i in chunk in one forward pass into out[i]"""
     device = next(embed_model.parameters()).device
     encoded_texts = tokenizer(
-        texts, return_tensors="pt", padding=True, truncation=True
+        [texts[i] for i in chunk], return_tensors="pt", padding=True, truncation=True
     ).to(device)
     with torch.no_grad():
         outputs = embed_model(
             input_ids=encoded_texts["input_ids"],
             attention_mask=encoded_texts["attention_mask"],
         )
-        embeddings = outputs.last_hidden_state.mean(dim=1)
+        # Mean over real tokens only, so padding added for longer texts
+        # in the same batch does not change an embedding
+        mask = (
+            encoded_texts["attention_mask"]
+            .unsqueeze(-1)
+            .to(outputs.last_hidden_state.dtype)
+        )
+        embeddings = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(
+            dim=1
+        ).clamp(min=1)
     if embeddings.dtype == torch.bfloat16:
-        return embeddings.detach().to(torch.float32).cpu().numpy()
+        embeddings = embeddings.detach().to(torch.float32).cpu().numpy()
     else:
-        return embeddings.detach().cpu().numpy()
+        embeddings = embeddings.detach().cpu().numpy()
+    for i, embedding in zip(chunk, embeddings):
+        out[i] = embedding
+
+
+async def hf_embed(texts: list[str], tokenizer, embed_model) -> np.ndarray:
+    # Concurrent calls with the same model share one forward pass
+    batcher = _get_batcher(
+        ("embed", id(tokenizer), id(embed_model)),
+        lambda batches: _embed_batch(tokenizer, embed_model, batches),
+        item_size=len,
+        max_size=HF_EMBED_MAX_TEXTS,
+    )
+    return await batcher.submit(texts)
@@ -1,7 +1,10 @@
 from ..utils import verbose_debug, VERBOSE_DEBUG
 import sys
 import os
+import json
+import asyncio
 import logging
+import weakref
 
 if sys.version_info < (3, 9):
     from typing import AsyncIterator
@@ -13,12 +16,19 @@ import pipmaster as pm  # Pipmaster for dynamic library install
 if not pm.is_installed("openai"):
     pm.install("openai")
 
+# HTTP/2 lets concurrent requests share a single connection per host
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "false").lower() == "true"
+if OPENAI_HTTP2 and not pm.is_installed("h2"):
+    pm.install("h2")
+
 from openai import (
     AsyncOpenAI,
     APIConnectionError,
+    DefaultAsyncHttpxClient,
     RateLimitError,
     APITimeoutError,
 )
+import httpx
 from tenacity import (
     retry,
     stop_after_attempt,
@@ -30,6 +40,8 @@ from lightrag.utils import (
     locate_json_string_body_from_string,
     safe_unicode_decode,
     logger,
+    record_call_usage,
+    record_rate_limit,
 )
 from lightrag.types import GPTKeywordExtractionFormat
 from lightrag.api import __api_version__
@@ -38,12 +50,67 @@ import numpy as np
 from typing import Any, Union
 
 
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 20)
+)
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", 60))
+
+# Pooled clients per event loop, httpx connections can not move between loops
+_openai_async_clients: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, AsyncOpenAI]
+] = weakref.WeakKeyDictionary()
+
+
 class InvalidResponseError(Exception):
     """Custom exception class for triggering retry mechanism"""
 
     pass
 
 
+def _record_rate_limit_error(e: RateLimitError) -> None:
+    """Tell the concurrency governor about a rate limit error before tenacity retries it"""
+    retry_after = None
+    try:
+        retry_after = float(e.response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        pass
+    record_rate_limit(retry_after)
+
+
+def get_openai_async_client(
+    client_class: type[AsyncOpenAI] = AsyncOpenAI, **client_kwargs: Any
+) -> AsyncOpenAI:
+    """Get a pooled OpenAI compatible client, created once per set of arguments
+
+    Calls with the same base_url, api_key and other client arguments share one
+    client and its keep-alive HTTP connection pool instead of opening new
+    connections for every request.
+
+    Args:
+        client_class: AsyncOpenAI or a compatible subclass such as AsyncAzureOpenAI
+        **client_kwargs: Arguments for the client constructor, None values are dropped
+    """
+    client_kwargs = {k: v for k, v in client_kwargs.items() if v is not None}
+    clients = _openai_async_clients.setdefault(asyncio.get_running_loop(), {})
+    key = json.dumps(
+        [client_class.__qualname__, client_kwargs], sort_keys=True, default=str
+    )
+    client = clients.get(key)
+    if client is None:
+        http_client = DefaultAsyncHttpxClient(
+            http2=OPENAI_HTTP2,
+            limits=httpx.Limits(
+                max_connections=OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+            ),
+        )
+        client = client_class(http_client=http_client, **client_kwargs)
+        clients[key] = client
+    return client
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
@@ -74,12 +141,8 @@ async def openai_complete_if_cache(
     if not VERBOSE_DEBUG and logger.level == logging.DEBUG:
         logging.getLogger("openai").setLevel(logging.INFO)
 
-    openai_async_client = (
-        AsyncOpenAI(default_headers=default_headers, api_key=api_key)
-        if base_url is None
-        else AsyncOpenAI(
-            base_url=base_url, default_headers=default_headers, api_key=api_key
-        )
+    openai_async_client = get_openai_async_client(
+        base_url=base_url, default_headers=default_headers, api_key=api_key
     )
     kwargs.pop("hashing_kv", None)
     kwargs.pop("keyword_extraction", None)
@@ -109,6 +172,7 @@ async def openai_complete_if_cache(
         raise
     except RateLimitError as e:
         logger.error(f"OpenAI API Rate Limit Error: {e}")
+        _record_rate_limit_error(e)
         raise
     except APITimeoutError as e:
         logger.error(f"OpenAI API Timeout Error: {e}")
@@ -147,6 +211,10 @@ async def openai_complete_if_cache(
             raise InvalidResponseError("Invalid response from OpenAI API")
 
         content = response.choices[0].message.content
+        if getattr(response, "usage", None) is not None:
+            record_call_usage(
+                response.usage.prompt_tokens, response.usage.completion_tokens
+            )
 
         if not content or content.strip() == "":
             logger.error("Received empty content from OpenAI API")
@@ -265,14 +333,16 @@ async def openai_embed(
         "User-Agent": f"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_8) LightRAG/{__api_version__}",
         "Content-Type": "application/json",
     }
-    openai_async_client = (
-        AsyncOpenAI(default_headers=default_headers, api_key=api_key)
-        if base_url is None
-        else AsyncOpenAI(
-            base_url=base_url, default_headers=default_headers, api_key=api_key
-        )
-    )
-    response = await openai_async_client.embeddings.create(
-        model=model, input=texts, encoding_format="float"
+    openai_async_client = get_openai_async_client(
+        base_url=base_url, default_headers=default_headers, api_key=api_key
     )
+    try:
+        response = await openai_async_client.embeddings.create(
+            model=model, input=texts, encoding_format="float"
+        )
+    except RateLimitError as e:
+        _record_rate_limit_error(e)
+        raise
+    if getattr(response, "usage", None) is not None:
+        record_call_usage(response.usage.prompt_tokens)
     return np.array([dp.embedding for dp in response.data])
@@ -7,6 +7,7 @@ class NameSpace:
     KV_STORE_FULL_DOCS = "full_docs"
     KV_STORE_TEXT_CHUNKS = "text_chunks"
     KV_STORE_LLM_RESPONSE_CACHE = "llm_response_cache"
+    KV_STORE_DOC_GRAPH_INDEX = "doc_graph_index"
 
     VECTOR_STORE_ENTITIES = "entities"
     VECTOR_STORE_RELATIONSHIPS = "relationships"
@@ -11,6 +11,7 @@ from .utils import (
     logger,
     clean_str,
     compute_mdhash_id,
+    count_tokens_by_tiktoken,
     decode_tokens_by_tiktoken,
     encode_string_by_tiktoken,
     is_float_regex,
@@ -23,6 +24,7 @@ from .utils import (
     handle_cache,
     save_to_cache,
     CacheData,
+    QueryEmbeddings,
     statistic_data,
     get_conversation_turns,
     verbose_debug,
@@ -41,6 +43,9 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv(override=True)
 
+# Optimistic merge attempts before an entity or relation is merged under its lock
+MERGE_CAS_MAX_RETRIES = int(os.getenv("MERGE_CAS_MAX_RETRIES", 3))
+
 
 def chunking_by_token_size(
     content: str,
@@ -117,9 +122,13 @@ async def _handle_entity_relation_summary(
         "language", PROMPTS["DEFAULT_LANGUAGE"]
     )
 
-    tokens = encode_string_by_tiktoken(description, model_name=tiktoken_model_name)
-    if len(tokens) < summary_max_tokens:  # No need for summary
+    # Descriptions are re-counted on every merge, so use the cached token counts
+    [description_tokens] = count_tokens_by_tiktoken(
+        [description], model_name=tiktoken_model_name
+    )
+    if description_tokens < summary_max_tokens:  # No need for summary
         return description
+    tokens = encode_string_by_tiktoken(description, model_name=tiktoken_model_name)
     prompt_template = PROMPTS["summarize_entity_descriptions"]
     use_description = decode_tokens_by_tiktoken(
         tokens[:llm_max_tokens], model_name=tiktoken_model_name
@@ -203,18 +212,17 @@ async def _handle_single_relationship_extraction(
     )
 
 
-async def _merge_nodes_then_upsert(
+async def _merge_node_data(
     entity_name: str,
     nodes_data: list[dict],
-    knowledge_graph_inst: BaseGraphStorage,
+    already_node: dict | None,
     global_config: dict,
-):
-    """Get existing nodes from knowledge graph use name,if exists, merge data, else create, then upsert."""
+) -> dict:
+    """Merge extracted nodes into an existing node (if any) and summarize the description."""
     already_entity_types = []
     already_source_ids = []
     already_description = []
 
-    already_node = await knowledge_graph_inst.get_node(entity_name)
     if already_node is not None:
         already_entity_types.append(already_node["entity_type"])
         already_source_ids.extend(
@@ -238,58 +246,96 @@ async def _merge_nodes_then_upsert(
     description = await _handle_entity_relation_summary(
         entity_name, description, global_config
     )
-    node_data = dict(
+    return dict(
         entity_id=entity_name,
         entity_type=entity_type,
         description=description,
         source_id=source_id,
     )
-    await knowledge_graph_inst.upsert_node(
-        entity_name,
-        node_data=node_data,
-    )
-    node_data["entity_name"] = entity_name
-    return node_data
 
 
-async def _merge_edges_then_upsert(
-    src_id: str,
-    tgt_id: str,
-    edges_data: list[dict],
+async def _get_node_snapshot(
+    entity_name: str, knowledge_graph_inst: BaseGraphStorage
+) -> dict | None:
+    already_node = await knowledge_graph_inst.get_node(entity_name)
+    # Copy, as some storages return the live node attributes
+    return dict(already_node) if already_node is not None else None
+
+
+async def _merge_nodes_then_upsert(
+    entity_name: str,
+    nodes_data: list[dict],
     knowledge_graph_inst: BaseGraphStorage,
     global_config: dict,
 ):
+    """Get existing nodes from knowledge graph use name,if exists, merge data, else create, then upsert.
+
+    The merge is a read-summarize-compare-and-set: the description summary, which may
+    call the LLM, is built without holding a lock, and the node is only written if it
+    is unchanged since it was read. Only the entity's own lock shard is held, so merges
+    of other entities proceed in parallel.
+    """
+    from .kg.shared_storage import get_graph_db_shard_lock
+
+    entity_lock = get_graph_db_shard_lock(entity_name)
+    already_node = await _get_node_snapshot(entity_name, knowledge_graph_inst)
+    for _ in range(MERGE_CAS_MAX_RETRIES):
+        node_data = await _merge_node_data(
+            entity_name, nodes_data, already_node, global_config
+        )
+        async with entity_lock:
+            current = await _get_node_snapshot(entity_name, knowledge_graph_inst)
+            if current == already_node:
+                await knowledge_graph_inst.upsert_node(entity_name, node_data=node_data)
+                break
+        already_node = current
+        logger.debug(f"Node {entity_name} changed during merge, retrying")
+    else:
+        # Too many concurrent writers, merge while holding the lock
+        async with entity_lock:
+            already_node = await knowledge_graph_inst.get_node(entity_name)
+            node_data = await _merge_node_data(
+                entity_name, nodes_data, already_node, global_config
+            )
+            await knowledge_graph_inst.upsert_node(entity_name, node_data=node_data)
+
+    node_data["entity_name"] = entity_name
+    return node_data
+
+
+def _merge_edge_fields(
+    edges_data: list[dict], already_edge: dict | None
+) -> tuple[float, str, str, str]:
+    """Merge extracted edges into an existing edge (if any) without summarizing."""
     already_weights = []
     already_source_ids = []
     already_description = []
     already_keywords = []
 
-    if await knowledge_graph_inst.has_edge(src_id, tgt_id):
-        already_edge = await knowledge_graph_inst.get_edge(src_id, tgt_id)
-        # Handle the case where get_edge returns None or missing fields
-        if already_edge:
-            # Get weight with default 0.0 if missing
-            already_weights.append(already_edge.get("weight", 0.0))
-
-            # Get source_id with empty string default if missing or None
-            if already_edge.get("source_id") is not None:
-                already_source_ids.extend(
-                    split_string_by_multi_markers(
-                        already_edge["source_id"], [GRAPH_FIELD_SEP]
-                    )
+    # Handle the case where get_edge returns None or missing fields
+    if already_edge:
+        # Get weight with default 0.0 if missing
+        already_weights.append(already_edge.get("weight", 0.0))
+
+        # Get source_id with empty string default if missing or None
+        if already_edge.get("source_id") is not None:
+            already_source_ids.extend(
+                split_string_by_multi_markers(
+                    already_edge["source_id"], [GRAPH_FIELD_SEP]
                 )
+            )
 
-            # Get description with empty string default if missing or None
-            if already_edge.get("description") is not None:
-                already_description.append(already_edge["description"])
+        # Get description with empty string default if missing or None
+        if already_edge.get("description") is not None:
+            already_description.append(already_edge["description"])
 
-            # Get keywords with empty string default if missing or None
-            if already_edge.get("keywords") is not None:
-                already_keywords.extend(
-                    split_string_by_multi_markers(
-                        already_edge["keywords"], [GRAPH_FIELD_SEP]
-                    )
+        # Get keywords with empty string default if missing or None
+        if already_edge.get("keywords") is not None:
+            already_keywords.extend(
+                split_string_by_multi_markers(
+                    already_edge["keywords"], [GRAPH_FIELD_SEP]
                 )
+            )
 
     # Process edges_data with None checks
     weight = sum([dp["weight"] for dp in edges_data] + already_weights)
@@ -315,38 +361,105 @@ async def _merge_edges_then_upsert(
             + already_source_ids
         )
     )
+    return weight, description, keywords, source_id
 
-    for need_insert_id in [src_id, tgt_id]:
-        if not (await knowledge_graph_inst.has_node(need_insert_id)):
-            await knowledge_graph_inst.upsert_node(
-                need_insert_id,
-                node_data={
-                    "entity_id": need_insert_id,
-                    "source_id": source_id,
-                    "description": description,
-                    "entity_type": "UNKNOWN",
-                },
-            )
+
+async def _merge_edge_data(
+    src_id: str,
+    tgt_id: str,
+    edges_data: list[dict],
+    already_edge: dict | None,
+    global_config: dict,
+) -> dict:
+    """Merge extracted edges into an existing edge (if any) and summarize the description."""
+    weight, description, keywords, source_id = _merge_edge_fields(
+        edges_data, already_edge
+    )
     description = await _handle_entity_relation_summary(
         f"({src_id}, {tgt_id})", description, global_config
     )
-    await knowledge_graph_inst.upsert_edge(
-        src_id,
-        tgt_id,
-        edge_data=dict(
-            weight=weight,
-            description=description,
-            keywords=keywords,
-            source_id=source_id,
-        ),
+    return dict(
+        weight=weight,
+        description=description,
+        keywords=keywords,
+        source_id=source_id,
     )
 
+
+async def _get_edge_snapshot(
+    src_id: str, tgt_id: str, knowledge_graph_inst: BaseGraphStorage
+) -> dict | None:
+    if not await knowledge_graph_inst.has_edge(src_id, tgt_id):
+        return None
+    already_edge = await knowledge_graph_inst.get_edge(src_id, tgt_id)
+    # Copy, as some storages return the live edge attributes
+    return dict(already_edge) if already_edge is not None else None
+
+
+async def _merge_edges_then_upsert(
+    src_id: str,
+    tgt_id: str,
+    edges_data: list[dict],
+    knowledge_graph_inst: BaseGraphStorage,
+    global_config: dict,
+):
+    """Merge extracted edges into the graph as a read-summarize-compare-and-set.
+
+    Like _merge_nodes_then_upsert, the summary is built without holding a lock. The
+    lock shards of the edge and of its missing endpoints are taken one at a time, so
+    a merge never holds two shard locks together.
+    """
+    from .kg.shared_storage import get_graph_db_shard_lock
+
+    already_edge = await _get_edge_snapshot(src_id, tgt_id, knowledge_graph_inst)
+    _, description, _, source_id = _merge_edge_fields(edges_data, already_edge)
+
+    for need_insert_id in [src_id, tgt_id]:
+        if await knowledge_graph_inst.has_node(need_insert_id):
+            continue
+        async with get_graph_db_shard_lock(need_insert_id):
+            if not (await knowledge_graph_inst.has_node(need_insert_id)):
+                await knowledge_graph_inst.upsert_node(
+                    need_insert_id,
+                    node_data={
+                        "entity_id": need_insert_id,
+                        "source_id": source_id,
+                        "description": description,
+                        "entity_type": "UNKNOWN",
+                    },
+                )
+
+    edge_lock = get_graph_db_shard_lock(f"({src_id}, {tgt_id})")
+    for _ in range(MERGE_CAS_MAX_RETRIES):
+        edge_data = await _merge_edge_data(
+            src_id, tgt_id, edges_data, already_edge, global_config
+        )
+        async with edge_lock:
+            current = await _get_edge_snapshot(src_id, tgt_id, knowledge_graph_inst)
+            if current == already_edge:
+                await knowledge_graph_inst.upsert_edge(
+                    src_id, tgt_id, edge_data=edge_data
+                )
+                break
+        already_edge = current
+        logger.debug(f"Edge ({src_id}, {tgt_id}) changed during merge, retrying")
+    else:
+        # Too many concurrent writers, merge while holding the lock
+        async with edge_lock:
+            already_edge = await _get_edge_snapshot(
+                src_id, tgt_id, knowledge_graph_inst
+            )
+            edge_data = await _merge_edge_data(
+                src_id, tgt_id, edges_data, already_edge, global_config
+            )
+            await knowledge_graph_inst.upsert_edge(src_id, tgt_id, edge_data=edge_data)
+
     edge_data = dict(
         src_id=src_id,
         tgt_id=tgt_id,
-        description=description,
-        keywords=keywords,
-        source_id=source_id,
+        description=edge_data["description"],
+        keywords=edge_data["keywords"],
+        source_id=edge_data["source_id"],
     )
 
     return edge_data
@@ -361,7 +474,41 @@ async def extract_entities(
     pipeline_status: dict = None,
     pipeline_status_lock=None,
     llm_response_cache: BaseKVStorage | None = None,
+    doc_graph_index: BaseKVStorage | None = None,
 ) -> None:
+    maybe_nodes, maybe_edges = await extract_chunk_entities(
+        chunks,
+        global_config,
+        pipeline_status=pipeline_status,
+        pipeline_status_lock=pipeline_status_lock,
+        llm_response_cache=llm_response_cache,
+    )
+    await merge_extracted_entities(
+        maybe_nodes,
+        maybe_edges,
+        knowledge_graph_inst,
+        entity_vdb,
+        relationships_vdb,
+        global_config,
+        pipeline_status=pipeline_status,
+        pipeline_status_lock=pipeline_status_lock,
+        chunks=chunks,
+        doc_graph_index=doc_graph_index,
+    )
+
+
+async def extract_chunk_entities(
+    chunks: dict[str, TextChunkSchema],
+    global_config: dict[str, str],
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    llm_response_cache: BaseKVStorage | None = None,
+) -> tuple[dict[str, list[dict]], dict[tuple[str, str], list[dict]]]:
+    """Run the LLM entity and relation extraction for chunks without touching the graph
+
+    Returns:
+        tuple: (nodes_dict, edges_dict) of the extracted records, ready for merge_extracted_entities
+    """
     use_llm_func: callable = global_config["llm_model_func"]
     entity_extract_max_gleaning = global_config["entity_extract_max_gleaning"]
     enable_llm_cache_for_entity_extract: bool = global_config[
@@ -573,26 +720,76 @@ async def extract_entities(
         for k, v in m_edges.items():
             maybe_edges[tuple(sorted(k))].extend(v)
 
-    from .kg.shared_storage import get_graph_db_lock
+    return dict(maybe_nodes), dict(maybe_edges)
 
-    graph_db_lock = get_graph_db_lock(enable_logging=False)
 
-    # Ensure that nodes and edges are merged and upserted atomically
-    async with graph_db_lock:
-        all_entities_data = await asyncio.gather(
-            *[
-                _merge_nodes_then_upsert(k, v, knowledge_graph_inst, global_config)
-                for k, v in maybe_nodes.items()
-            ]
-        )
+def _build_doc_graph_index(
+    chunks: dict[str, TextChunkSchema],
+    maybe_nodes: dict[str, list[dict]],
+    maybe_edges: dict[tuple[str, str], list[dict]],
+) -> dict[str, dict[str, Any]]:
+    """Build the reverse index from documents to chunks to graph elements
 
-        all_relationships_data = await asyncio.gather(
-            *[
-                _merge_edges_then_upsert(
-                    k[0], k[1], v, knowledge_graph_inst, global_config
-                )
-                for k, v in maybe_edges.items()
-            ]
+    Returns:
+        {doc_id: {"chunks": {chunk_id: {"entities": [name, ...], "relations": [[src, tgt], ...]}}}}
+    """
+    chunk_index: dict[str, dict[str, list]] = {
+        chunk_id: {"entities": [], "relations": []} for chunk_id in chunks
+    }
+    for entity_name, nodes_data in maybe_nodes.items():
+        for chunk_id in {dp["source_id"] for dp in nodes_data}:
+            if chunk_id in chunk_index:
+                chunk_index[chunk_id]["entities"].append(entity_name)
+    for (src_id, tgt_id), edges_data in maybe_edges.items():
+        for chunk_id in {dp["source_id"] for dp in edges_data}:
+            if chunk_id in chunk_index:
+                chunk_index[chunk_id]["relations"].append([src_id, tgt_id])
+
+    doc_index: dict[str, dict[str, Any]] = {}
+    for chunk_id, chunk_dp in chunks.items():
+        doc_index.setdefault(chunk_dp["full_doc_id"], {"chunks": {}})["chunks"][
+            chunk_id
+        ] = chunk_index[chunk_id]
+    return doc_index
+
+
+async def merge_extracted_entities(
+    maybe_nodes: dict[str, list[dict]],
+    maybe_edges: dict[tuple[str, str], list[dict]],
+    knowledge_graph_inst: BaseGraphStorage,
+    entity_vdb: BaseVectorStorage,
+    relationships_vdb: BaseVectorStorage,
+    global_config: dict[str, str],
+    pipeline_status: dict = None,
+    pipeline_status_lock=None,
+    chunks: dict[str, TextChunkSchema] | None = None,
+    doc_graph_index: BaseKVStorage | None = None,
+) -> None:
+    """Merge extracted entities and relations into the graph and the vector storages
+
+    When doc_graph_index and the source chunks are given, the entities and
+    relations each chunk contributed are recorded under the chunk's document,
+    so a document can later be deleted without scanning the whole graph.
+    """
+    # Each entity and relation is merged under its own lock shard, so documents
+    # merged concurrently only wait for each other on shared entities
+    all_entities_data = await asyncio.gather(
+        *[
+            _merge_nodes_then_upsert(k, v, knowledge_graph_inst, global_config)
+            for k, v in maybe_nodes.items()
+        ]
+    )
+
+    all_relationships_data = await asyncio.gather(
+        *[
+            _merge_edges_then_upsert(k[0], k[1], v, knowledge_graph_inst, global_config)
+            for k, v in maybe_edges.items()
+        ]
+    )
+
+    if doc_graph_index is not None and chunks:
+        await doc_graph_index.upsert(
+            _build_doc_graph_index(chunks, maybe_nodes, maybe_edges)
         )
 
     if not (all_entities_data or all_relationships_data):
@@ -673,18 +870,26 @@ async def kg_query(
     hashing_kv: BaseKVStorage | None = None,
     system_prompt: str | None = None,
 ) -> str | AsyncIterator[str]:
+    # Texts embedded for this request are reused by the cache and vector lookups
+    query_embeddings = QueryEmbeddings(entities_vdb.embedding_func)
+
     # Handle cache
     use_model_func = global_config["llm_model_func"]
     args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
     cached_response, quantized, min_val, max_val = await handle_cache(
-        hashing_kv, args_hash, query, query_param.mode, cache_type="query"
+        hashing_kv,
+        args_hash,
+        query,
+        query_param.mode,
+        cache_type="query",
+        query_embeddings=query_embeddings,
     )
     if cached_response is not None:
         return cached_response
 
     # Extract keywords using extract_keywords_only function which already supports conversation history
     hl_keywords, ll_keywords = await extract_keywords_only(
-        query, query_param, global_config, hashing_kv
+        query, query_param, global_config, hashing_kv, query_embeddings
     )
 
     logger.debug(f"High-level keywords: {hl_keywords}")
@@ -719,6 +924,7 @@ async def kg_query(
         relationships_vdb,
         text_chunks_db,
         query_param,
+        query_embeddings,
     )
 
     if query_param.only_need_context:
@@ -784,6 +990,7 @@ async def extract_keywords_only(
     param: QueryParam,
     global_config: dict[str, str],
     hashing_kv: BaseKVStorage | None = None,
+    query_embeddings: QueryEmbeddings | None = None,
 ) -> tuple[list[str], list[str]]:
     """
     Extract high-level and low-level keywords from the given 'text' using the LLM.
@@ -794,7 +1001,12 @@ async def extract_keywords_only(
     # 1. Handle cache if needed - add cache type for keywords
     args_hash = compute_args_hash(param.mode, text, cache_type="keywords")
     cached_response, quantized, min_val, max_val = await handle_cache(
-        hashing_kv, args_hash, text, param.mode, cache_type="keywords"
+        hashing_kv,
+        args_hash,
+        text,
+        param.mode,
+        cache_type="keywords",
+        query_embeddings=query_embeddings,
     )
     if cached_response is not None:
         try:
@@ -894,11 +1106,19 @@ async def mix_kg_vector_query(
     2. Retrieving relevant text chunks through vector similarity
     3. Combining both results for comprehensive answer generation
     """
+    # Texts embedded for this request are reused by the cache and vector lookups
+    query_embeddings = QueryEmbeddings(chunks_vdb.embedding_func)
+
     # 1. Cache handling
     use_model_func = global_config["llm_model_func"]
     args_hash = compute_args_hash("mix", query, cache_type="query")
     cached_response, quantized, min_val, max_val = await handle_cache(
-        hashing_kv, args_hash, query, "mix", cache_type="query"
+        hashing_kv,
+        args_hash,
+        query,
+        "mix",
+        cache_type="query",
+        query_embeddings=query_embeddings,
     )
     if cached_response is not None:
         return cached_response
@@ -915,7 +1135,7 @@ async def mix_kg_vector_query(
         try:
             # Extract keywords using extract_keywords_only function which already supports conversation history
             hl_keywords, ll_keywords = await extract_keywords_only(
-                query, query_param, global_config, hashing_kv
+                query, query_param, global_config, hashing_kv, query_embeddings
             )
 
             if not hl_keywords and not ll_keywords:
@@ -945,6 +1165,7 @@ async def mix_kg_vector_query(
                 relationships_vdb,
                 text_chunks_db,
                 query_param,
+                query_embeddings,
             )
 
             return context
@@ -964,7 +1185,10 @@ async def mix_kg_vector_query(
             mix_topk = min(10, query_param.top_k)
             # TODO: add ids to the query
             results = await chunks_vdb.query(
-                augmented_query, top_k=mix_topk, ids=query_param.ids
+                augmented_query,
+                top_k=mix_topk,
+                ids=query_param.ids,
+                query_embedding=await query_embeddings.get(augmented_query),
             )
             if not results:
                 return None
@@ -978,6 +1202,7 @@ async def mix_kg_vector_query(
                     # Merge chunk content and time metadata
                     chunk_with_time = {
                         "content": chunk["content"],
+                        "tokens": chunk.get("tokens"),
                         "created_at": result.get("created_at", None),
                     }
                     valid_chunks.append(chunk_with_time)
@@ -989,6 +1214,7 @@ async def mix_kg_vector_query(
                 valid_chunks,
                 key=lambda x: x["content"],
                 max_token_size=query_param.max_token_for_text_unit,
+                token_key=lambda x: x.get("tokens"),
             )
 
             if not maybe_trun_chunks:
@@ -1089,8 +1315,12 @@ async def _build_query_context(
     relationships_vdb: BaseVectorStorage,
     text_chunks_db: BaseKVStorage,
     query_param: QueryParam,
+    query_embeddings: QueryEmbeddings | None = None,
 ):
     logger.info(f"Process {os.getpid()} buidling query context...")
+    if query_embeddings is None:
+        query_embeddings = QueryEmbeddings(entities_vdb.embedding_func)
+
     if query_param.mode == "local":
         entities_context, relations_context, text_units_context = await _get_node_data(
             ll_keywords,
@@ -1098,6 +1328,7 @@ async def _build_query_context(
             entities_vdb,
             text_chunks_db,
             query_param,
+            query_embeddings,
         )
     elif query_param.mode == "global":
         entities_context, relations_context, text_units_context = await _get_edge_data(
@@ -1106,8 +1337,11 @@ async def _build_query_context(
             relationships_vdb,
             text_chunks_db,
             query_param,
+            query_embeddings,
         )
     else:  # hybrid mode
+        # Embed both keyword strings in one call
+        await query_embeddings.get_many([ll_keywords, hl_keywords])
         ll_data, hl_data = await asyncio.gather(
             _get_node_data(
                 ll_keywords,
@@ -1115,6 +1349,7 @@ async def _build_query_context(
                 entities_vdb,
                 text_chunks_db,
                 query_param,
+                query_embeddings,
             ),
             _get_edge_data(
                 hl_keywords,
@@ -1122,6 +1357,7 @@ async def _build_query_context(
                 relationships_vdb,
                 text_chunks_db,
                 query_param,
+                query_embeddings,
             ),
         )
 
@@ -1169,6 +1405,7 @@ async def _get_node_data(
     entities_vdb: BaseVectorStorage,
     text_chunks_db: BaseKVStorage,
     query_param: QueryParam,
+    query_embeddings: QueryEmbeddings | None = None,
 ):
     # get similar entities
     logger.info(
@@ -1176,20 +1413,24 @@ async def _get_node_data(
     )
 
     results = await entities_vdb.query(
-        query, top_k=query_param.top_k, ids=query_param.ids
+        query,
+        top_k=query_param.top_k,
+        ids=query_param.ids,
+        query_embedding=await query_embeddings.get(query)
+        if query_embeddings is not None
+        else None,
     )
 
     if not len(results):
         return "", "", ""
     # get entity information
-    node_datas, node_degrees = await asyncio.gather(
-        asyncio.gather(
-            *[knowledge_graph_inst.get_node(r["entity_name"]) for r in results]
-        ),
-        asyncio.gather(
-            *[knowledge_graph_inst.node_degree(r["entity_name"]) for r in results]
-        ),
+    node_ids = [r["entity_name"] for r in results]
+    nodes_dict, degrees_dict = await asyncio.gather(
+        knowledge_graph_inst.get_nodes_batch(node_ids),
+        knowledge_graph_inst.node_degrees_batch(node_ids),
     )
+    node_datas = [nodes_dict.get(node_id) for node_id in node_ids]
+    node_degrees = [degrees_dict.get(node_id, 0) for node_id in node_ids]
 
     if not all([n is not None for n in node_datas]):
         logger.warning("Some nodes are missing, maybe the storage is damaged")
@@ -1298,9 +1539,9 @@ async def _find_most_related_text_unit_from_entities(
         split_string_by_multi_markers(dp["source_id"], [GRAPH_FIELD_SEP])
         for dp in node_datas
     ]
-    edges = await asyncio.gather(
-        *[knowledge_graph_inst.get_node_edges(dp["entity_name"]) for dp in node_datas]
-    )
+    node_ids = [dp["entity_name"] for dp in node_datas]
+    edges_dict = await knowledge_graph_inst.get_nodes_edges_batch(node_ids)
+    edges = [edges_dict.get(node_id, []) for node_id in node_ids]
     all_one_hop_nodes = set()
     for this_edges in edges:
         if not this_edges:
@@ -1308,9 +1549,10 @@ async def _find_most_related_text_unit_from_entities(
         all_one_hop_nodes.update([e[1] for e in this_edges])
 
     all_one_hop_nodes = list(all_one_hop_nodes)
-    all_one_hop_nodes_data = await asyncio.gather(
-        *[knowledge_graph_inst.get_node(e) for e in all_one_hop_nodes]
+    all_one_hop_nodes_dict = await knowledge_graph_inst.get_nodes_batch(
+        all_one_hop_nodes
     )
+    all_one_hop_nodes_data = [all_one_hop_nodes_dict.get(e) for e in all_one_hop_nodes]
 
     # Add null check for node data
     all_one_hop_text_units_lookup = {
@@ -1366,6 +1608,7 @@ async def _find_most_related_text_unit_from_entities(
         all_text_units,
         key=lambda x: x["data"]["content"],
         max_token_size=query_param.max_token_for_text_unit,
+        token_key=lambda x: x["data"].get("tokens"),
     )
 
     logger.debug(
@@ -1381,25 +1624,25 @@ async def _find_most_related_edges_from_entities(
     query_param: QueryParam,
     knowledge_graph_inst: BaseGraphStorage,
 ):
-    all_related_edges = await asyncio.gather(
-        *[knowledge_graph_inst.get_node_edges(dp["entity_name"]) for dp in node_datas]
+    all_related_edges = await knowledge_graph_inst.get_nodes_edges_batch(
+        [dp["entity_name"] for dp in node_datas]
     )
     all_edges = []
     seen = set()
 
-    for this_edges in all_related_edges:
+    for this_edges in all_related_edges.values():
         for e in this_edges:
             sorted_edge = tuple(sorted(e))
             if sorted_edge not in seen:
                 seen.add(sorted_edge)
                 all_edges.append(sorted_edge)
 
-    all_edges_pack, all_edges_degree = await asyncio.gather(
-        asyncio.gather(*[knowledge_graph_inst.get_edge(e[0], e[1]) for e in all_edges]),
-        asyncio.gather(
-            *[knowledge_graph_inst.edge_degree(e[0], e[1]) for e in all_edges]
-        ),
+    edges_dict, degrees_dict = await asyncio.gather(
+        knowledge_graph_inst.get_edges_batch(all_edges),
+        knowledge_graph_inst.edge_degrees_batch(all_edges),
     )
+    all_edges_pack = [edges_dict.get(e) for e in all_edges]
+    all_edges_degree = [degrees_dict.get(e, 0) for e in all_edges]
     all_edges_data = [
         {"src_tgt": k, "rank": d, **v}
         for k, v, d in zip(all_edges, all_edges_pack, all_edges_degree)
@@ -1427,29 +1670,31 @@ async def _get_edge_data(
     relationships_vdb: BaseVectorStorage,
     text_chunks_db: BaseKVStorage,
     query_param: QueryParam,
+    query_embeddings: QueryEmbeddings | None = None,
 ):
     logger.info(
         f"Query edges: {keywords}, top_k: {query_param.top_k}, cosine: {relationships_vdb.cosine_better_than_threshold}"
     )
 
     results = await relationships_vdb.query(
-        keywords, top_k=query_param.top_k, ids=query_param.ids
+        keywords,
+        top_k=query_param.top_k,
+        ids=query_param.ids,
+        query_embedding=await query_embeddings.get(keywords)
+        if query_embeddings is not None
+        else None,
     )
 
     if not len(results):
         return "", "", ""
 
-    edge_datas, edge_degree = await asyncio.gather(
-        asyncio.gather(
-            *[knowledge_graph_inst.get_edge(r["src_id"], r["tgt_id"]) for r in results]
-        ),
-        asyncio.gather(
-            *[
-                knowledge_graph_inst.edge_degree(r["src_id"], r["tgt_id"])
-                for r in results
-            ]
-        ),
+    edge_pairs = [(r["src_id"], r["tgt_id"]) for r in results]
+    edges_dict, degrees_dict = await asyncio.gather(
+        knowledge_graph_inst.get_edges_batch(edge_pairs),
+        knowledge_graph_inst.edge_degrees_batch(edge_pairs),
     )
+    edge_datas = [edges_dict.get(pair) for pair in edge_pairs]
+    edge_degree = [degrees_dict.get(pair, 0) for pair in edge_pairs]
 
     edge_datas = [
         {
@@ -1554,23 +1799,14 @@ async def _find_most_related_entities_from_relationships(
             entity_names.append(e["tgt_id"])
             seen.add(e["tgt_id"])
 
-    node_datas, node_degrees = await asyncio.gather(
-        asyncio.gather(
-            *[
-                knowledge_graph_inst.get_node(entity_name)
-                for entity_name in entity_names
-            ]
-        ),
-        asyncio.gather(
-            *[
-                knowledge_graph_inst.node_degree(entity_name)
-                for entity_name in entity_names
-            ]
-        ),
+    nodes_dict, degrees_dict = await asyncio.gather(
+        knowledge_graph_inst.get_nodes_batch(entity_names),
+        knowledge_graph_inst.node_degrees_batch(entity_names),
     )
     node_datas = [
-        {**n, "entity_name": k, "rank": d}
-        for k, n, d in zip(entity_names, node_datas, node_degrees)
+        {**nodes_dict[k], "entity_name": k, "rank": degrees_dict.get(k, 0)}
+        for k in entity_names
+        if k in nodes_dict
     ]
 
     len_node_datas = len(node_datas)
@@ -1635,6 +1871,7 @@ async def _find_related_text_unit_from_relationships(
         valid_text_units,
         key=lambda x: x["data"]["content"],
         max_token_size=query_param.max_token_for_text_unit,
+        token_key=lambda x: x["data"].get("tokens"),
     )
 
     logger.debug(
@@ -1674,17 +1911,28 @@ async def naive_query(
     hashing_kv: BaseKVStorage | None = None,
     system_prompt: str | None = None,
 ) -> str | AsyncIterator[str]:
+    # The query is embedded once for the cache and the chunk lookup
+    query_embeddings = QueryEmbeddings(chunks_vdb.embedding_func)
+
     # Handle cache
     use_model_func = global_config["llm_model_func"]
     args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
     cached_response, quantized, min_val, max_val = await handle_cache(
-        hashing_kv, args_hash, query, query_param.mode, cache_type="query"
+        hashing_kv,
+        args_hash,
+        query,
+        query_param.mode,
+        cache_type="query",
+        query_embeddings=query_embeddings,
     )
     if cached_response is not None:
         return cached_response
 
     results = await chunks_vdb.query(
-        query, top_k=query_param.top_k, ids=query_param.ids
+        query,
+        top_k=query_param.top_k,
+        ids=query_param.ids,
+        query_embedding=await query_embeddings.get(query),
     )
     if not len(results):
         return PROMPTS["fail_response"]
@@ -1705,6 +1953,7 @@ async def naive_query(
         valid_chunks,
         key=lambda x: x["content"],
         max_token_size=query_param.max_token_for_text_unit,
+        token_key=lambda x: x.get("tokens"),
     )
 
     if not maybe_trun_chunks:
@@ -1794,10 +2043,16 @@ async def kg_query_with_keywords(
     # ---------------------------
     # 1) Handle potential cache for query results
     # ---------------------------
+    query_embeddings = QueryEmbeddings(entities_vdb.embedding_func)
     use_model_func = global_config["llm_model_func"]
     args_hash = compute_args_hash(query_param.mode, query, cache_type="query")
     cached_response, quantized, min_val, max_val = await handle_cache(
-        hashing_kv, args_hash, query, query_param.mode, cache_type="query"
+        hashing_kv,
+        args_hash,
+        query,
+        query_param.mode,
+        cache_type="query",
+        query_embeddings=query_embeddings,
     )
     if cached_response is not None:
         return cached_response
@@ -1850,6 +2105,7 @@ async def kg_query_with_keywords(
         relationships_vdb,
         text_chunks_db,
         query_param,
+        query_embeddings,
     )
     if not context:
         return PROMPTS["fail_response"]
@@ -0,0 +1,75 @@
+"""Benchmark concurrent queries against a synchronous vector storage client.
+
+Simulates a blocking client whose calls wait on the network for a fixed
+latency, the way MilvusClient, Chroma's HttpClient and QdrantClient do, and
+issues many queries concurrently from one event loop. Calling the client
+directly serializes the queries; running them through run_blocking_io lets
+them overlap up to the number of storage client threads.
+
+Usage:
+    python -m lightrag.tools.storage_client_benchmark --queries 200 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+
+from lightrag import utils
+from lightrag.utils import run_blocking_io, shutdown_storage_client_executor
+
+
+class BlockingVectorClient:
+    """Stand-in for a synchronous vector database client"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def search(self, collection_name: str, data: list[float], limit: int):
+        # time.sleep releases the GIL like a socket read does
+        time.sleep(self.latency)
+        return [{"id": f"{collection_name}-{i}", "distance": 1.0} for i in range(limit)]
+
+
+async def run_direct(client: BlockingVectorClient, queries: int) -> float:
+    async def query(i: int):
+        return client.search("chunks", [float(i)], limit=5)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[query(i) for i in range(queries)])
+    return time.perf_counter() - start
+
+
+async def run_offloaded(client: BlockingVectorClient, queries: int) -> float:
+    async def query(i: int):
+        return await run_blocking_io(client.search, "chunks", [float(i)], limit=5)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[query(i) for i in range(queries)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    client = BlockingVectorClient(args.latency_ms / 1000)
+
+    elapsed = asyncio.run(run_direct(client, args.queries))
+    print(f"{'mode':<12}{'threads':>8}{'seconds':>10}{'queries/s':>12}")
+    print(f"{'direct':<12}{'-':>8}{elapsed:>10.3f}{args.queries / elapsed:>12.1f}")
+
+    for threads in args.threads:
+        utils.STORAGE_CLIENT_THREADS = threads
+        shutdown_storage_client_executor()
+        elapsed = asyncio.run(run_offloaded(client, args.queries))
+        print(
+            f"{'offloaded':<12}{threads:>8}{elapsed:>10.3f}{args.queries / elapsed:>12.1f}"
+        )
+    shutdown_storage_client_executor()
+
+
+if __name__ == "__main__":
+    main()
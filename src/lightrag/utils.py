@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import heapq
 import html
+import inspect
 import io
+import itertools
 import csv
 import json
 import logging
 import logging.handlers
 import os
 import re
-from dataclasses import dataclass
-from functools import wraps
+import time
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import partial, wraps
 from hashlib import md5
 from typing import Any, Callable
 import xml.etree.ElementTree as ET
@@ -176,6 +185,145 @@ class UnlimitedSemaphore:
 
 ENCODER = None
 
+# Max number of token counts kept in the LRU token count cache
+TOKEN_COUNT_CACHE_SIZE = int(os.getenv("TOKEN_COUNT_CACHE_SIZE", 100000))
+
+# Worker threads that run blocking calls of synchronous storage clients
+STORAGE_CLIENT_THREADS = int(os.getenv("STORAGE_CLIENT_THREADS", 16))
+_storage_client_executor: ThreadPoolExecutor | None = None
+# content md5 digest -> token count, ordered from least to most recently used
+_token_count_cache: OrderedDict[bytes, int] = OrderedDict()
+
+
+# Coalesce concurrent embedding calls for up to this many milliseconds
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", 5))
+# Max number of texts and estimated tokens sent in one coalesced embedding call,
+# EMBEDDING_BATCH_MAX_TEXTS <= 1 disables coalescing
+EMBEDDING_BATCH_MAX_TEXTS = int(os.getenv("EMBEDDING_BATCH_MAX_TEXTS", 128))
+EMBEDDING_BATCH_MAX_TOKENS = int(os.getenv("EMBEDDING_BATCH_MAX_TOKENS", 32768))
+
+# Cached prompts from which the semantic LLM cache searches an HNSW graph when
+# faiss is installed, smaller caches are searched exactly
+EMBEDDING_CACHE_ANN_MIN_SIZE = int(os.getenv("EMBEDDING_CACHE_ANN_MIN_SIZE", 10000))
+EMBEDDING_CACHE_HNSW_M = int(os.getenv("EMBEDDING_CACHE_HNSW_M", 32))
+EMBEDDING_CACHE_HNSW_EF_SEARCH = int(os.getenv("EMBEDDING_CACHE_HNSW_EF_SEARCH", 64))
+# Nearest HNSW candidates that are scored exactly per lookup
+EMBEDDING_CACHE_ANN_CANDIDATES = 16
+
+
+def _estimate_tokens(text: str) -> int:
+    # Rough estimate that avoids tokenizing every text on the hot path
+    return len(text) // 4 + 1
+
+
+class _EmbeddingBatcher:
+    """Coalesces concurrent embedding calls of one event loop into batched calls.
+
+    Texts submitted while the batcher is idle are sent on the next loop
+    iteration, so calls issued together (e.g. by asyncio.gather) share one
+    request without added latency. While a batch is in flight, new texts are
+    collected for up to wait_ms, or until the text or token budget is reached.
+    Identical texts within a batch are embedded once.
+    """
+
+    def __init__(
+        self,
+        func: Callable[[list[str]], Any],
+        wait_ms: float,
+        max_texts: int,
+        max_tokens: int,
+    ):
+        self._func = func
+        self._wait = max(wait_ms, 0) / 1000
+        self._max_texts = max_texts
+        self._max_tokens = max_tokens
+        self._pending: list[tuple[list[str], asyncio.Future]] = []
+        self._pending_texts = 0
+        self._pending_tokens = 0
+        self._in_flight = 0
+        self._timer: asyncio.Handle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        tokens = sum(_estimate_tokens(text) for text in texts)
+        if self._pending and (
+            self._pending_texts + len(texts) > self._max_texts
+            or self._pending_tokens + tokens > self._max_tokens
+        ):
+            self._flush()
+
+        future = loop.create_future()
+        self._pending.append((texts, future))
+        self._pending_texts += len(texts)
+        self._pending_tokens += tokens
+
+        if (
+            self._pending_texts >= self._max_texts
+            or self._pending_tokens >= self._max_tokens
+        ):
+            self._flush()
+        elif self._timer is None:
+            if self._in_flight:
+                self._timer = loop.call_later(self._wait, self._flush)
+            else:
+                self._timer = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = []
+        self._pending_texts = 0
+        self._pending_tokens = 0
+        self._in_flight += 1
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[list[str], asyncio.Future]]) -> None:
+        try:
+            # Embed each distinct text once
+            unique_texts = list(
+                dict.fromkeys(text for texts, _ in batch for text in texts)
+            )
+            if len(batch) == 1 and len(unique_texts) == len(batch[0][0]):
+                embeddings = await self._func(batch[0][0])
+                if not batch[0][1].done():
+                    batch[0][1].set_result(embeddings)
+                return
+
+            embeddings = np.asarray(await self._func(unique_texts))
+            positions = {text: i for i, text in enumerate(unique_texts)}
+            for texts, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[[positions[t] for t in texts]])
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._in_flight -= 1
+
+
+class _EmbeddingBatchers(weakref.WeakKeyDictionary):
+    """Event loop -> batcher registry that is shared instead of copied, as
+    asdict(LightRAG) deep copies the embedding function into global_config"""
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
 
 @dataclass
 class EmbeddingFunc:
@@ -183,9 +331,85 @@ class EmbeddingFunc:
     max_token_size: int
     func: callable
     # concurrent_limit: int = 16
+    # Identifies the model in the persistent embedding cache, defaults to the
+    # model keyword of a functools.partial func
+    model_name: str | None = None
+    # Persistent embedding cache (lightrag.kg.embedding_cache.EmbeddingCache)
+    cache: Any = field(default=None, repr=False, compare=False)
+    batch_wait_ms: float = EMBEDDING_BATCH_WAIT_MS
+    batch_max_texts: int = EMBEDDING_BATCH_MAX_TEXTS
+    batch_max_tokens: int = EMBEDDING_BATCH_MAX_TOKENS
+    # event loop -> batcher, futures can only be awaited on their own loop
+    _batchers: _EmbeddingBatchers = field(
+        default_factory=_EmbeddingBatchers,
+        init=False,
+        repr=False,
+        compare=False,
+    )
 
     async def __call__(self, *args, **kwargs) -> np.ndarray:
-        return await self.func(*args, **kwargs)
+        # Only plain calls with a list of texts can be cached and batched
+        if kwargs or len(args) != 1 or not isinstance(args[0], list) or not args[0]:
+            return await self.func(*args, **kwargs)
+
+        texts = args[0]
+        model = self.cache_model_name()
+        if self.cache is None or model is None:
+            return await self._embed(texts)
+
+        try:
+            cached = await run_blocking_io(self.cache.get_many, model, texts)
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return await self._embed(texts)
+
+        missing = list(
+            dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None)
+        )
+        if not missing:
+            return np.stack(cached)
+
+        embeddings = await self._embed(missing)
+        try:
+            await run_blocking_io(self.cache.put_many, model, missing, embeddings)
+        except Exception as e:
+            logger.warning(f"Embedding cache update failed: {e}")
+        if len(missing) == len(texts):
+            return embeddings
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        positions = {text: i for i, text in enumerate(missing)}
+        return np.stack(
+            [
+                vector if vector is not None else embeddings[positions[text]]
+                for text, vector in zip(texts, cached)
+            ]
+        )
+
+    def cache_model_name(self) -> str | None:
+        """Name of the embedding model and dimension, or None if it is unknown"""
+        model = self.model_name
+        if model is None:
+            func = inspect.unwrap(self.func)
+            if isinstance(func, partial):
+                model = func.keywords.get("model") or func.keywords.get("embed_model")
+        return f"{model}:{self.embedding_dim}" if model else None
+
+    async def _embed(self, texts: list[str]) -> np.ndarray:
+        if self.batch_max_texts <= 1:
+            return await self.func(texts)
+
+        loop = asyncio.get_running_loop()
+        batcher = self._batchers.get(loop)
+        if batcher is None:
+            batcher = _EmbeddingBatcher(
+                self.func,
+                self.batch_wait_ms,
+                self.batch_max_texts,
+                self.batch_max_tokens,
+            )
+            self._batchers[loop] = batcher
+        return await batcher.embed(texts)
 
 
 def locate_json_string_body_from_string(content: str) -> str | None:
@@ -253,23 +477,277 @@ def compute_mdhash_id(content: str, prefix: str = "") -> str:
     return prefix + md5(content.encode()).hexdigest()
 
 
-def limit_async_func_call(max_size: int):
-    """Add restriction of maximum concurrent async calls using asyncio.Semaphore"""
+# Priorities of governed calls, lower values are admitted first
+QUERY_PRIORITY = 0
+BULK_PRIORITY = 1
+
+# Length of the sliding window of tokens-per-minute and requests-per-minute budgets
+RATE_WINDOW_SECONDS = 60.0
+# Seconds to pause new calls after a rate limit error without a retry-after hint
+RATE_LIMIT_COOLDOWN = float(os.getenv("RATE_LIMIT_COOLDOWN", 1.0))
+
+_call_priority: ContextVar[int] = ContextVar(
+    "lightrag_call_priority", default=BULK_PRIORITY
+)
+# Usage reported by the LLM or embedding binding for the call in progress
+_call_usage: ContextVar[dict[str, Any] | None] = ContextVar(
+    "lightrag_call_usage", default=None
+)
+
+
+@contextmanager
+def call_priority(priority: int):
+    """Run the governed LLM and embedding calls of the block at priority"""
+    token = _call_priority.set(priority)
+    try:
+        yield
+    finally:
+        _call_priority.reset(token)
+
+
+def record_call_usage(prompt_tokens: int, completion_tokens: int = 0) -> None:
+    """Report the token usage of a response to the governor of the current call"""
+    usage = _call_usage.get()
+    if usage is not None:
+        usage["tokens"] = usage.get("tokens", 0) + prompt_tokens + completion_tokens
+        usage["completion_tokens"] = (
+            usage.get("completion_tokens", 0) + completion_tokens
+        )
+
+
+def record_rate_limit(retry_after: float | None = None) -> None:
+    """Report a rate limit error, including ones retried inside the binding"""
+    usage = _call_usage.get()
+    if usage is not None:
+        usage["rate_limited"] = True
+        if retry_after is not None:
+            usage["retry_after"] = max(usage.get("retry_after", 0), retry_after)
+
+
+def _is_rate_limit_error(e: BaseException) -> bool:
+    return (
+        "RateLimit" in type(e).__name__
+        or getattr(e, "status_code", None) == 429
+        or getattr(e, "status", None) == 429
+    )
+
+
+def _estimate_call_tokens(args: tuple, kwargs: dict[str, Any]) -> int:
+    tokens = 0
+    for value in (*args, kwargs.get("system_prompt")):
+        if isinstance(value, str):
+            tokens += _estimate_tokens(value)
+        elif isinstance(value, list):
+            tokens += sum(_estimate_tokens(v) for v in value if isinstance(v, str))
+    for message in kwargs.get("history_messages") or []:
+        if isinstance(message, dict) and isinstance(message.get("content"), str):
+            tokens += _estimate_tokens(message["content"])
+    return tokens
+
+
+class AsyncCallGovernor:
+    """Admission control for calls to a rate limited LLM or embedding provider.
+
+    Calls wait in a priority queue, so query calls overtake queued bulk
+    extraction calls. A call is admitted while the number of running calls is
+    below the concurrency limit and the tokens and requests started within the
+    last minute fit the tpm and rpm budgets. A call's tokens are estimated from
+    its prompt at admission and replaced with the usage the binding reports.
+
+    The concurrency limit adapts AIMD style: it grows by one per limit
+    successful calls up to max_concurrency, and is halved, with new calls
+    paused for a cool down, when the provider answers with a rate limit error.
+    """
+
+    def __init__(self, max_concurrency: int, tpm: int = 0, rpm: int = 0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.tpm = tpm
+        self.rpm = rpm
+        self.limit = float(self.max_concurrency)
+        self.rate_limited = 0
+        self._active = 0
+        self._waiters: list[tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # [start time, tokens] of the calls started within the window
+        self._window: deque[list[float]] = deque()
+        self._window_tokens = 0
+        self._cooldown_until = 0.0
+        self._last_decrease = 0.0
+        self._avg_completion_tokens = 0.0
+        self._timer: asyncio.TimerHandle | None = None
+
+    def _prune_window(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - RATE_WINDOW_SECONDS:
+            self._window_tokens -= self._window.popleft()[1]
+
+    def _admission_delay(self, tokens: int) -> float | None:
+        """0 if a call of tokens can start now, else the seconds until it may
+        (None if it has to wait for a running call to finish)"""
+        now = time.monotonic()
+        if now < self._cooldown_until:
+            return self._cooldown_until - now
+        if self._active >= int(self.limit):
+            return None
+        self._prune_window(now)
+        if self._window and (
+            (self.rpm and len(self._window) >= self.rpm)
+            or (self.tpm and self._window_tokens + tokens > self.tpm)
+        ):
+            return self._window[0][0] + RATE_WINDOW_SECONDS - now
+        return 0
+
+    def _start(self, tokens: int) -> list[float]:
+        self._active += 1
+        entry = [time.monotonic(), tokens]
+        self._window.append(entry)
+        self._window_tokens += tokens
+        return entry
+
+    def _dispatch(self) -> None:
+        self._timer = None
+        while self._waiters:
+            priority, seq, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = self._admission_delay(tokens)
+            if delay is None:
+                return
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(
+                    delay, self._dispatch
+                )
+                return
+            heapq.heappop(self._waiters)
+            future.set_result(self._start(tokens))
+
+    async def acquire(self, tokens: int, priority: int) -> list[float]:
+        tokens += int(self._avg_completion_tokens)
+        if not self._waiters and self._admission_delay(tokens) == 0:
+            return self._start(tokens)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), tokens, future))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted right before the cancellation
+                self.release(future.result(), {})
+            raise
+
+    def release(self, entry: list[float], usage: dict[str, Any]) -> None:
+        self._active -= 1
+        now = time.monotonic()
+        self._prune_window(now)
+        if "tokens" in usage and entry[0] > now - RATE_WINDOW_SECONDS:
+            # Still in the window, swap the estimate for the reported usage
+            self._window_tokens += usage["tokens"] - entry[1]
+            entry[1] = usage["tokens"]
+        if "completion_tokens" in usage:
+            self._avg_completion_tokens += (
+                usage["completion_tokens"] - self._avg_completion_tokens
+            ) * 0.1
+
+        if usage.get("rate_limited"):
+            self.rate_limited += 1
+            self._cooldown_until = max(
+                self._cooldown_until,
+                now + usage.get("retry_after", RATE_LIMIT_COOLDOWN),
+            )
+            # Calls that were running together fail together, halve once for them
+            if now - self._last_decrease > RATE_LIMIT_COOLDOWN:
+                self._last_decrease = now
+                self.limit = max(1.0, self.limit / 2)
+                logger.warning(
+                    f"Rate limited, concurrency limit lowered to {int(self.limit)}"
+                )
+        elif usage.get("succeeded"):
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+
+        if self._timer is None:
+            self._dispatch()
+
+    def get_stats(self) -> dict[str, Any]:
+        self._prune_window(time.monotonic())
+        return {
+            "limit": int(self.limit),
+            "max_concurrency": self.max_concurrency,
+            "active": self._active,
+            "waiting": sum(not w[3].done() for w in self._waiters),
+            "tokens_last_minute": self._window_tokens,
+            "requests_last_minute": len(self._window),
+            "rate_limited": self.rate_limited,
+        }
+
+
+def limit_async_func_call(max_size: int, tpm: int = 0, rpm: int = 0):
+    """Add restriction of maximum concurrent async calls and of tokens and
+    requests per minute (0 is unlimited) using an AsyncCallGovernor"""
 
     def final_decro(func):
-        sem = asyncio.Semaphore(max_size)
+        governor = AsyncCallGovernor(max_size, tpm=tpm, rpm=rpm)
 
         @wraps(func)
         async def wait_func(*args, **kwargs):
-            async with sem:
+            entry = await governor.acquire(
+                _estimate_call_tokens(args, kwargs), _call_priority.get()
+            )
+            usage: dict[str, Any] = {}
+            token = _call_usage.set(usage)
+            try:
                 result = await func(*args, **kwargs)
+                if isinstance(result, str) and "completion_tokens" not in usage:
+                    usage["completion_tokens"] = _estimate_tokens(result)
+                usage["succeeded"] = True
                 return result
-
+            except Exception as e:
+                if _is_rate_limit_error(e):
+                    usage["rate_limited"] = True
+                raise
+            finally:
+                _call_usage.reset(token)
+                governor.release(entry, usage)
+
+        wait_func.governor = governor
         return wait_func
 
     return final_decro
 
 
+def get_storage_client_executor() -> ThreadPoolExecutor:
+    """Get the bounded thread pool shared by synchronous storage clients"""
+    global _storage_client_executor
+    if _storage_client_executor is None:
+        _storage_client_executor = ThreadPoolExecutor(
+            max_workers=STORAGE_CLIENT_THREADS,
+            thread_name_prefix="lightrag-storage",
+        )
+    return _storage_client_executor
+
+
+def shutdown_storage_client_executor() -> None:
+    """Shut down the storage client thread pool, it is recreated on next use"""
+    global _storage_client_executor
+    if _storage_client_executor is not None:
+        _storage_client_executor.shutdown(wait=True)
+        _storage_client_executor = None
+
+
+async def run_blocking_io(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking storage client call in the storage client thread pool
+
+    Keeps the event loop free while a synchronous client waits on the network,
+    so concurrent queries overlap instead of running one after another.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_storage_client_executor(), partial(func, *args, **kwargs)
+    )
+
+
 def wrap_embedding_func_with_attrs(**kwargs):
     """Wrap a function with attributes"""
 
@@ -300,6 +778,47 @@ def encode_string_by_tiktoken(content: str, model_name: str = "gpt-4o"):
     return tokens
 
 
+def count_tokens_by_tiktoken(
+    contents: list[str], model_name: str = "gpt-4o"
+) -> list[int]:
+    """Count the tokens of each string, reusing cached counts of identical contents
+
+    Counts are cached in an LRU keyed by the md5 digest of the content, and all
+    strings missing from the cache are tokenized in one encode_batch call.
+    """
+    global ENCODER
+    counts: list[int | None] = []
+    misses: dict[bytes, list[int]] = {}
+    miss_contents: list[str] = []
+    for i, content in enumerate(contents):
+        key = md5(content.encode("utf-8", "surrogatepass")).digest()
+        count = _token_count_cache.get(key)
+        if count is not None:
+            _token_count_cache.move_to_end(key)
+        elif key in misses:
+            misses[key].append(i)
+        else:
+            misses[key] = [i]
+            miss_contents.append(content)
+        counts.append(count)
+
+    if miss_contents:
+        if ENCODER is None:
+            ENCODER = tiktoken.encoding_for_model(model_name)
+        if len(miss_contents) == 1:
+            miss_tokens = [ENCODER.encode(miss_contents[0])]
+        else:
+            miss_tokens = ENCODER.encode_batch(miss_contents)
+        for (key, positions), tokens in zip(misses.items(), miss_tokens):
+            for i in positions:
+                counts[i] = len(tokens)
+            _token_count_cache[key] = len(tokens)
+        while len(_token_count_cache) > TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.popitem(last=False)
+
+    return counts
+
+
 def decode_tokens_by_tiktoken(tokens: list[int], model_name: str = "gpt-4o"):
     global ENCODER
     if ENCODER is None:
@@ -341,14 +860,33 @@ def is_float_regex(value: str) -> bool:
 
 
 def truncate_list_by_token_size(
-    list_data: list[Any], key: Callable[[Any], str], max_token_size: int
+    list_data: list[Any],
+    key: Callable[[Any], str],
+    max_token_size: int,
+    token_key: Callable[[Any], int | None] | None = None,
 ) -> list[int]:
-    """Truncate a list of data by token size"""
+    """Truncate a list of data by token size
+
+    Args:
+        list_data: The items to truncate
+        key: Returns the text of an item
+        max_token_size: Max total number of tokens of the kept items
+        token_key: Optionally returns a precomputed token count of an item (e.g. the
+            ``tokens`` field of text chunks), or None to count the text of the item
+    """
     if max_token_size <= 0:
         return []
+    token_counts = [token_key(data) if token_key else None for data in list_data]
+    missing = [i for i, count in enumerate(token_counts) if count is None]
+    if missing:
+        for i, count in zip(
+            missing, count_tokens_by_tiktoken([key(list_data[i]) for i in missing])
+        ):
+            token_counts[i] = count
+
     tokens = 0
-    for i, data in enumerate(list_data):
-        tokens += len(encode_string_by_tiktoken(key(data)))
+    for i, count in enumerate(token_counts):
+        tokens += count
         if tokens > max_token_size:
             return list_data[:i]
     return list_data
@@ -506,36 +1044,24 @@ async def get_best_cached_response(
     if not mode_cache:
         return None
 
-    best_similarity = -1
-    best_response = None
-    best_prompt = None
-    best_cache_id = None
-
-    # Only iterate through cache entries for this mode
-    for cache_id, cache_data in mode_cache.items():
-        # Skip if cache_type doesn't match
-        if cache_type and cache_data.get("cache_type") != cache_type:
-            continue
-
-        if cache_data["embedding"] is None:
-            continue
-
-        # Convert cached embedding list to ndarray
-        cached_quantized = np.frombuffer(
-            bytes.fromhex(cache_data["embedding"]), dtype=np.uint8
-        ).reshape(cache_data["embedding_shape"])
-        cached_embedding = dequantize_embedding(
-            cached_quantized,
-            cache_data["embedding_min"],
-            cache_data["embedding_max"],
-        )
+    # Find the most similar cached prompt with a single matrix product
+    cache_index = get_embedding_cache_index(hashing_kv, mode, cache_type)
+    cache_index.sync(mode_cache, cache_type)
+    best_match = cache_index.best_match(current_embedding)
+    if best_match is not None and (
+        best_match[0] not in mode_cache
+        or not cache_index.is_current(best_match[0], mode_cache[best_match[0]])
+    ):
+        # The dict was changed in place behind the index's back, reconcile it
+        cache_index.mark_synced(None)
+        cache_index.sync(mode_cache, cache_type)
+        best_match = cache_index.best_match(current_embedding)
+    if best_match is None:
+        return None
 
-        similarity = cosine_similarity(current_embedding, cached_embedding)
-        if similarity > best_similarity:
-            best_similarity = similarity
-            best_response = cache_data["return"]
-            best_prompt = cache_data["original_prompt"]
-            best_cache_id = cache_id
+    best_cache_id, best_similarity = best_match
+    best_response = mode_cache[best_cache_id]["return"]
+    best_prompt = mode_cache[best_cache_id]["original_prompt"]
 
     if best_similarity > similarity_threshold:
         # If LLM check is enabled and all required parameters are provided
@@ -627,14 +1153,328 @@ def dequantize_embedding(
     return (quantized * scale + min_val).astype(np.float32)
 
 
+class EmbeddingCacheIndex:
+    """In-memory vector index over the embeddings of one (mode, cache_type) of the LLM cache.
+
+    Cached embeddings are dequantized once and kept as L2-normalized rows of a
+    contiguous float32 matrix, so an exact lookup is one matrix-vector product
+    instead of decoding and comparing every cache entry. Only cache ids are kept
+    here, the responses stay in the KV storage.
+
+    When faiss is installed and the index holds EMBEDDING_CACHE_ANN_MIN_SIZE
+    entries, an HNSW graph over the rows is built in a background thread. Once
+    it is ready, lookups score only its nearest candidates exactly, which keeps
+    them well under a millisecond at 100k entries where the exact search takes
+    tens of milliseconds.
+
+    Rows are never modified in place: replaced and removed entries leave dead
+    rows behind, which lets the HNSW graph and a build in progress share the
+    matrix. Dead rows are dropped once they make up half of the matrix.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def reset(self) -> None:
+        self._matrix: np.ndarray | None = None
+        # Row -> cache id, None for dead rows
+        self._ids: list[str | None] = []
+        self._alive = np.zeros(0, dtype=bool)
+        self._dead = 0
+        self._positions: dict[str, int] = {}
+        # Cache id -> (embedding_min, embedding_max) of the indexed entry
+        self._signatures: dict[str, tuple] = {}
+        # Mode cache dict the index was last reconciled with
+        self._synced_cache: dict[str, Any] | None = None
+        # HNSW graph over the first ntotal rows, and its build in progress
+        self._ann = None
+        self._ann_build: Future | None = None
+
+    def _append(self, cache_id: str, vector: np.ndarray) -> None:
+        rows = len(self._ids)
+        if self._matrix is None:
+            self._matrix = np.empty((16, vector.shape[0]), dtype=np.float32)
+            self._alive = np.zeros(16, dtype=bool)
+        elif rows == self._matrix.shape[0]:
+            # Grow geometrically so inserts stay amortized O(1)
+            grown = np.empty((rows * 2, self._matrix.shape[1]), dtype=np.float32)
+            grown[:rows] = self._matrix[:rows]
+            self._matrix = grown
+            alive = np.zeros(rows * 2, dtype=bool)
+            alive[:rows] = self._alive
+            self._alive = alive
+
+        self._matrix[rows] = vector
+        self._alive[rows] = True
+        self._positions[cache_id] = rows
+        self._ids.append(cache_id)
+        if self._ann is not None:
+            self._ann.add(self._matrix[rows : rows + 1])
+
+    def _kill(self, row: int) -> None:
+        self._ids[row] = None
+        self._alive[row] = False
+        self._dead += 1
+        if self._dead > max(len(self._ids) // 2, 1024):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop dead rows, the HNSW graph is rebuilt for the new rows"""
+        keep = np.flatnonzero(self._alive[: len(self._ids)])
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._ids = [self._ids[row] for row in keep]
+        self._positions = {cache_id: row for row, cache_id in enumerate(self._ids)}
+        self._dead = 0
+        self._ann = None
+        self._ann_build = None
+
+    def add(self, cache_id: str, embedding: np.ndarray) -> None:
+        """Insert or replace the embedding of a cache entry"""
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        vector = vector / norm
+
+        if self._matrix is not None and vector.shape[0] != self._matrix.shape[1]:
+            logger.warning(
+                f"Skip cache embedding {cache_id} with dimension {vector.shape[0]}, "
+                f"expected {self._matrix.shape[1]}"
+            )
+            return
+
+        position = self._positions.get(cache_id)
+        if position is not None:
+            if np.array_equal(self._matrix[position], vector):
+                return
+            self._kill(position)
+        self._append(cache_id, vector)
+
+    def remove(self, cache_id: str) -> None:
+        self._signatures.pop(cache_id, None)
+        position = self._positions.pop(cache_id, None)
+        if position is not None:
+            self._kill(position)
+
+    def add_cache_entry(self, cache_id: str, cache_data: dict[str, Any]) -> None:
+        """Insert a cache entry as stored in the KV storage"""
+        if cache_data.get("embedding") is None:
+            return
+        cached_quantized = np.frombuffer(
+            bytes.fromhex(cache_data["embedding"]), dtype=np.uint8
+        ).reshape(cache_data["embedding_shape"])
+        self.add(
+            cache_id,
+            dequantize_embedding(
+                cached_quantized,
+                cache_data["embedding_min"],
+                cache_data["embedding_max"],
+            ),
+        )
+        self._signatures[cache_id] = _cache_entry_signature(cache_data)
+
+    def sync(self, mode_cache: dict[str, Any], cache_type: str | None = None) -> None:
+        """Reconcile the index with entries written by other processes or before startup
+
+        A storage that returns the same dict object as the last reconciled one
+        has not changed it. Otherwise entries are compared by their quantization
+        range, so replaced and removed entries are found without decoding them.
+        """
+        if mode_cache is self._synced_cache:
+            return
+        current = set()
+        for cache_id, cache_data in mode_cache.items():
+            if cache_data.get("embedding") is None:
+                continue
+            if cache_type and cache_data.get("cache_type") != cache_type:
+                continue
+            current.add(cache_id)
+            if not self.is_current(cache_id, cache_data):
+                self.add_cache_entry(cache_id, cache_data)
+        for cache_id in self._positions.keys() - current:
+            self.remove(cache_id)
+        self._synced_cache = mode_cache
+
+    def is_current(self, cache_id: str, cache_data: dict[str, Any]) -> bool:
+        """Whether the index holds this version of the cache entry"""
+        return self._signatures.get(cache_id) == _cache_entry_signature(cache_data)
+
+    def is_synced_with(self, mode_cache: dict[str, Any]) -> bool:
+        return mode_cache is self._synced_cache
+
+    def mark_synced(self, mode_cache: dict[str, Any]) -> None:
+        """Record that the index covers the given mode cache dict"""
+        self._synced_cache = mode_cache
+
+    def _update_ann(self) -> None:
+        """Install a finished HNSW build, or start one once the index is large enough"""
+        if self._ann_build is not None and self._ann_build.done():
+            build, self._ann_build = self._ann_build, None
+            try:
+                ann = build.result()
+            except Exception as e:
+                logger.warning(f"Failed to build the embedding cache HNSW index: {e}")
+                return
+            # Rows appended while the graph was built
+            if ann.ntotal < len(self._ids):
+                ann.add(self._matrix[ann.ntotal : len(self._ids)])
+            self._ann = ann
+        elif (
+            self._ann is None
+            and self._ann_build is None
+            and len(self._positions) >= EMBEDDING_CACHE_ANN_MIN_SIZE
+            and _import_faiss() is not None
+        ):
+            self._ann_build = _get_ann_build_executor().submit(
+                _build_hnsw_index, self._matrix[: len(self._ids)]
+            )
+
+    def best_match(self, embedding: np.ndarray) -> tuple[str, float] | None:
+        """Return the id and cosine similarity of the closest cached embedding"""
+        if not self._positions:
+            return None
+        query = np.asarray(embedding, dtype=np.float32).ravel()
+        if query.shape[0] != self._matrix.shape[1]:
+            return None
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        query = query / norm
+
+        self._update_ann()
+        if self._ann is not None:
+            # Score the approximate nearest rows exactly
+            _, labels = self._ann.search(
+                query[None, :], min(EMBEDDING_CACHE_ANN_CANDIDATES, self._ann.ntotal)
+            )
+            rows = [row for row in labels[0] if row >= 0 and self._alive[row]]
+            if rows:
+                scores = self._matrix[rows] @ query
+                best = int(np.argmax(scores))
+                return self._ids[rows[best]], float(scores[best])
+
+        scores = self._matrix[: len(self._ids)] @ query
+        if self._dead:
+            scores[~self._alive[: len(self._ids)]] = -np.inf
+        best = int(np.argmax(scores))
+        return self._ids[best], float(scores[best])
+
+
+def _cache_entry_signature(cache_data: dict[str, Any]) -> tuple:
+    # Re-quantizing a different embedding practically always changes its range
+    return (cache_data.get("embedding_min"), cache_data.get("embedding_max"))
+
+
+_faiss = None
+_ann_build_executor: ThreadPoolExecutor | None = None
+
+
+def _import_faiss():
+    """The faiss module if it is installed, else None"""
+    global _faiss
+    if _faiss is None:
+        try:
+            import faiss
+        except ImportError:
+            faiss = False
+        _faiss = faiss
+    return _faiss or None
+
+
+def _get_ann_build_executor() -> ThreadPoolExecutor:
+    global _ann_build_executor
+    if _ann_build_executor is None:
+        _ann_build_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lightrag_cache_ann"
+        )
+    return _ann_build_executor
+
+
+def _build_hnsw_index(vectors: np.ndarray):
+    faiss = _import_faiss()
+    index = faiss.IndexHNSWFlat(
+        vectors.shape[1], EMBEDDING_CACHE_HNSW_M, faiss.METRIC_INNER_PRODUCT
+    )
+    index.hnsw.efSearch = EMBEDDING_CACHE_HNSW_EF_SEARCH
+    index.add(np.ascontiguousarray(vectors))
+    return index
+
+
+_embedding_cache_indexes: dict[tuple, EmbeddingCacheIndex] = {}
+
+
+def get_embedding_cache_index(
+    hashing_kv, mode: str, cache_type: str | None = None
+) -> EmbeddingCacheIndex:
+    """Get the process-wide embedding index for a (mode, cache_type) of an LLM cache storage"""
+    key = (
+        hashing_kv.global_config.get("working_dir", ""),
+        hashing_kv.namespace,
+        mode,
+        cache_type,
+    )
+    if key not in _embedding_cache_indexes:
+        _embedding_cache_indexes[key] = EmbeddingCacheIndex()
+    return _embedding_cache_indexes[key]
+
+
+class QueryEmbeddings:
+    """Embeddings of the texts searched by one query request.
+
+    The semantic LLM cache and the vector storages of a request share one
+    instance, so each distinct text (the raw query, the low and high level
+    keywords) is embedded at most once, and texts requested together are
+    embedded in a single call.
+    """
+
+    def __init__(self, embedding_func: EmbeddingFunc):
+        self._embedding_func = embedding_func
+        self._vectors: dict[str, asyncio.Future] = {}
+
+    async def get(self, text: str) -> np.ndarray:
+        return (await self.get_many([text]))[0]
+
+    async def get_many(self, texts: list[str]) -> list[np.ndarray]:
+        missing = [text for text in dict.fromkeys(texts) if text not in self._vectors]
+        if missing:
+            loop = asyncio.get_running_loop()
+            futures = [loop.create_future() for _ in missing]
+            self._vectors.update(zip(missing, futures))
+            try:
+                embeddings = await self._embedding_func(missing)
+            except BaseException as e:
+                for text, future in zip(missing, futures):
+                    # Let a later request retry instead of reusing the failure
+                    del self._vectors[text]
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+                        # Retrieve it so an unawaited failure is not logged
+                        future.exception()
+                raise
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding)
+        return [await self._vectors[text] for text in texts]
+
+
 async def handle_cache(
     hashing_kv,
     args_hash,
     prompt,
     mode="default",
     cache_type=None,
+    query_embeddings: QueryEmbeddings | None = None,
 ):
-    """Generic cache handling function"""
+    """Generic cache handling function
+
+    query_embeddings: Embeddings of the current query request, reused for the
+    similarity lookup when the embedding cache is enabled.
+    """
     if hashing_kv is None:
         return None, None, None, None
 
@@ -652,7 +1492,10 @@ async def handle_cache(
 
         quantized = min_val = max_val = None
         if is_embedding_cache_enabled:  # Use embedding simularity to match cache
-            current_embedding = await hashing_kv.embedding_func([prompt])
+            if query_embeddings is not None:
+                current_embedding = [await query_embeddings.get(prompt)]
+            else:
+                current_embedding = await hashing_kv.embedding_func([prompt])
             llm_model_func = hashing_kv.global_config.get("llm_model_func")
             quantized, min_val, max_val = quantize_embedding(current_embedding[0])
             best_cached_response = await get_best_cached_response(
@@ -727,7 +1570,9 @@ async def save_to_cache(hashing_kv, cache_data: CacheData):
             or {}
         )
     else:
-        mode_cache = await hashing_kv.get_by_id(cache_data.mode) or {}
+        stored_cache = await hashing_kv.get_by_id(cache_data.mode) or {}
+        # Copy so the storage can tell which entries this upsert changes
+        mode_cache = dict(stored_cache)
 
     # Check if we already have identical content cached
     if cache_data.args_hash in mode_cache:
@@ -756,6 +1601,22 @@ async def save_to_cache(hashing_kv, cache_data: CacheData):
     # Only upsert if there's actual new content
     await hashing_kv.upsert({cache_data.mode: mode_cache})
 
+    # Keep the embedding index of this mode in step with the new entry
+    if cache_data.quantized is not None:
+        cache_index = get_embedding_cache_index(
+            hashing_kv, cache_data.mode, cache_data.cache_type
+        )
+        # The storage keeps the upserted dict, which then differs from the
+        # indexed one only by the new entry
+        in_step = not exists_func(
+            hashing_kv, "get_by_mode_and_id"
+        ) and cache_index.is_synced_with(stored_cache)
+        cache_index.add_cache_entry(
+            cache_data.args_hash, mode_cache[cache_data.args_hash]
+        )
+        if in_step:
+            cache_index.mark_synced(mode_cache)
+
 
 def safe_unicode_decode(content):
     # Regular expression to find all Unicode escape sequences of the form \uXXXX
@@ -0,0 +1,100 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from hashlib import md5
+from typing import Any, Dict, Optional, Tuple
+
+# SQLite database the LLM responses are cached in
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "llm_cache.sqlite")
+# Cached responses older than this many seconds are not reused, 0 keeps them forever
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 30 * 24 * 3600))
+# Max number of cached responses, the least recently used ones are evicted
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+
+class LLMResponseCache:
+    """
+    On-disk content-addressed cache of parsed LLM responses.
+
+    Like LightRAG's llm_response_cache, a response is keyed by the md5 hash of
+    everything that determines it: the model, the rendered prompt and the output
+    schema. The workflow calls the LLM at temperature 0, so re-running a project
+    or resuming it after a crash reuses the responses instead of paying again.
+    """
+
+    def __init__(self, file_name: str = LLM_CACHE_DB, ttl: int = LLM_CACHE_TTL, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.file_name = file_name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # node -> hits, misses and tokens saved by hits
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0, "saved_tokens": 0})
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(file_name, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, tokens INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def compute_key(model: str, prompt: str, schema: Any) -> str:
+        """Hash of the model, the rendered prompt and the JSON schema of the output."""
+        schema_json = json.dumps(schema.model_json_schema(), sort_keys=True)
+        return md5("\0".join([model, prompt, schema_json]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str, node: str) -> Optional[Tuple[Any, int]]:
+        """Return the cached (response, tokens) for key, or None if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, tokens, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+
+            stats = self.stats[node]
+            if row is None:
+                stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            stats["hits"] += 1
+            stats["saved_tokens"] += row[1]
+        return json.loads(row[0]), row[1]
+
+    def put(self, key: str, response: Any, tokens: int) -> None:
+        """Store a response and evict expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, tokens, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(response), tokens, now, now)
+            )
+            if self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Hits, misses, hit rate and saved tokens of each node."""
+        with self._lock:
+            return {
+                node: {**stats, "hit_rate": round(stats["hits"] / (stats["hits"] + stats["misses"]), 4)}
+                for node, stats in self.stats.items()
+            }
+
+    def log_stats(self) -> None:
+        """Print the hit rate and the saved tokens of each node."""
+        for node, stats in self.get_stats().items():
+            print(
+                f"LLM cache [{node}]: {stats['hits']} hits, {stats['misses']} misses "
+                f"(hit rate {stats['hit_rate']:.0%}), {stats['saved_tokens']} tokens saved"
+            )
@@ -166,4 +166,48 @@ Your task is to assess whether the current design adequately supports this singl
 6. Include specific, actionable feedback on how to better support this user story.
 
 {format_instructions}
-"""
\ No newline at end of file
+"""
+
+# Batched User Story Validation Prompt
+# The shared instructions and design come first and the user stories last, so
+# every validation call of a round starts with the same prefix and the provider
+# can serve it from its prompt cache.
+validate_user_stories_batch_prompt = """
+You are validating a system architecture design against user stories.
+Your task is to assess, for each user story listed at the end, whether the current design adequately supports it.
+Validate every user story independently of the others.
+
+**Instructions:**
+For each user story:
+1. Create a step-by-step sequence showing how the system would fulfill the user story.
+2. Identify the components that would be involved in each step.
+3. Evaluate whether the current design adequately supports the user story:
+   - What aspects of the design work well for this story?
+   - Are there any missing components or interactions needed?
+   - Are there any architectural issues that prevent fully supporting this story?
+
+4. Categorize any identified issues as:
+   - Major architectural issues (fundamental problems requiring significant redesign)
+   - Minor implementation issues (can be addressed with targeted refinements)
+
+5. Provide a final verdict on whether the user story is adequately supported.
+6. Include specific, actionable feedback on how to better support the user story.
+7. Return exactly one validation per user story and set its story_id to the identifier given below (e.g. "US-3").
+
+{format_instructions}
+
+**Project Description:**
+{project_description}
+
+**Project Requirements:**
+{requirements}
+
+**Current System Description:**
+{system_description}
+
+**Component Descriptions:**
+{component_descriptions}
+
+**User Stories to Validate:**
+{user_stories}
+"""
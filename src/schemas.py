@@ -191,6 +191,18 @@ class UserStoryValidationOutput(BaseModel):
         description="Brief summary explaining why the user story is or isn't adequately supported"
     )
 
+class BatchedUserStoryValidation(UserStoryValidationOutput):
+    story_id: str = Field(
+        ...,
+        description="Identifier of the validated user story as given in the prompt (e.g. 'US-3')"
+    )
+
+class UserStoryBatchValidationOutput(BaseModel):
+    validations: List[BatchedUserStoryValidation] = Field(
+        ...,
+        description="One validation for each user story to validate, in the given order"
+    )
+
 # 6. Schema for System Improvement
 class ImprovedSystemOutput(BaseModel):
     system_description: str = Field(
@@ -1,5 +1,6 @@
 
-from typing import Dict, List, Optional, Any
+import operator
+from typing import Annotated, Dict, List, Optional, Any
 from pydantic import BaseModel, Field
 from schemas import (
     UserStory,
@@ -79,42 +80,98 @@ class State(BaseModel):
         description="Count of iterations for each iterative stage"
     )
 
-    # Error handling
-    error_log: List[str] = Field(
+    # Error handling - nodes return new errors only, the reducer appends them
+    error_log: Annotated[List[str], operator.add] = Field(
         default_factory=list,
         description="Log of errors encountered during processing"
     )
     
-    # Historical versions for comparison
-    design_history: List[Dict[str, Any]] = Field(
+    # Historical versions for comparison - stored as deltas, see get_design_snapshot
+    design_history: Annotated[List[Dict[str, Any]], operator.add] = Field(
         default_factory=list,
         description="History of system designs for comparison and rollback if needed"
     )
 
 # Helper functions for state transitions
+#
+# Nodes never copy the State. They return partial updates that LangGraph merges
+# into the state, and the helpers below build such updates. Unchanged fields,
+# components and validations are shared between successive states.
 
-def save_design_snapshot(state: State) -> State:
-    """Save the current design to history before making changes."""
-    snapshot = {
-        "system_description": state.system_description,
-        "components": state.components.copy(),
-        "iterations": state.iterations.copy()
+def get_design_snapshot(design_history: List[Dict[str, Any]], index: int = -1) -> Dict[str, Any]:
+    """Rebuild the full design saved at index of the delta encoded design history."""
+    index = range(len(design_history))[index]
+    system_description = ""
+    components: Dict[str, Any] = {}
+    for delta in design_history[:index + 1]:
+        system_description = delta.get("system_description", system_description)
+        components.update(delta["components"])
+    return {
+        "system_description": system_description,
+        "components": [components[name] for name in design_history[index]["component_names"]],
+        "iterations": design_history[index]["iterations"]
+    }
+
+def save_design_snapshot(state: State, system_description: Optional[str] = None, components: Optional[List[Component]] = None) -> Dict[str, Any]:
+    """
+    Save a design to history, by default the current one before making changes.
+    Only the parts that differ from the previous snapshot are stored, unchanged
+    components are taken from earlier snapshots when the design is rebuilt.
+    """
+    if system_description is None:
+        system_description = state.system_description
+    if components is None:
+        components = state.components
+
+    previous_description = None
+    previous_components = {}
+    if state.design_history:
+        previous = get_design_snapshot(state.design_history)
+        previous_description = previous["system_description"]
+        previous_components = {c.name: c for c in previous["components"]}
+
+    delta = {
+        "component_names": [c.name for c in components],
+        "components": {c.name: c for c in components if previous_components.get(c.name) != c},
+        "iterations": dict(state.iterations)
+    }
+    if system_description != previous_description:
+        delta["system_description"] = system_description
+    return {"design_history": [delta]}
+
+def changed_component_names(old_components: List[Any], new_components: List[Any]) -> set:
+    """Names of the components added, removed or modified between two designs."""
+    def by_name(components):
+        dumped = [c if isinstance(c, dict) else c.model_dump() for c in components]
+        return {c["name"].strip().upper(): c for c in dumped}
+
+    old = by_name(old_components)
+    new = by_name(new_components)
+    return {name for name in old.keys() | new.keys() if old.get(name) != new.get(name)}
+
+def invalidate_story_validations(state: State, new_components: List[Component]) -> Dict[str, Any]:
+    """
+    Drop the story validations that replacing the current components may affect.
+    A validation is carried forward only if its story was satisfied and none of
+    its involved components changed.
+    """
+    changed = changed_component_names(state.components, new_components)
+    return {
+        "story_validations": {
+            story: validation for story, validation in state.story_validations.items()
+            if validation.is_satisfied
+            and validation.involved_components
+            and not changed & {c.strip().upper() for c in validation.involved_components}
+        }
     }
-    
-    # Create a new state with updated history
-    new_state = state.copy()
-    new_state.design_history.append(snapshot)
-    return new_state
 
-def increment_iteration(state: State, stage_name: str) -> State:
+def increment_iteration(state: State, stage_name: str) -> Dict[str, Any]:
     """Increment the iteration counter for a specific stage."""
-    new_state = state.copy()
-    if stage_name in new_state.iterations:
-        new_state.iterations[stage_name] += 1
-    return new_state
+    iterations = dict(state.iterations)
+    if stage_name in iterations:
+        iterations[stage_name] += 1
+    return {"iterations": iterations}
 
-def log_error(state: State, error_message: str) -> State:
+def log_error(error_message: str) -> Dict[str, Any]:
     """Add an error message to the error log."""
-    new_state = state.copy()
-    new_state.error_log.append(error_message)
-    return new_state
\ No newline at end of file
+    return {"error_log": [error_message]}
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+# The lightrag package lives in src/ and is not installed
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+
+class _CharEncoder:
+    """Offline stand-in for the tiktoken encoding, one token per character"""
+
+    def encode(self, content, **kwargs):
+        return [ord(char) for char in content]
+
+    def encode_batch(self, contents, **kwargs):
+        return [self.encode(content) for content in contents]
+
+    def decode(self, tokens):
+        return "".join(chr(token) for token in tokens)
+
+
+@pytest.fixture(autouse=True)
+def offline_tokenizer(monkeypatch):
+    # tiktoken downloads its encodings on first use
+    from lightrag import utils
+
+    monkeypatch.setattr(utils, "ENCODER", _CharEncoder())
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+
+from lightrag import LightRAG
+from lightrag.kg.shared_storage import initialize_pipeline_status
+from lightrag.utils import EmbeddingFunc
+
+
+async def fake_llm(prompt, system_prompt=None, history_messages=[], **kwargs):
+    if history_messages:
+        # No gleaning
+        return "no"
+    if "BOB" in prompt.split("-Real Data-")[-1]:
+        # DAVE is only a relation endpoint, never extracted as an entity
+        return (
+            '("entity"<|>"BOB"<|>"person"<|>"Bob")##'
+            '("relationship"<|>"BOB"<|>"DAVE"<|>"knows"<|>"friends"<|>1.0)<|COMPLETE|>'
+        )
+    return (
+        '("entity"<|>"ALICE"<|>"person"<|>"Alice")##'
+        '("entity"<|>"PARIS"<|>"geo"<|>"Paris")##'
+        '("relationship"<|>"ALICE"<|>"PARIS"<|>"lives in"<|>"home"<|>1.0)<|COMPLETE|>'
+    )
+
+
+async def fake_embed(texts):
+    return np.random.rand(len(texts), 8)
+
+
+async def _insert_and_delete(working_dir):
+    rag = LightRAG(
+        working_dir=working_dir,
+        llm_model_func=fake_llm,
+        embedding_func=EmbeddingFunc(8, 8192, fake_embed),
+        enable_llm_cache_for_entity_extract=False,
+        enable_persistent_embedding_cache=False,
+    )
+    await rag.initialize_storages()
+    await initialize_pipeline_status()
+
+    await rag.ainsert(["BOB knows DAVE", "ALICE lives in PARIS"], ids=["docA", "docB"])
+    await rag.adelete_by_doc_id("docA")
+
+    labels = await rag.chunk_entity_relation_graph.get_all_labels()
+    await rag.finalize_storages()
+    return sorted(labels)
+
+
+def test_delete_removes_placeholder_relation_endpoints(tmp_path):
+    assert asyncio.run(_insert_and_delete(str(tmp_path))) == ["ALICE", "PARIS"]